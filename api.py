@@ -0,0 +1,175 @@
+"""Versioned JSON API (/api/v1) over the same crud functions as the HTML pages.
+
+Callers authenticate with the session cookie set by POST /login; a missing or
+expired session is answered with 401 instead of the /login redirect. Lists
+use the same keyset cursors as the HTML views (pass ``next_cursor`` back
+as ``cursor``). Every GET carries a weak ETag over the response body, and a
+matching If-None-Match is answered with 304 and no body. Responses are
+gzip-compressed by the app-wide GZipMiddleware.
+"""
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
+
+import auth
+import crud
+import crud_async as acrud
+import schemas
+from database import DbSession
+from deps import IncidentListing, get_db
+from rendering import etag_for, etag_matches
+
+router = APIRouter(prefix="/api/v1", tags=["api v1"])
+
+any_staff = auth.require_staff(allow_admin=True)
+incident_reviewers = auth.require_staff("committee", "principal", allow_admin=True)
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_type) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+def conditional_json(request: Request, response_type, value) -> Response:
+    """Serialise ``value`` as ``response_type``; 304 if the client's copy is current."""
+    body = _adapter(response_type).dump_json(value)
+    etag = etag_for(body)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Cookie"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+def _not_found(what: str):
+    return HTTPException(status_code=404, detail=f"{what} not found")
+
+def _require_self_or(user: schemas.SessionUser, kind: str, account_id: int, *allowed_kinds: str):
+    if user.kind in allowed_kinds or (user.kind == kind and user.id == account_id):
+        return
+    raise HTTPException(status_code=403, detail="Not allowed for this account")
+
+
+# ─── Incidents ───────────────────────────────────────────────────────────────────
+@router.get("/incidents", response_model=schemas.IncidentPage, dependencies=[Depends(any_staff)])
+async def list_incidents(request: Request, listing: IncidentListing = Depends(), db: DbSession = Depends(get_db)):
+    page = await listing.load(db)
+    return conditional_json(request, schemas.IncidentPage, schemas.IncidentPage(
+        items=page["incidents"], next_cursor=page["next_cursor"],
+    ))
+
+@router.get("/incidents/search", response_model=schemas.IncidentSearchPage, dependencies=[Depends(incident_reviewers)])
+async def search_incidents(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    db: DbSession = Depends(get_db)
+):
+    try:
+        items, next_cursor = await acrud.search_incidents(db, q.strip(), cursor, limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return conditional_json(request, schemas.IncidentSearchPage, schemas.IncidentSearchPage(
+        items=items, next_cursor=next_cursor,
+    ))
+
+@router.get("/incidents/stats", response_model=dict, dependencies=[Depends(incident_reviewers)])
+async def incident_stats(request: Request, db: DbSession = Depends(get_db)):
+    return conditional_json(request, dict, await acrud.get_incident_stats(db))
+
+@router.get("/incidents/{incident_id}", response_model=schemas.Incident)
+async def get_incident(
+    request: Request,
+    incident_id: int,
+    user: schemas.SessionUser = Depends(auth.current_user),
+    db: DbSession = Depends(get_db)
+):
+    incident = await acrud.get_incident_by_id(db, incident_id)
+    if not incident:
+        raise _not_found("Incident")
+    _require_self_or(user, "student", incident.student_id, "admin", "staff")
+    return conditional_json(request, schemas.Incident, schemas.Incident.model_validate(incident))
+
+
+# ─── Students ────────────────────────────────────────────────────────────────────
+@router.get("/students", response_model=schemas.StudentPage, dependencies=[Depends(auth.require_admin)])
+async def list_students(
+    request: Request,
+    q: Optional[str] = Query(None, max_length=100),
+    cursor: Optional[int] = None,
+    limit: int = Query(crud.ROSTER_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    db: DbSession = Depends(get_db)
+):
+    items, next_cursor = await acrud.get_students_page(db, (q or "").strip() or None, cursor, limit)
+    return conditional_json(request, schemas.StudentPage, schemas.StudentPage(items=items, next_cursor=next_cursor))
+
+@router.get("/students/repeat-offenders", response_model=List[schemas.RepeatOffender], dependencies=[Depends(incident_reviewers)])
+async def list_repeat_offenders(
+    request: Request,
+    limit: int = Query(crud.REPEAT_OFFENDER_LIMIT, ge=1, le=crud.MAX_PAGE_SIZE),
+    min_incidents: int = Query(2, ge=1),
+    db: DbSession = Depends(get_db)
+):
+    offenders = await acrud.get_repeat_offenders(db, limit, min_incidents)
+    return conditional_json(request, List[schemas.RepeatOffender], offenders)
+
+@router.get("/students/{student_id}", response_model=schemas.Student)
+async def get_student(
+    request: Request,
+    student_id: int,
+    user: schemas.SessionUser = Depends(auth.current_user),
+    db: DbSession = Depends(get_db)
+):
+    _require_self_or(user, "student", student_id, "admin")
+    student = await acrud.get_student_profile(db, student_id)
+    if not student:
+        raise _not_found("Student")
+    return conditional_json(request, schemas.Student, student)
+
+@router.get("/students/{student_id}/incidents", response_model=List[schemas.Incident])
+async def get_student_incidents(
+    request: Request,
+    student_id: int,
+    user: schemas.SessionUser = Depends(auth.current_user),
+    db: DbSession = Depends(get_db)
+):
+    _require_self_or(user, "student", student_id, "admin", "staff")
+    incidents = await acrud.get_incidents_for_student(db, student_id)
+    return conditional_json(request, List[schemas.Incident], incidents)
+
+@router.get("/students/{student_id}/summary", response_model=schemas.StudentIncidentSummary)
+async def get_student_summary(
+    request: Request,
+    student_id: int,
+    user: schemas.SessionUser = Depends(auth.current_user),
+    db: DbSession = Depends(get_db)
+):
+    _require_self_or(user, "student", student_id, "admin", "staff")
+    summary = await acrud.get_student_summary(db, student_id)
+    return conditional_json(request, schemas.StudentIncidentSummary, summary)
+
+
+# ─── Staff ───────────────────────────────────────────────────────────────────────
+@router.get("/staff", response_model=schemas.StaffMemberPage, dependencies=[Depends(auth.require_admin)])
+async def list_staff(
+    request: Request,
+    q: Optional[str] = Query(None, max_length=100),
+    cursor: Optional[int] = None,
+    limit: int = Query(crud.ROSTER_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    db: DbSession = Depends(get_db)
+):
+    items, next_cursor = await acrud.get_staff_page(db, (q or "").strip() or None, cursor, limit)
+    return conditional_json(request, schemas.StaffMemberPage, schemas.StaffMemberPage(items=items, next_cursor=next_cursor))
+
+@router.get("/staff/{staff_id}", response_model=schemas.StaffMember)
+async def get_staff_member(
+    request: Request,
+    staff_id: int,
+    user: schemas.SessionUser = Depends(auth.current_user),
+    db: DbSession = Depends(get_db)
+):
+    _require_self_or(user, "staff", staff_id, "admin")
+    staff = await acrud.get_staff_profile(db, staff_id)
+    if not staff:
+        raise _not_found("Staff")
+    return conditional_json(request, schemas.StaffMember, staff)
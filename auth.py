@@ -0,0 +1,153 @@
+"""Signed session cookie and the FastAPI dependencies built on it.
+
+The cookie carries the account id, kind ("admin", "student", "staff") and
+staff role, signed with SESSION_SECRET, so identifying the caller never
+touches the database. Pages that also show the account name go through
+``cached_account``, which reads the student/staff row through the shared
+read-through cache (see cache.py).
+"""
+import logging
+import os
+import secrets
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+import crud_async as acrud
+import schemas
+from database import env_bool
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE = "session"
+SESSION_MAX_AGE = int(os.getenv("SESSION_MAX_AGE", 8 * 60 * 60))  # seconds
+SESSION_COOKIE_SECURE = env_bool("SESSION_COOKIE_SECURE", False)
+
+SESSION_SECRET = os.getenv("SESSION_SECRET")
+if not SESSION_SECRET:
+    # Sessions will not survive a restart or work across workers without a
+    # shared secret; fine for local development only.
+    logger.warning("SESSION_SECRET is not set; using a random per-process secret")
+    SESSION_SECRET = secrets.token_urlsafe(32)
+
+_serializer = URLSafeTimedSerializer(SESSION_SECRET, salt="session")
+
+# Bearer token that lets a metrics scraper read /metrics and the *_stats
+# endpoints without an admin session; unset means admin sessions only
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+FLASH_COOKIE = "flash"
+FLASH_MAX_AGE = 60  # seconds; the message is shown on the page the redirect lands on
+_flash_serializer = URLSafeTimedSerializer(SESSION_SECRET, salt="flash")
+
+
+class LoginRequired(Exception):
+    """Raised by the session dependencies; main.py turns it into a redirect to /login."""
+
+
+def create_session_token(user: schemas.SessionUser) -> str:
+    return _serializer.dumps(user.model_dump())
+
+def read_session_token(token: str) -> Optional[schemas.SessionUser]:
+    try:
+        data = _serializer.loads(token, max_age=SESSION_MAX_AGE)
+    except BadSignature:
+        return None
+    return schemas.SessionUser(**data)
+
+def set_session_cookie(response, user: schemas.SessionUser):
+    response.set_cookie(
+        SESSION_COOKIE,
+        create_session_token(user),
+        max_age=SESSION_MAX_AGE,
+        httponly=True,
+        samesite="lax",
+        secure=SESSION_COOKIE_SECURE,
+    )
+    return response
+
+def clear_session_cookie(response):
+    response.delete_cookie(SESSION_COOKIE)
+    return response
+
+
+# ─── Flash messages (Post/Redirect/Get) ──────────────────────────────────────────
+# A write route redirects with ``flash(response, message)``; the page it lands on
+# shows ``get_flash(request)`` once and drops the cookie with ``clear_flash``.
+def flash(response, message: str):
+    response.set_cookie(
+        FLASH_COOKIE,
+        _flash_serializer.dumps(message),
+        max_age=FLASH_MAX_AGE,
+        httponly=True,
+        samesite="lax",
+        secure=SESSION_COOKIE_SECURE,
+    )
+    return response
+
+def get_flash(request: Request) -> Optional[str]:
+    token = request.cookies.get(FLASH_COOKIE)
+    if not token:
+        return None
+    try:
+        return _flash_serializer.loads(token, max_age=FLASH_MAX_AGE)
+    except BadSignature:
+        return None
+
+def clear_flash(response):
+    response.delete_cookie(FLASH_COOKIE)
+    return response
+
+
+# ─── Dependencies ────────────────────────────────────────────────────────────────
+def current_user(request: Request) -> schemas.SessionUser:
+    token = request.cookies.get(SESSION_COOKIE)
+    user = read_session_token(token) if token else None
+    if user is None:
+        raise LoginRequired()
+    return user
+
+def require_admin(user: schemas.SessionUser = Depends(current_user)):
+    if user.kind != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return user
+
+def require_student(user: schemas.SessionUser = Depends(current_user)):
+    if user.kind != "student":
+        raise HTTPException(status_code=403, detail="Students only")
+    return user
+
+def require_monitoring(request: Request):
+    """Admin session, or ``Authorization: Bearer $METRICS_TOKEN``.
+
+    Answers 401/403 instead of redirecting to /login, as the callers are
+    usually scrapers and scripts."""
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "")
+        if secrets.compare_digest(supplied.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+            return
+    token = request.cookies.get(SESSION_COOKIE)
+    user = read_session_token(token) if token else None
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    if user.kind != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+def require_staff(*roles: str, allow_admin: bool = False):
+    """Dependency allowing staff with one of ``roles`` (any role if none given)."""
+    def dependency(user: schemas.SessionUser = Depends(current_user)):
+        if allow_admin and user.kind == "admin":
+            return user
+        if user.kind != "staff" or (roles and user.role not in roles):
+            raise HTTPException(status_code=403, detail="Not allowed for this account")
+        return user
+    return dependency
+
+
+# ─── Cached account rows ─────────────────────────────────────────────────────────
+async def cached_account(db, kind: str, account_id: int):
+    """Student/StaffMember schema for a session, or None if the row is gone."""
+    if kind == "student":
+        return await acrud.get_student_profile(db, account_id)
+    return await acrud.get_staff_profile(db, account_id)
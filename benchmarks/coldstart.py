@@ -0,0 +1,83 @@
+"""Worker cold-start time: how long from process launch until the first response.
+
+    python benchmarks/coldstart.py --runs 10
+    DB_WARMUP_CONNECTIONS=5 python benchmarks/coldstart.py --runs 10 --path /login
+
+Each run starts a fresh ``uvicorn main:app`` with the current environment and
+polls --path until it answers. It also times ``import main`` in a separate
+interpreter, which is the part every gunicorn/uvicorn worker repeats. Both
+are reported as median and min in milliseconds; --out writes them as JSON.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def time_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.split()[-1])
+
+
+def time_first_response(port, path, timeout=60):
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(f"http://127.0.0.1:{port}{path}").status_code < 500:
+                        return time.perf_counter() - started
+                except httpx.HTTPError:
+                    pass
+                if server.poll() is not None:
+                    raise RuntimeError(f"server exited with {server.returncode}")
+                time.sleep(0.01)
+        raise RuntimeError(f"no response from {path} within {timeout} s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(samples):
+    return {"median_ms": statistics.median(samples) * 1000, "min_ms": min(samples) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--path", default="/login")
+    parser.add_argument("--out", help="write the result here as JSON")
+    args = parser.parse_args()
+
+    imports = [time_import() for _ in range(args.runs)]
+    boots = [time_first_response(args.port, args.path) for _ in range(args.runs)]
+    result = {
+        "runs": args.runs,
+        "path": args.path,
+        "database_async": os.environ.get("DATABASE_ASYNC", "1"),
+        "import_main": summarize(imports),
+        "first_response": summarize(boots),
+    }
+    for key in ("import_main", "first_response"):
+        print(f"{key:<16} median {result[key]['median_ms']:>7.1f} ms  min {result[key]['min_ms']:>7.1f} ms")
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
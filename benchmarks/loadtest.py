@@ -0,0 +1,131 @@
+"""Closed-loop HTTP load test for comparing the async and sync database paths.
+
+Run against a server you started yourself:
+
+    python benchmarks/loadtest.py --url "http://127.0.0.1:8000/admindashboard" --login admin:admin
+
+or let the script start uvicorn once per mode and print both results:
+
+    python benchmarks/loadtest.py --compare --path /admindashboard --login admin:admin
+
+``--login`` signs in once through /login and sends the session cookie with
+every request; without it only public pages load.
+
+``--compare`` starts ``uvicorn main:app`` with DATABASE_ASYNC=1 and then
+DATABASE_ASYNC=0, using whatever DATABASE_URL is set in the environment.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(url, concurrency, duration, login=None):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        if login:
+            username, _, password = login.partition(":")
+            base_url = httpx.URL(url).copy_with(path="/", query=None)
+            response = await client.post(base_url.join("/login"), data={"username": username, "password": password})
+            if "session" not in client.cookies:
+                raise RuntimeError(f"login as {username!r} failed: HTTP {response.status_code}")
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(base_url + "/", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+def run_server_and_load(mode, args):
+    env = dict(os.environ, DATABASE_ASYNC=mode)
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        wait_until_up(base_url)
+        return asyncio.run(run_load(base_url + args.path, args.concurrency, args.duration, args.login))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def print_result(label, result):
+    print(
+        f"{label:<8} {result['requests']:>8} req  {result['rps']:>9.1f} rps  "
+        f"p50 {result['p50_ms']:>7.1f} ms  p95 {result['p95_ms']:>7.1f} ms  "
+        f"p99 {result['p99_ms']:>7.1f} ms  errors {result['errors']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="full URL to hit (server already running)")
+    parser.add_argument("--compare", action="store_true", help="start uvicorn in async and sync mode")
+    parser.add_argument("--path", default="/admindashboard")
+    parser.add_argument("--login", metavar="USER:PASSWORD", help="sign in before the run")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+
+    if args.compare:
+        for label, mode in (("async", "1"), ("sync", "0")):
+            print_result(label, run_server_and_load(mode, args))
+    elif args.url:
+        print_result("result", asyncio.run(run_load(args.url, args.concurrency, args.duration, args.login)))
+    else:
+        parser.error("pass --url or --compare")
+
+
+if __name__ == "__main__":
+    main()
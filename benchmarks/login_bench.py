@@ -0,0 +1,112 @@
+"""Login throughput benchmark and Argon2 cost tuning.
+
+Hash cost only (no server): how long one verify takes and how many verifies
+per second the hashing pool sustains for a few cost settings:
+
+    python benchmarks/login_bench.py costs
+
+Concurrent POST /login against a running server, using an existing account:
+
+    python benchmarks/login_bench.py http --url http://127.0.0.1:8000 \\
+        --username stu --password secret --concurrency 32 --duration 15
+
+Start that server with a large LOGIN_IP_BURST, or the per-address login
+limit answers most requests with 429 (see ratelimit.py).
+
+Pick the largest PASSWORD_TIME_COST / PASSWORD_MEMORY_COST whose login
+throughput still covers the expected peak login rate per worker.
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from argon2 import PasswordHasher
+
+from loadtest import percentile, print_result
+
+COST_GRID = [
+    # (time_cost, memory_cost KiB, parallelism)
+    (1, 19456, 1),   # OWASP minimum for argon2id
+    (2, 19456, 1),
+    (3, 65536, 4),   # argon2-cffi / RFC 9106 low-memory default
+    (4, 131072, 4),
+]
+
+
+def bench_costs(workers, verifies):
+    print(f"{'time':>4} {'mem KiB':>8} {'par':>3} {'verify ms':>10} {'verifies/s':>11}  ({workers} threads)")
+    for time_cost, memory_cost, parallelism in COST_GRID:
+        hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        stored = hasher.hash("benchmark-password")
+
+        started = time.perf_counter()
+        hasher.verify(stored, "benchmark-password")
+        single = time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            started = time.perf_counter()
+            list(pool.map(lambda _: hasher.verify(stored, "benchmark-password"), range(verifies)))
+            elapsed = time.perf_counter() - started
+        print(f"{time_cost:>4} {memory_cost:>8} {parallelism:>3} {single * 1000:>10.1f} {verifies / elapsed:>11.1f}")
+
+
+async def bench_http(url, username, password, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    form = {"username": username, "password": password}
+
+    async def worker(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.post(url + "/login", data=form)
+                if response.status_code != 303:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(timeout=30, follow_redirects=False) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    costs = sub.add_parser("costs", help="time argon2 verify at several cost settings")
+    costs.add_argument("--workers", type=int, default=4)
+    costs.add_argument("--verifies", type=int, default=64)
+
+    http = sub.add_parser("http", help="concurrent POST /login against a running server")
+    http.add_argument("--url", default="http://127.0.0.1:8000")
+    http.add_argument("--username", required=True)
+    http.add_argument("--password", required=True)
+    http.add_argument("--concurrency", type=int, default=32)
+    http.add_argument("--duration", type=float, default=15.0)
+
+    args = parser.parse_args()
+    if args.command == "costs":
+        bench_costs(args.workers, args.verifies)
+    else:
+        result = asyncio.run(bench_http(args.url, args.username, args.password, args.concurrency, args.duration))
+        print_result("login", result)
+
+
+if __name__ == "__main__":
+    main()
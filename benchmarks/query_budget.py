@@ -0,0 +1,358 @@
+"""Query-budget check: every route against a seeded database, with a maximum
+number of SQL statements per request, and a check that read routes issue
+the same number of statements whatever the row count.
+
+    python -m pytest tests/test_query_budget.py      # as part of the test run
+    python benchmarks/query_budget.py                 # table of every route, async engine
+    DATABASE_ASYNC=0 python benchmarks/query_budget.py
+
+The app runs in-process against a fresh SQLite file with the read-through
+cache disabled (CACHE_TTL=0), so each request shows its uncached query
+count. Every read route (GET) is measured twice: first with one incident,
+student and staff member of each kind, then after SEED_ROWS more of each
+are added. A handler that queries once per row (N+1) issues more
+statements the second time and fails, even if it stays under its budget.
+Write routes are measured once, against the larger database.
+
+A budget is the statement count a handler is written to issue, independent
+of the data: one query per page or aggregate it shows, plus one per write
+it makes (the row, then each summary table maintained with it, then the
+queued job). The check fails if a route goes over budget, grows with the
+data, errors, or has no entry in BUDGETS, so a new route must be added
+there before it passes.
+
+Incident dates are seeded from partitions.listing_start(), so the default
+listings (current academic year only) return the seeded rows.
+
+The repository does not ship the Jinja templates. Without --templates, a
+stub is generated for every template name main.py renders.
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+REPO = Path(__file__).resolve().parent.parent
+SEED_ROWS = 40
+PASSWORD = "budget-password"
+
+# (method, path) -> (role, request kwargs, max queries). Paths use the
+# route templates; {placeholders} are filled from the seeded ids. Reads:
+# one statement per listing, page or aggregate the handler shows (plus the
+# account row on pages that greet the user). Writes: the row itself, each
+# summary table kept in step with it (incident_stats,
+# student_incident_summaries) and the queued notification job, plus the
+# student lookup for incidents.
+BUDGETS = {
+    ("GET", "/"): (None, {}, 0),
+    ("GET", "/login"): (None, {}, 0),
+    ("POST", "/login"): (None, {"data": {"username": "stu", "password": PASSWORD}}, 1),
+    ("GET", "/logout"): ("student", {}, 0),
+    ("GET", "/pool_stats"): ("admin", {}, 0),
+    ("GET", "/cache_stats"): ("admin", {}, 0),
+    ("GET", "/feed_stats"): ("admin", {}, 0),
+    ("GET", "/ratelimit_stats"): ("admin", {}, 0),
+    ("GET", "/metrics"): ("admin", {}, 0),
+    ("GET", "/job_stats"): ("admin", {}, 1),
+    ("GET", "/incident_stats"): ("admin", {}, 1),
+    ("POST", "/incident_stats/rebuild"): ("admin", {}, 7),
+    ("POST", "/student_summaries/rebuild"): ("admin", {}, 4),
+
+    ("GET", "/admindashboard"): ("admin", {}, 2),
+    ("GET", "/staffmembers"): ("admin", {"params": {"q": "f"}}, 1),
+    ("POST", "/add_staff"): ("admin", {"data": {"name": "New", "username": "new_staff", "password": "x", "role": "faculty"}}, 2),
+    ("GET", "/edit_staff/{staff_id}"): ("admin", {}, 1),
+    ("POST", "/update_staff/{staff_id}"): ("admin", {"data": {"name": "Fac", "username": "fac", "password": PASSWORD, "role": "faculty"}}, 2),
+    ("POST", "/delete_staff/{staff_id}"): ("admin", {"path": {"staff_id": "spare_staff_id"}}, 2),
+    ("GET", "/students"): ("admin", {"params": {"q": "s"}}, 1),
+    ("POST", "/add_student"): ("admin", {"data": {"name": "New", "username": "new_student", "password": "x"}}, 2),
+    ("GET", "/edit_student/{student_id}"): ("admin", {}, 1),
+    ("POST", "/update_student/{student_id}"): ("admin", {"data": {"name": "Stu", "username": "stu", "password": PASSWORD}}, 2),
+    ("POST", "/delete_student/{student_id}"): ("admin", {"path": {"student_id": "spare_student_id"}}, 3),
+
+    ("POST", "/import/students"): ("admin", {"files": {"file": ("s.csv", b"name,username,password\nImp,imp_student,x\n", "text/csv")}}, 1),
+    ("POST", "/import/staff"): ("admin", {"files": {"file": ("s.csv", b"name,username,password,role\nImp,imp_staff,x,faculty\n", "text/csv")}}, 1),
+    ("POST", "/import/incidents"): ("admin", {"files": {"file": ("i.ndjson", b'{"student_id": 1, "student_name": "Stu", "class_name": "A", "department": "CS", "incident_date": "{today}", "description": "imported"}\n', "application/x-ndjson")}}, 4),
+    ("GET", "/export/incidents"): ("admin", {}, 1),
+    ("GET", "/incident_feed"): ("committee", {}, 0),
+    ("GET", "/export/students"): ("admin", {}, 1),
+    ("GET", "/export/staff"): ("admin", {}, 1),
+
+    ("GET", "/checkbeststudentawards"): (None, {}, 0),
+    ("GET", "/applyscholarship"): (None, {}, 0),
+    ("GET", "/applybeststudentaward"): (None, {}, 0),
+    ("GET", "/severitylevels"): (None, {}, 0),
+    ("GET", "/checkscholarship"): (None, {}, 0),
+    ("GET", "/departments"): (None, {}, 0),
+    ("GET", "/classes"): (None, {}, 0),
+    ("GET", "/disciplineactions"): ("admin", {"params": {"status": "Action Assigned"}}, 1),
+    ("GET", "/assignactions"): ("admin", {}, 1),
+    ("GET", "/disciplineincidents"): ("admin", {"params": {"department": "CS"}}, 1),
+    ("POST", "/update_incident_status"): ("committee", {"data": {"incident_id": "{incident_id}", "status": "Resolved"}}, 4),
+    ("POST", "/assign_action"): ("committee", {"data": {"incident_id": "{incident_id}", "action": "Detention"}}, 5),
+    ("POST", "/bulk_update_incident_status"): ("committee", {"data": {"incident_id": ["3", "4", "5"], "version": ["1", "1", "1"], "status": "Resolved"}}, 4),
+    ("POST", "/bulk_assign_action"): ("committee", {"data": {"incident_id": ["6", "7", "8"], "version": ["1", "1", "1"], "action": "Detention"}}, 5),
+
+    ("GET", "/studentdashboard"): ("student", {}, 2),
+    ("GET", "/sd_disciplineincidents"): ("student", {}, 2),
+    ("GET", "/sd_viewdisciplineactions"): ("student", {}, 2),
+    ("GET", "/sd_applyscholarship"): ("student", {}, 0),
+    ("GET", "/sd_applyaward"): ("student", {}, 0),
+
+    ("GET", "/principaldashboard"): ("principal", {}, 3),
+    ("GET", "/pd_checkbeststudentawards"): ("principal", {}, 1),
+    ("GET", "/pd_disciplineactions"): ("principal", {}, 2),
+    ("GET", "/pd_checkscholarship"): ("principal", {}, 1),
+    ("GET", "/facultydashboard"): ("faculty", {}, 2),
+    ("GET", "/fd_disciplineincidents"): ("faculty", {}, 2),
+    ("POST", "/fd_submit_incident"): ("faculty", {"data": {"student_id": "{student_id}", "student_name": "Stu", "class_name": "A", "department": "CS", "incident_date": "{today}", "description": "late again"}}, 6),
+    ("GET", "/fd_applybeststudentaward"): ("faculty", {}, 0),
+    ("GET", "/fd_applyscholarship"): ("faculty", {}, 0),
+    ("GET", "/committeedashboard"): ("committee", {}, 2),
+    ("GET", "/cd_disciplineincidents"): ("committee", {}, 2),
+    ("GET", "/cd_assignactions"): ("committee", {}, 2),
+    ("GET", "/cd_disciplineactions"): ("committee", {}, 2),
+    ("GET", "/search_incidents"): ("committee", {"params": {"q": "talking"}}, 2),
+    ("GET", "/repeat_offenders"): ("committee", {}, 1),
+
+    ("GET", "/api/v1/incidents"): ("admin", {"params": {"limit": 10}}, 1),
+    ("GET", "/api/v1/incidents/search"): ("admin", {"params": {"q": "talking"}}, 2),
+    ("GET", "/api/v1/incidents/stats"): ("admin", {}, 1),
+    ("GET", "/api/v1/incidents/{incident_id}"): ("student", {}, 1),
+    ("GET", "/api/v1/students"): ("admin", {}, 1),
+    ("GET", "/api/v1/students/repeat-offenders"): ("admin", {}, 1),
+    ("GET", "/api/v1/students/{student_id}"): ("student", {}, 1),
+    ("GET", "/api/v1/students/{student_id}/summary"): ("student", {}, 1),
+    ("GET", "/api/v1/students/{student_id}/incidents"): ("student", {}, 1),
+    ("GET", "/api/v1/staff"): ("admin", {}, 1),
+    ("GET", "/api/v1/staff/{staff_id}"): ("admin", {}, 1),
+}
+
+ACCOUNTS = {
+    "admin": ("admin", "admin"),
+    "student": ("stu", PASSWORD),
+    "faculty": ("fac", PASSWORD),
+    "committee": ("com", PASSWORD),
+    "principal": ("pri", PASSWORD),
+}
+
+
+class RouteResult(NamedTuple):
+    method: str
+    path: str
+    budget: int
+    status: int
+    queries: int
+    statements: List[str]
+    queries_one_row: Optional[int]  # read routes: count with one row of each kind
+    error: Optional[str]
+
+    @property
+    def failures(self) -> List[str]:
+        route = f"{self.method} {self.path}"
+        if self.error:
+            return [f"{route}: {self.error}"]
+        found = []
+        if self.queries > self.budget:
+            found.append(f"{route}: {self.queries} queries, budget {self.budget}")
+        if self.queries_one_row is not None and self.queries != self.queries_one_row:
+            found.append(
+                f"{route}: {self.queries_one_row} queries with one row, {self.queries} with "
+                f"{SEED_ROWS + 1} (query count grows with the data, N+1?)"
+            )
+        return found
+
+
+def prepare_workdir(workdir: Path, templates):
+    """Chdir into a scratch directory holding templates/ and static/ for main.py."""
+    (workdir / "static").mkdir()
+    if templates:
+        (workdir / "templates").symlink_to(Path(templates).resolve())
+    else:
+        (workdir / "templates").mkdir()
+        source = "\n".join(path.read_text() for path in REPO.glob("*.py"))
+        for name in set(re.findall(r'"(\w+\.html)"', source)):
+            (workdir / "templates" / name).write_text(name)
+    os.chdir(workdir)
+    sys.path.insert(0, str(REPO))
+
+
+def _incident(student_id: int, name: str, day, n: int) -> dict:
+    return {
+        "student_id": student_id, "student_name": name, "class_name": "A", "department": "CS",
+        "incident_date": day, "description": f"talking in class ({n})",
+    }
+
+def seed(crud, schemas, session_factory, security, partitions):
+    """One account per role plus spares, and one incident with an action."""
+    password_hash = security.hash_password(PASSWORD)
+    with session_factory() as db:
+        student = crud.create_student(db, schemas.StudentCreate(name="Stu", username="stu", password=PASSWORD), password_hash)
+        spare_student = crud.create_student(db, schemas.StudentCreate(name="Spare", username="spare", password=PASSWORD), password_hash)
+        staff = {}
+        for role, username in (("faculty", "fac"), ("committee", "com"), ("principal", "pri"), ("faculty", "spare_fac")):
+            staff[username] = crud.create_staff_member(
+                db, schemas.StaffMemberCreate(name=username.title(), username=username, password=PASSWORD, role=role), password_hash
+            )
+        first_day = partitions.listing_start()
+        crud.bulk_create_incidents(db, [(0, _incident(student.id, "Stu", first_day, 0))])
+        crud.assign_action(db, 1, "Warning")
+        return {
+            "student_id": student.id,
+            "spare_student_id": spare_student.id,
+            "staff_id": staff["fac"].id,
+            "spare_staff_id": staff["spare_fac"].id,
+            "incident_id": 1,
+            "today": first_day.isoformat(),
+        }
+
+def grow(crud, schemas, session_factory, security, partitions, ids, rows: int = SEED_ROWS):
+    """Add ``rows`` students, staff and incidents for the seeded student, plus
+    ``rows`` incidents spread two per extra student, a third of them with an
+    action, so every listing, roster and summary has many rows."""
+    password_hash = security.hash_password(PASSWORD)
+    first_day = partitions.listing_start()
+    with session_factory() as db:
+        students = [
+            crud.create_student(db, schemas.StudentCreate(name=f"Extra {n}", username=f"extra_{n}", password=PASSWORD), password_hash)
+            for n in range(rows)
+        ]
+        for n in range(rows):
+            crud.create_staff_member(
+                db, schemas.StaffMemberCreate(name=f"Staff {n}", username=f"staff_{n}", password=PASSWORD, role="faculty"), password_hash
+            )
+        incidents = [_incident(ids["student_id"], "Stu", first_day + timedelta(days=n % 28), n) for n in range(1, rows + 1)]
+        incidents += [
+            _incident(extra.id, extra.name, first_day + timedelta(days=n % 28), n)
+            for n, extra in enumerate(students[:rows // 2] * 2)
+        ]
+        crud.bulk_create_incidents(db, list(enumerate(incidents)))
+        for incident_id in range(rows + 2, 2 * rows + 1, 3):
+            crud.assign_action(db, incident_id, "Warning")
+
+
+def fill(value, ids):
+    if isinstance(value, str):
+        return value.format(**ids) if "{" in value else value
+    if isinstance(value, dict):
+        return {key: fill(item, ids) for key, item in value.items()}
+    return value
+
+
+def _is_read(method: str, path: str) -> bool:
+    return method == "GET" and path != "/logout"
+
+
+def run(workdir: Path, templates=None) -> List[RouteResult]:
+    """Seed a scratch database in ``workdir``, call every route in BUDGETS and
+    return the results; also returns a result for each route missing there."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'budget.db'}"
+    os.environ["CACHE_TTL"] = "0"
+    os.environ["FEED_MAX_SECONDS"] = "0"  # the feed stream ends right after its preamble
+    os.environ["LOGIN_IP_BURST"] = "1000"  # every login here comes from the same test client
+    os.environ["JOBS_INLINE"] = "0"  # queued jobs would run after the response, outside the count
+    os.environ.setdefault("SESSION_SECRET", "query-budget")
+    prepare_workdir(workdir, templates)
+
+    from fastapi.routing import APIRoute
+    from fastapi.testclient import TestClient
+
+    import crud
+    import main as app_module
+    import partitions
+    import schemas
+    import security
+    from database import Base, SessionLocal, engine
+    from querybudget import QueryCounter
+
+    Base.metadata.create_all(bind=engine)  # scratch database; the app itself never creates tables
+    ids = seed(crud, schemas, SessionLocal, security, partitions)
+    client = TestClient(app_module.app)
+    logged_in = {"role": object()}
+
+    def call(method, path):
+        role, kwargs, budget = BUDGETS[(method, path)]
+        kwargs = dict(kwargs)
+        path_ids = {**ids, **{key: ids[name] for key, name in kwargs.pop("path", {}).items()}}
+        url = path.format(**path_ids)
+        if role != logged_in["role"]:
+            client.cookies.clear()
+            if role:
+                username, password = ACCOUNTS[role]
+                client.post("/login", data={"username": username, "password": password}, follow_redirects=False)
+            logged_in["role"] = role
+        if "files" in kwargs:
+            kwargs["files"] = {key: (name, io.BytesIO(body.replace(b"{today}", ids["today"].encode())), kind)
+                               for key, (name, body, kind) in kwargs["files"].items()}
+        with QueryCounter() as counter:
+            response = client.request(method, url, follow_redirects=False, **fill(kwargs, ids))
+        if method == "GET" and path == "/logout" or method == "POST" and path == "/login":
+            logged_in["role"] = object()
+        return response, counter
+
+    # Destructive routes last, so the rows other routes use still exist
+    order = sorted(BUDGETS, key=lambda key: key[1].startswith(("/delete_", "/logout")))
+    one_row, one_row_errors = {}, {}
+    for key in filter(lambda key: _is_read(*key), order):
+        response, counter = call(*key)
+        one_row[key] = counter.count
+        if response.status_code >= 400:
+            one_row_errors[key] = f"HTTP {response.status_code} with one row {response.text[:200]}"
+    grow(crud, schemas, SessionLocal, security, partitions, ids)
+
+    results = []
+    for method, path in order:
+        response, counter = call(method, path)
+        error = one_row_errors.get((method, path))
+        if response.status_code >= 400:
+            error = f"HTTP {response.status_code} {response.text[:200]}"
+        results.append(RouteResult(
+            method, path, BUDGETS[(method, path)][2], response.status_code, counter.count,
+            counter.statements, one_row.get((method, path)), error,
+        ))
+
+    routes = {
+        (method, route.path)
+        for route in app_module.app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+    for method, path in sorted(routes - BUDGETS.keys()):
+        results.append(RouteResult(method, path, 0, 0, 0, [], None, "no entry in BUDGETS"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--templates", help="directory with the real Jinja templates")
+    parser.add_argument("--verbose", action="store_true", help="print the statements of every route")
+    args = parser.parse_args()
+
+    results = run(Path(tempfile.mkdtemp(prefix="query-budget-")), args.templates)
+    failures = []
+    print(f"{'route':<48} {'status':>6} {'1 row':>6} {'queries':>7} {'budget':>6}")
+    for result in results:
+        failed = result.failures
+        failures += failed
+        if result.error == "no entry in BUDGETS":
+            continue
+        one_row = "" if result.queries_one_row is None else result.queries_one_row
+        flag = "  FAILED" if failed else ""
+        print(f"{result.method + ' ' + result.path:<48} {result.status:>6} {one_row:>6} "
+              f"{result.queries:>7} {result.budget:>6}{flag}")
+        if args.verbose or failed:
+            for sql in result.statements:
+                print(f"    {sql[:160]}")
+
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print(f"\nall {len(BUDGETS)} routes within budget")
+
+
+if __name__ == "__main__":
+    main()
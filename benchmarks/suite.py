@@ -0,0 +1,280 @@
+"""Scenario benchmark suite: login, dashboards, incident submission and status updates.
+
+Seed a database first (benchmarks/seed.py), then either point the suite at a
+running server:
+
+    python benchmarks/suite.py run --url http://127.0.0.1:8000 --out before.json
+
+or let it start ``uvicorn main:app`` with the current environment:
+
+    DATABASE_URL=sqlite:///./bench.db python benchmarks/suite.py run --serve --out after.json
+
+Each scenario runs for --duration seconds with --concurrency closed-loop
+clients. Each client is logged in as its own seeded account. The JSON report
+records per-scenario p50/p95/p99 and rps, together with the git commit, the
+database backend and the dataset (size and the seed's --as-of date). Compare two reports with:
+
+    python benchmarks/suite.py compare before.json after.json
+
+Write scenarios add incidents and change statuses, so reseed before runs
+that must be strictly comparable. All clients share one address, so start
+the server with a large LOGIN_IP_BURST (--serve does this) or the login
+scenario measures 429s.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from loadtest import percentile, wait_until_up
+from seed import BENCH_PASSWORD, CLASSES, DEPARTMENTS, STATUS_WEIGHTS, WORDS
+
+REPO = Path(__file__).resolve().parent.parent
+STATUSES = [status.value for status in STATUS_WEIGHTS]
+
+
+class Scenario:
+    """One request shape, issued repeatedly by clients logged in as ``role``."""
+
+    def __init__(self, name, role, method, path, form=None):
+        self.name = name
+        self.role = role
+        self.method = method
+        self.path = path
+        self.form = form
+
+    async def send(self, client, rng, dataset):
+        data = self.form(rng, dataset) if self.form else None
+        return await client.request(self.method, self.path, data=data)
+
+
+def _login_form(rng, dataset):
+    return {"username": f"student{rng.randint(1, dataset['students'])}", "password": BENCH_PASSWORD}
+
+
+def _incident_form(rng, dataset):
+    student = rng.randint(1, dataset["students"])
+    return {
+        "student_id": student,
+        "student_name": f"Student {student}",
+        "class_name": rng.choice(CLASSES),
+        "department": rng.choice(DEPARTMENTS),
+        "incident_date": dataset["as_of"],
+        "description": " ".join(rng.choices(WORDS, k=12)),
+    }
+
+
+def _status_form(rng, dataset):
+    return {"incident_id": rng.randint(1, dataset["incidents"]), "status": rng.choice(STATUSES)}
+
+
+SCENARIOS = [
+    Scenario("login", None, "POST", "/login", _login_form),
+    Scenario("admin_dashboard", "admin", "GET", "/admindashboard"),
+    Scenario("principal_dashboard", "principal", "GET", "/principaldashboard"),
+    Scenario("faculty_dashboard", "faculty", "GET", "/facultydashboard"),
+    Scenario("committee_dashboard", "committee", "GET", "/committeedashboard"),
+    Scenario("student_dashboard", "student", "GET", "/studentdashboard"),
+    Scenario("submit_incident", "faculty", "POST", "/fd_submit_incident", _incident_form),
+    Scenario("update_status", "committee", "POST", "/update_incident_status", _status_form),
+]
+
+
+async def _login(client, role, n):
+    if role == "admin":
+        form = {"username": "admin", "password": "admin"}
+    else:
+        form = {"username": f"{role}{n}", "password": BENCH_PASSWORD}
+    response = await client.post("/login", data=form)
+    if response.status_code != 303:
+        raise RuntimeError(f"login as {form['username']} failed with {response.status_code}")
+
+
+async def run_scenario(base_url, scenario, dataset, concurrency, duration, seed):
+    latencies = []
+    errors = 0
+    accounts = dataset["students"] if scenario.role == "student" else dataset["staff_per_role"]
+
+    async def worker(client, rng):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await scenario.send(client, rng, dataset)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    clients = [httpx.AsyncClient(base_url=base_url, timeout=30) for _ in range(concurrency)]
+    try:
+        # Sign every client in before the clock starts; logins are measured by their own scenario.
+        if scenario.role:
+            await asyncio.gather(*(
+                _login(client, scenario.role, n % accounts + 1) for n, client in enumerate(clients)
+            ))
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(
+            worker(client, random.Random(f"{seed}:{scenario.name}:{n}")) for n, client in enumerate(clients)
+        ))
+        elapsed = time.perf_counter() - started
+    finally:
+        for client in clients:
+            await client.aclose()
+
+    if not latencies:
+        return {"requests": 0, "errors": errors, "rps": 0.0}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+async def fetch_dataset(base_url, args):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        await _login(client, "admin", 0)
+        response = await client.get("/api/v1/incidents/stats")
+        response.raise_for_status()
+    return {
+        "incidents": response.json()["total"],
+        "students": args.students or max(50, response.json()["total"] // 20),
+        "staff_per_role": args.staff_per_role,
+        "as_of": args.as_of.isoformat(),
+    }
+
+
+def git_revision():
+    def git(*argv):
+        return subprocess.run(["git", *argv], cwd=REPO, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def database_backend():
+    # Same default as database.py.
+    url = os.environ.get("DATABASE_URL", "postgresql://")
+    return url.split(":", 1)[0].split("+", 1)[0]
+
+
+async def run_suite(base_url, args):
+    dataset = await fetch_dataset(base_url, args)
+    selected = [s for s in SCENARIOS if not args.only or s.name in args.only]
+    results = {}
+    for scenario in selected:
+        result = await run_scenario(base_url, scenario, dataset, args.concurrency, args.duration, args.seed)
+        results[scenario.name] = result
+        print_line(scenario.name, result)
+    return {
+        "git": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": database_backend(),
+        "database_async": os.environ.get("DATABASE_ASYNC", "1"),
+        "dataset": dataset,
+        "params": {"concurrency": args.concurrency, "duration": args.duration, "seed": args.seed},
+        "scenarios": results,
+    }
+
+
+def serve_and_run(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=REPO,
+        env={"LOGIN_IP_BURST": "1000000", **os.environ},
+    )
+    try:
+        wait_until_up(base_url)
+        return asyncio.run(run_suite(base_url, args))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def print_line(name, result):
+    if not result["requests"]:
+        print(f"{name:<20} no requests completed  errors {result['errors']}")
+        return
+    print(
+        f"{name:<20} {result['requests']:>7} req  {result['rps']:>8.1f} rps  "
+        f"p50 {result['p50_ms']:>7.1f} ms  p95 {result['p95_ms']:>7.1f} ms  "
+        f"p99 {result['p99_ms']:>7.1f} ms  errors {result['errors']}"
+    )
+
+
+def compare(before_path, after_path):
+    before = json.loads(Path(before_path).read_text())
+    after = json.loads(Path(after_path).read_text())
+    print(f"before {before['git']['commit'][:10]}  after {after['git']['commit'][:10]}")
+    if before["dataset"] != after["dataset"] or before["database"] != after["database"]:
+        print("warning: reports were taken on different datasets or databases")
+    print(f"{'scenario':<20} {'rps':>17} {'p50 ms':>19} {'p95 ms':>19} {'p99 ms':>19}")
+    for name, new in after["scenarios"].items():
+        old = before["scenarios"].get(name)
+        if not old or not old["requests"] or not new["requests"]:
+            print(f"{name:<20} (not comparable)")
+            continue
+        cells = [
+            f"{old[key]:>7.1f} → {new[key]:>7.1f} {(new[key] - old[key]) / old[key]:>+6.0%}"
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms")
+        ]
+        print(f"{name:<20} " + " ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the scenarios and write a JSON report")
+    run.add_argument("--url", help="base URL of a running server")
+    run.add_argument("--serve", action="store_true", help="start uvicorn main:app for the run")
+    run.add_argument("--port", type=int, default=8765)
+    run.add_argument("--workers", type=int, default=1)
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--duration", type=float, default=10.0)
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--students", type=int, help="as passed to seed.py (default: same formula)")
+    run.add_argument("--staff-per-role", type=int, default=20, help="as passed to seed.py")
+    run.add_argument("--as-of", type=date.fromisoformat, default=date.today(),
+                     help="as passed to seed.py; also the date of submitted incidents")
+    run.add_argument("--only", nargs="+", choices=[s.name for s in SCENARIOS])
+    run.add_argument("--out", help="write the JSON report here")
+
+    diff = commands.add_parser("compare", help="compare two JSON reports")
+    diff.add_argument("before")
+    diff.add_argument("after")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        compare(args.before, args.after)
+        return
+    if args.serve:
+        report = serve_and_run(args)
+    elif args.url:
+        report = asyncio.run(run_suite(args.url.rstrip("/"), args))
+    else:
+        parser.error("pass --url or --serve")
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
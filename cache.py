@@ -0,0 +1,197 @@
+"""Read-through cache for crud reads, invalidated by namespace on writes.
+
+Cached values live under a namespace ("incidents", "students", "staff",
+"student_incidents:<id>"). Every namespace has a generation counter that
+is part of each key; crud write functions call ``invalidate`` which bumps
+the counter, so all entries of that namespace become unreachable at once
+and age out of the LRU.
+
+The default backend is an in-process LRU with TTL, so invalidation is seen
+immediately by the worker that wrote and by the others once their entries
+expire (CACHE_TTL). Set CACHE_URL=redis://... to share entries and
+generations between workers.
+"""
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import database
+
+CACHE_TTL = float(os.getenv("CACHE_TTL", 30))  # seconds, 0 disables caching
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", 2048))
+CACHE_URL = os.getenv("CACHE_URL")
+
+MISSING = object()
+
+
+class TTLCache:
+    """In-process LRU cache whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is MISSING:
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MemoryBackend:
+    def __init__(self, ttl: float, maxsize: int):
+        self.entries = TTLCache(ttl, maxsize)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    def bump(self, namespace: str):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, ttl: float):
+        self.entries.set(key, value, ttl)
+
+    def info(self) -> dict:
+        return {"backend": "memory", "size": len(self.entries), "evictions": self.entries.evictions}
+
+
+class RedisBackend:
+    """Shared backend; values are pickled, so only point it at a trusted Redis."""
+
+    def __init__(self, url: str, prefix: str = "cache:"):
+        import redis  # optional dependency, only needed with CACHE_URL
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def generation(self, namespace: str) -> int:
+        return int(self.client.get(f"{self.prefix}gen:{namespace}") or 0)
+
+    def bump(self, namespace: str):
+        self.client.incr(f"{self.prefix}gen:{namespace}")
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return MISSING if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl: float):
+        self.client.set(self.prefix + key, pickle.dumps(value), px=int(ttl * 1000))
+
+    def info(self) -> dict:
+        return {"backend": "redis"}
+
+
+class ReadThroughCache:
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get_or_load(self, namespace: str, key: str, loader, keep=None):
+        """Cached value for ``key``, else ``loader()``; stored unless ``keep()`` is false."""
+        if not self.enabled:
+            return loader()
+        full_key = f"{namespace}:{self.backend.generation(namespace)}:{key}"
+        value = self.backend.get(full_key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = loader()
+        if keep is None or keep():
+            self.backend.set(full_key, value, self.ttl)
+        return value
+
+    def invalidate(self, *namespaces: str):
+        for namespace in namespaces:
+            self.backend.bump(namespace)
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "pid": os.getpid(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            **self.backend.info(),
+        }
+
+
+def read_through(namespace):
+    """Cache a crud read ``fn(db, *args)`` under ``namespace``.
+
+    ``namespace`` is a string or a callable receiving the same arguments as
+    ``fn`` minus ``db``. The key is the repr of those arguments, so they must
+    have a stable repr (ints, strings, pydantic models). The wrapped function
+    must return plain data (schemas, not ORM rows): cached values outlive the
+    session that loaded them.
+
+    With read replicas, a client pinned to the primary after a write skips
+    the cache entirely, and a result served by a replica is returned but not
+    stored: the replica may not have the write that bumped the generation
+    yet, and the stale rows would be cached under the new one.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(db, *args, **kwargs):
+            if database.reads_pinned(db):
+                return fn(db, *args, **kwargs)
+            ns = namespace(*args, **kwargs) if callable(namespace) else namespace
+            key = f"{fn.__name__}:{args!r}:{sorted(kwargs.items())!r}"
+            database.replica_served(db)  # drop a flag left by an earlier uncached read
+            return cache.get_or_load(
+                ns, key, lambda: fn(db, *args, **kwargs), keep=lambda: not database.replica_served(db),
+            )
+        return wrapper
+    return decorator
+
+
+cache = ReadThroughCache(
+    RedisBackend(CACHE_URL) if CACHE_URL else MemoryBackend(CACHE_TTL, CACHE_MAXSIZE),
+    CACHE_TTL,
+)
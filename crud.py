@@ -1,5 +1,21 @@
-from sqlalchemy.orm import Session
-import models, schemas
+import base64
+from collections import Counter
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import String, and_, case, cast, delete, func, insert, literal, literal_column, null, or_, select, tuple_, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.exc import StaleDataError
+import feed, jobs, models, partitions, schemas, search
+from cache import cache, read_through
+from database import replica_reads
+
+
+# Cache namespaces invalidated by the write functions below
+def student_incidents_namespace(student_id) -> str:
+    return f"student_incidents:{student_id}"
 
 # ─── User (for your existing /users APIs) ────────────────────────────────────────
 def create_user(db: Session, user: schemas.UserCreate):
@@ -14,62 +30,843 @@ def get_users(db: Session):
 
 
 # ─── Student ─────────────────────────────────────────────────────────────────────
-def create_student(db: Session, student: schemas.StudentCreate):
+# Passwords arrive already hashed (security.hash_password_async) so the
+# expensive hash never runs on the event loop inside a DB call.
+def create_student(db: Session, student: schemas.StudentCreate, password_hash: str):
     db_student = models.Student(
         name=student.name,
         username=student.username,
-        password=student.password  # TODO: hash in production
+        password=password_hash
     )
     db.add(db_student)
     db.commit()
     db.refresh(db_student)
+    cache.invalidate("students")
     return db_student
 
-def get_student_by_credentials(db: Session, username: str, password: str):
-    return (
-        db.query(models.Student)
-          .filter(
-              models.Student.username == username,
-              models.Student.password == password
-          )
-          .first()
-    )
-
 def get_student_by_id(db: Session, student_id: int):
     return db.query(models.Student).filter(models.Student.id == student_id).first()
 
+@read_through("students")
+@replica_reads
+def get_student_profile(db: Session, student_id: int):
+    db_student = get_student_by_id(db, student_id)
+    return schemas.Student.model_validate(db_student) if db_student else None
+
+def update_student(db: Session, student_id: int, student: schemas.StudentCreate, password_hash: str):
+    db_student = get_student_by_id(db, student_id)
+    if db_student:
+        db_student.name = student.name
+        db_student.username = student.username
+        db_student.password = password_hash
+        db.commit()
+        cache.invalidate("students")
+    return db_student
+
+def delete_student(db: Session, student_id: int):
+    db_student = get_student_by_id(db, student_id)
+    if db_student:
+        db.delete(db_student)
+        # ON DELETE CASCADE on Postgres; SQLite does not enforce foreign keys
+        db.query(models.StudentIncidentSummary).filter(models.StudentIncidentSummary.student_id == student_id).delete()
+        db.commit()
+        # discipline_incidents.student_id is ON DELETE SET NULL
+        cache.invalidate("students", "incidents", student_incidents_namespace(student_id))
+    return db_student
+
 
 # ─── StaffMember ─────────────────────────────────────────────────────────────────
-def create_staff_member(db: Session, staff: schemas.StaffMemberCreate):
+def create_staff_member(db: Session, staff: schemas.StaffMemberCreate, password_hash: str):
     db_obj = models.StaffMember(
         name=staff.name,
         username=staff.username,
-        password=staff.password,  # TODO: hash in production
+        password=password_hash,
         role=staff.role
     )
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    cache.invalidate("staff")
     return db_obj
 
-def get_staff_by_credentials(db: Session, username: str, password: str):
-    return (
-        db.query(models.StaffMember)
-          .filter(
-              models.StaffMember.username == username,
-              models.StaffMember.password == password
-          )
-          .first()
-    )
-
 def get_staff_by_id(db: Session, staff_id: int):
     return db.query(models.StaffMember).filter(models.StaffMember.id == staff_id).first()
+
+@read_through("staff")
+@replica_reads
+def get_staff_profile(db: Session, staff_id: int):
+    db_obj = get_staff_by_id(db, staff_id)
+    return schemas.StaffMember.model_validate(db_obj) if db_obj else None
+
+def update_staff_member(db: Session, staff_id: int, staff: schemas.StaffMemberCreate, password_hash: str):
+    db_obj = get_staff_by_id(db, staff_id)
+    if db_obj:
+        db_obj.name = staff.name
+        db_obj.username = staff.username
+        db_obj.password = password_hash
+        db_obj.role = staff.role
+        db.commit()
+        cache.invalidate("staff")
+    return db_obj
+
+def delete_staff_member(db: Session, staff_id: int):
+    db_obj = get_staff_by_id(db, staff_id)
+    if db_obj:
+        db.delete(db_obj)
+        db.commit()
+        cache.invalidate("staff")
+    return db_obj
+
+
+# ─── Accounts (login) ────────────────────────────────────────────────────────────
+def get_accounts_by_username(db: Session, username: str):
+    """Student and staff rows for ``username`` in one round trip.
+
+    Rows are (kind, id, password, role), students first, matching the order
+    the login form has always checked them in.
+    """
+    students = (
+        select(
+            literal("student").label("kind"),
+            models.Student.id,
+            models.Student.password,
+            cast(null(), String).label("role"),
+        )
+        .where(models.Student.username == username)
+    )
+    staff = (
+        select(
+            literal("staff").label("kind"),
+            models.StaffMember.id,
+            models.StaffMember.password,
+            models.StaffMember.role,
+        )
+        .where(models.StaffMember.username == username)
+    )
+    return db.execute(union_all(students, staff)).all()
+
+def set_password_hash(db: Session, kind: str, account_id: int, password_hash: str):
+    model = models.Student if kind == "student" else models.StaffMember
+    db.query(model).filter(model.id == account_id).update({model.password: password_hash})
+    db.commit()
+
+
+# ─── DisciplineIncident ──────────────────────────────────────────────────────────
 def create_incident(db: Session, incident: schemas.IncidentCreate):
-    db_incident = models.DisciplineIncident(**incident.dict())
+    """Record a new pending incident; None if ``incident.student_id`` names no student."""
+    # Checked up front because SQLite does not enforce the foreign key
+    if db.get(models.Student, incident.student_id) is None:
+        return None
+    db_incident = models.DisciplineIncident(
+        **incident.model_dump(), status=models.IncidentStatus.PENDING
+    )
     db.add(db_incident)
+    try:
+        apply_stat_deltas(db, incident_stat_buckets(db_incident))
+        apply_summary_deltas(db, add_incident_summary({}, db_incident))
+        db.flush()
+    except IntegrityError:  # the student was deleted since the check
+        db.rollback()
+        return None
+    feed.publish(db, [feed.incident_event("incident.created", db_incident)])
+    jobs.enqueue(db, "incident_created", [{"incident_id": db_incident.id}])
     db.commit()
     db.refresh(db_incident)
+    cache.invalidate("incidents", student_incidents_namespace(db_incident.student_id))
     return db_incident
 
-def get_all_incidents(db: Session):
-    return db.query(models.DisciplineIncident).all()
+def get_incident_by_id(db: Session, incident_id: int):
+    return (
+        db.query(models.DisciplineIncident)
+          .filter(models.DisciplineIncident.id == incident_id)
+          .first()
+    )
+
+@read_through(student_incidents_namespace)
+@replica_reads
+def get_incidents_for_student(db: Session, student_id: int):
+    Incident = models.DisciplineIncident
+    rows = (
+        db.query(Incident)
+          .filter(Incident.student_id == student_id)
+          .order_by(Incident.incident_date.desc(), Incident.id.desc())
+          .all()
+    )
+    return [schemas.Incident.model_validate(r) for r in rows]
+
+@read_through("incidents")
+@replica_reads
+def get_incidents_with_actions(db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """Incidents with an assigned action; the current academic year(s) unless
+    a date range is given, like filter_incidents."""
+    Incident = models.DisciplineIncident
+    query = (
+        db.query(Incident)
+          .filter(Incident.status == models.IncidentStatus.ACTION_ASSIGNED)
+          .filter(Incident.incident_date >= (date_from or partitions.listing_start()))
+    )
+    if date_to:
+        query = query.filter(Incident.incident_date <= date_to)
+    rows = query.order_by(Incident.incident_date.desc(), Incident.id.desc()).all()
+    return [schemas.Incident.model_validate(r) for r in rows]
+
+def update_incident_status(db: Session, incident_id: int, status: models.IncidentStatus):
+    incident = get_incident_by_id(db, incident_id)
+    if incident:
+        apply_stat_deltas(db, status_change_deltas(incident.status, status))
+        apply_summary_deltas(db, add_status_change_summary({}, incident.student_id, incident.status, status))
+        incident.status = status
+        student_id = incident.student_id  # read before commit expires it
+        if not _commit_versioned(db, incident):
+            return None
+        cache.invalidate("incidents", student_incidents_namespace(student_id))
+    return incident
+
+def assign_action(db: Session, incident_id: int, action: str):
+    incident = get_incident_by_id(db, incident_id)
+    if incident:
+        apply_stat_deltas(db, status_change_deltas(incident.status, models.IncidentStatus.ACTION_ASSIGNED))
+        apply_summary_deltas(db, add_status_change_summary(
+            {}, incident.student_id, incident.status, models.IncidentStatus.ACTION_ASSIGNED, action=action,
+        ))
+        incident.status = models.IncidentStatus.ACTION_ASSIGNED
+        incident.action = action
+        student_id = incident.student_id
+        jobs.enqueue(db, "action_assigned", [{"incident_id": incident_id}])
+        if not _commit_versioned(db, incident):
+            return None
+        cache.invalidate("incidents", student_incidents_namespace(student_id))
+    return incident
+
+def _commit_versioned(db: Session, incident: models.DisciplineIncident) -> bool:
+    # The ORM flush checks the incident's version; someone else updated it
+    # between our read and this commit, so drop this change (and its stat deltas).
+    try:
+        db.flush()
+        feed.publish(db, [feed.incident_event("incident.status_changed", incident)])
+        db.commit()
+        return True
+    except StaleDataError:
+        db.rollback()
+        return False
+
+
+# ─── Bulk committee updates (optimistic concurrency) ─────────────────────────────
+MAX_BULK_INCIDENTS = 500
+
+
+class BulkUpdateResult(NamedTuple):
+    updated: List[int]    # incident ids that were changed
+    conflicts: List[int]  # ids changed (or deleted) since the caller loaded them
+
+
+def _bulk_update_incidents(
+    db: Session, versions: Dict[int, int], new_status: models.IncidentStatus, job_kind: Optional[str] = None, **values
+) -> BulkUpdateResult:
+    """Set ``new_status`` (and ``values``) in one UPDATE on the incidents still at ``versions``.
+
+    ``versions`` maps incident id to the version the caller saw. Rows whose
+    version has moved on were changed by someone else and are left alone.
+    With ``job_kind``, one background job per updated incident is enqueued.
+    """
+    Incident = models.DisciplineIncident
+    if not versions:
+        return BulkUpdateResult(updated=[], conflicts=[])
+    matches = tuple_(Incident.id, Incident.version).in_(sorted(versions.items()))
+
+    # A row still at the expected version is unchanged since this read, so its
+    # old status is right for the stat deltas of every row the UPDATE hits.
+    before = {
+        row.id: row for row in db.execute(
+            select(
+                Incident.id, Incident.version, Incident.status, Incident.action, Incident.student_id,
+                Incident.department, Incident.class_name, Incident.incident_date,
+            ).where(matches)
+        )
+    }
+    if not before:
+        return BulkUpdateResult(updated=[], conflicts=sorted(versions))
+    matches = tuple_(Incident.id, Incident.version).in_(sorted((i, versions[i]) for i in before))
+    stmt = (
+        update(Incident)
+        .where(matches)
+        .values(status=new_status, version=Incident.version + 1, **values)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        updated = db.execute(stmt.returning(Incident.id)).scalars().all()
+    else:
+        db.execute(stmt)
+        bumped = [(incident_id, versions[incident_id] + 1) for incident_id in before]
+        updated = db.execute(
+            select(Incident.id).where(tuple_(Incident.id, Incident.version).in_(bumped))
+        ).scalars().all()
+
+    deltas, summaries = Counter(), {}
+    for incident_id in updated:
+        row = before[incident_id]
+        deltas.update(status_change_deltas(row.status, new_status))
+        add_status_change_summary(summaries, row.student_id, row.status, new_status, action=values.get("action"))
+    apply_stat_deltas(db, deltas)
+    apply_summary_deltas(db, summaries)
+    feed.publish(db, [
+        feed.incident_event(
+            "incident.status_changed", before[incident_id],
+            version=before[incident_id].version + 1, status=str(new_status), **values,
+        )
+        for incident_id in sorted(updated)
+    ])
+    if job_kind:
+        jobs.enqueue(db, job_kind, [{"incident_id": incident_id} for incident_id in sorted(updated)])
+    db.commit()
+
+    if updated:
+        cache.invalidate("incidents", *{
+            student_incidents_namespace(before[incident_id].student_id) for incident_id in updated
+        })
+    return BulkUpdateResult(
+        updated=sorted(updated),
+        conflicts=sorted(versions.keys() - set(updated)),
+    )
+
+def bulk_update_incident_status(db: Session, versions: Dict[int, int], status: models.IncidentStatus) -> BulkUpdateResult:
+    return _bulk_update_incidents(db, versions, status)
+
+def bulk_assign_action(db: Session, versions: Dict[int, int], action: str) -> BulkUpdateResult:
+    return _bulk_update_incidents(
+        db, versions, models.IncidentStatus.ACTION_ASSIGNED, job_kind="action_assigned", action=action,
+    )
+
+
+# ─── Background jobs ─────────────────────────────────────────────────────────────
+def get_job_counts(db: Session) -> dict:
+    return jobs.job_counts(db)
+
+
+# ─── Incident statistics (incident_stats summary table) ──────────────────────────
+# Dashboards read pre-aggregated counts instead of counting every incident.
+# Each incident write adjusts the affected (dimension, bucket) rows in its own
+# transaction; rebuild_incident_stats recomputes everything with GROUP BY.
+STAT_DIMENSIONS = ("status", "department", "class_name", "month")
+
+def incident_stat_buckets(incident: models.DisciplineIncident) -> Counter:
+    month = incident.incident_date.strftime("%Y-%m") if incident.incident_date else ""
+    return Counter({
+        ("status", str(incident.status)): 1,
+        ("department", incident.department or ""): 1,
+        ("class_name", incident.class_name or ""): 1,
+        ("month", month): 1,
+    })
+
+def status_change_deltas(old_status, new_status) -> Counter:
+    if old_status == new_status:
+        return Counter()
+    return Counter({("status", str(old_status)): -1, ("status", str(new_status)): 1})
+
+def apply_stat_deltas(db: Session, deltas: Counter):
+    # Sorted so concurrent writers lock the summary rows in the same order
+    values = [
+        {"dimension": dimension, "bucket": bucket, "count": delta}
+        for (dimension, bucket), delta in sorted(deltas.items()) if delta
+    ]
+    if not values:
+        return
+    Stat = models.IncidentStat
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(Stat).values(values)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[Stat.dimension, Stat.bucket],
+            set_={"count": Stat.count + stmt.excluded["count"]},
+        ))
+        return
+    for value in values:
+        updated = (
+            db.query(Stat)
+              .filter(Stat.dimension == value["dimension"], Stat.bucket == value["bucket"])
+              .update({Stat.count: Stat.count + value["count"]})
+        )
+        if not updated:
+            db.add(Stat(**value))
+    db.flush()
+
+def _month_bucket(db: Session):
+    column = models.DisciplineIncident.incident_date
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m", column)
+    return func.to_char(column, "YYYY-MM")
+
+def compute_incident_stats(db: Session) -> dict:
+    """Live GROUP BY breakdown straight from discipline_incidents."""
+    Incident = models.DisciplineIncident
+    bucket_columns = {
+        "status": Incident.status,
+        "department": Incident.department,
+        "class_name": Incident.class_name,
+        "month": _month_bucket(db),
+    }
+    stats = {}
+    for dimension, column in bucket_columns.items():
+        buckets = stats[dimension] = Counter()
+        for bucket, count in db.execute(select(column, func.count()).group_by(column)):
+            buckets["" if bucket is None else str(bucket)] += count
+    return stats
+
+def rebuild_incident_stats(db: Session):
+    Stat = models.IncidentStat
+    db.execute(delete(Stat))
+    db.add_all(
+        Stat(dimension=dimension, bucket=bucket, count=count)
+        for dimension, buckets in compute_incident_stats(db).items()
+        for bucket, count in buckets.items()
+    )
+    db.commit()
+    cache.invalidate("incidents")
+
+@read_through("incidents")
+@replica_reads
+def get_incident_stats(db: Session) -> dict:
+    stats = {dimension: {} for dimension in STAT_DIMENSIONS}
+    rows = (
+        db.query(models.IncidentStat)
+          .filter(models.IncidentStat.count > 0)
+          .order_by(models.IncidentStat.dimension, models.IncidentStat.bucket)
+          .all()
+    )
+    for row in rows:
+        stats.setdefault(row.dimension, {})[row.bucket] = row.count
+    stats["total"] = sum(stats["status"].values())
+    return stats
+
+
+# ─── Student incident summaries (student_incident_summaries table) ───────────────
+# One row per student with incidents, read by the student pages and the repeat
+# offender view instead of scanning discipline_incidents. Incident writes build
+# per-student deltas with the add_* helpers and apply them in their own
+# transaction, like incident_stats; rebuild_student_summaries recomputes them.
+OPEN_STATUSES = frozenset({
+    models.IncidentStatus.PENDING,
+    models.IncidentStatus.UNDER_REVIEW,
+    models.IncidentStatus.ACTION_ASSIGNED,
+})
+REPEAT_OFFENDER_LIMIT = 20
+
+def _summary_delta(deltas: dict, student_id: Optional[int]) -> Optional[dict]:
+    if student_id is None:
+        return None
+    return deltas.setdefault(student_id, {
+        "student_id": student_id, "incident_count": 0, "open_count": 0,
+        "last_incident_date": None, "latest_action": None,
+    })
+
+def add_incident_summary(deltas: dict, incident: models.DisciplineIncident) -> dict:
+    delta = _summary_delta(deltas, incident.student_id)
+    if delta is not None:
+        delta["incident_count"] += 1
+        delta["open_count"] += incident.status in OPEN_STATUSES
+        if incident.incident_date and (delta["last_incident_date"] is None or incident.incident_date > delta["last_incident_date"]):
+            delta["last_incident_date"] = incident.incident_date
+    return deltas
+
+def add_status_change_summary(deltas: dict, student_id, old_status, new_status, action: Optional[str] = None) -> dict:
+    delta = _summary_delta(deltas, student_id)
+    if delta is not None:
+        delta["open_count"] += (new_status in OPEN_STATUSES) - (old_status in OPEN_STATUSES)
+        if action is not None:
+            delta["latest_action"] = action
+    return deltas
+
+def apply_summary_deltas(db: Session, deltas: dict):
+    # Sorted so concurrent writers lock the summary rows in the same order
+    values = [
+        deltas[student_id] for student_id in sorted(deltas)
+        if deltas[student_id]["incident_count"] or deltas[student_id]["open_count"]
+        or deltas[student_id]["latest_action"] is not None
+    ]
+    if not values:
+        return
+    Summary = models.StudentIncidentSummary
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(Summary).values(values)
+        new = stmt.excluded
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[Summary.student_id],
+            set_={
+                "incident_count": Summary.incident_count + new.incident_count,
+                "open_count": Summary.open_count + new.open_count,
+                "last_incident_date": case(
+                    (new.last_incident_date.is_(None), Summary.last_incident_date),
+                    (Summary.last_incident_date.is_(None), new.last_incident_date),
+                    (new.last_incident_date > Summary.last_incident_date, new.last_incident_date),
+                    else_=Summary.last_incident_date,
+                ),
+                "latest_action": func.coalesce(new.latest_action, Summary.latest_action),
+            },
+        ))
+        return
+    for value in values:
+        summary = db.get(Summary, value["student_id"])
+        if summary is None:
+            db.add(Summary(**value))
+            continue
+        summary.incident_count += value["incident_count"]
+        summary.open_count += value["open_count"]
+        if value["last_incident_date"] and (summary.last_incident_date is None or value["last_incident_date"] > summary.last_incident_date):
+            summary.last_incident_date = value["last_incident_date"]
+        if value["latest_action"] is not None:
+            summary.latest_action = value["latest_action"]
+    db.flush()
+
+def rebuild_student_summaries(db: Session):
+    Incident, Summary = models.DisciplineIncident, models.StudentIncidentSummary
+    totals = (
+        select(
+            Incident.student_id,
+            func.count().label("incident_count"),
+            func.sum(case((Incident.status.in_(OPEN_STATUSES), 1), else_=0)).label("open_count"),
+            func.max(Incident.incident_date).label("last_incident_date"),
+        )
+        .where(Incident.student_id.in_(select(models.Student.id)))
+        .group_by(Incident.student_id)
+        .subquery()
+    )
+    # Without an assignment timestamp, the latest action is the one on the newest incident
+    ranked = (
+        select(
+            Incident.student_id,
+            Incident.action,
+            func.row_number().over(
+                partition_by=Incident.student_id,
+                order_by=(Incident.incident_date.desc(), Incident.id.desc()),
+            ).label("position"),
+        )
+        .where(Incident.action.is_not(None))
+        .subquery()
+    )
+    latest = select(ranked.c.student_id, ranked.c.action).where(ranked.c.position == 1).subquery()
+    student_ids = set(db.execute(select(Summary.student_id)).scalars())
+    db.execute(delete(Summary))
+    db.execute(insert(Summary).from_select(
+        ["student_id", "incident_count", "open_count", "last_incident_date", "latest_action"],
+        select(
+            totals.c.student_id, totals.c.incident_count, totals.c.open_count,
+            totals.c.last_incident_date, latest.c.action,
+        ).outerjoin(latest, latest.c.student_id == totals.c.student_id),
+    ))
+    student_ids.update(db.execute(select(Summary.student_id)).scalars())
+    db.commit()
+    cache.invalidate("incidents", *(student_incidents_namespace(s) for s in student_ids))
+
+@read_through(student_incidents_namespace)
+@replica_reads
+def get_student_summary(db: Session, student_id: int) -> schemas.StudentIncidentSummary:
+    summary = db.get(models.StudentIncidentSummary, student_id)
+    if summary is None:
+        return schemas.StudentIncidentSummary(student_id=student_id)
+    return schemas.StudentIncidentSummary.model_validate(summary)
+
+@read_through("incidents")
+@replica_reads
+def get_repeat_offenders(db: Session, limit: int = REPEAT_OFFENDER_LIMIT, min_incidents: int = 2) -> List[schemas.RepeatOffender]:
+    """Students with the most incidents, from the summary index alone."""
+    Summary = models.StudentIncidentSummary
+    rows = db.execute(
+        select(Summary, models.Student.name, models.Student.username)
+        .join(models.Student, models.Student.id == Summary.student_id)
+        .where(Summary.incident_count >= min_incidents)
+        .order_by(Summary.incident_count.desc(), Summary.student_id.desc())
+        .limit(max(1, min(limit, MAX_PAGE_SIZE)))
+    ).all()
+    return [
+        schemas.RepeatOffender(
+            **schemas.StudentIncidentSummary.model_validate(summary).model_dump(), name=name, username=username,
+        )
+        for summary, name, username in rows
+    ]
+
+
+# ─── Bulk import ─────────────────────────────────────────────────────────────────
+def _bulk_insert(db: Session, model, rows: List[Tuple[int, dict]], before_commit=None):
+    """Insert (row number, values) pairs in one executemany; returns (inserted, errors).
+
+    If the batch violates a constraint it is retried row by row inside
+    savepoints, so only the offending rows are rejected. ``before_commit``
+    receives the values that were inserted, inside the same transaction.
+    """
+    try:
+        db.execute(insert(model), [values for _, values in rows])
+        if before_commit:
+            before_commit([values for _, values in rows])
+        db.commit()
+        return len(rows), []
+    except IntegrityError:
+        db.rollback()
+
+    inserted, errors = [], []
+    for row, values in rows:
+        try:
+            with db.begin_nested():
+                db.execute(insert(model), [values])
+            inserted.append(values)
+        except IntegrityError as exc:
+            errors.append((row, str(exc.orig).strip().splitlines()[0]))
+    if before_commit and inserted:
+        before_commit(inserted)
+    db.commit()
+    return len(inserted), errors
+
+def bulk_create_students(db: Session, rows: List[Tuple[int, dict]]):
+    result = _bulk_insert(db, models.Student, rows)
+    cache.invalidate("students")
+    return result
+
+def bulk_create_staff_members(db: Session, rows: List[Tuple[int, dict]]):
+    result = _bulk_insert(db, models.StaffMember, rows)
+    cache.invalidate("staff")
+    return result
+
+def bulk_create_incidents(db: Session, rows: List[Tuple[int, dict]]):
+    # Unknown students are rejected here rather than by the foreign key,
+    # which SQLite does not enforce
+    student_ids = {values["student_id"] for _, values in rows}
+    known = set(db.scalars(select(models.Student.id).where(models.Student.id.in_(student_ids))))
+    unknown = [(row, f"no student with id {values['student_id']}") for row, values in rows if values["student_id"] not in known]
+    rows = [(row, {**values, "status": models.IncidentStatus.PENDING}) for row, values in rows if values["student_id"] in known]
+    if not rows:
+        return 0, unknown
+
+    def update_stats(inserted):
+        deltas, summaries = Counter(), {}
+        for values in inserted:
+            incident = models.DisciplineIncident(**values)
+            deltas.update(incident_stat_buckets(incident))
+            add_incident_summary(summaries, incident)
+        apply_stat_deltas(db, deltas)
+        apply_summary_deltas(db, summaries)
+        feed.publish(db, [{"event": "incidents.imported", "count": len(inserted)}])
+
+    inserted, errors = _bulk_insert(db, models.DisciplineIncident, rows, before_commit=update_stats)
+    cache.invalidate("incidents", *(student_incidents_namespace(s) for s in known))
+    return inserted, sorted(unknown + errors)
+
+
+# ─── Export queries (streamed by exporter.py) ────────────────────────────────────
+# Plain column selects rather than ORM entities, so streaming a large table
+# never fills the session's identity map.
+INCIDENT_EXPORT_COLUMNS = (
+    "id", "student_id", "student_name", "class_name", "department",
+    "incident_date", "description", "status", "action",
+)
+STUDENT_EXPORT_COLUMNS = ("id", "name", "username")
+STAFF_EXPORT_COLUMNS = ("id", "name", "username", "role")
+
+def incident_export_query(filters: Optional[schemas.IncidentFilters] = None):
+    Incident = models.DisciplineIncident
+    stmt = select(*(getattr(Incident, c) for c in INCIDENT_EXPORT_COLUMNS))
+    return filter_incidents(stmt, filters).order_by(Incident.incident_date.desc(), Incident.id.desc())
+
+def student_export_query():
+    return select(*(getattr(models.Student, c) for c in STUDENT_EXPORT_COLUMNS)).order_by(models.Student.id)
+
+def staff_export_query():
+    return select(*(getattr(models.StaffMember, c) for c in STAFF_EXPORT_COLUMNS)).order_by(models.StaffMember.id)
+
+
+# ─── Incident listing (keyset pagination) ────────────────────────────────────────
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class Page(NamedTuple):
+    items: List
+    next_cursor: Optional[str]
+
+
+def encode_incident_cursor(incident: models.DisciplineIncident) -> str:
+    raw = f"{incident.incident_date.isoformat()}|{incident.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_incident_cursor(cursor: str):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw_date, raw_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return date.fromisoformat(raw_date), int(raw_id)
+    except ValueError:
+        raise ValueError("Invalid page cursor")
+
+def filter_incidents(query, filters: Optional[schemas.IncidentFilters]):
+    """Apply ``filters``. Without a date range only the current academic
+    year(s) are listed (partitions.listing_start), so Postgres scans just
+    their partitions; pass date_from/date_to to reach further back."""
+    Incident = models.DisciplineIncident
+    filters = filters or schemas.IncidentFilters()
+    if filters.department:
+        query = query.filter(Incident.department == filters.department)
+    if filters.class_name:
+        query = query.filter(Incident.class_name == filters.class_name)
+    if filters.status:
+        query = query.filter(Incident.status == filters.status)
+    if filters.date_from:
+        query = query.filter(Incident.incident_date >= filters.date_from)
+    if filters.date_to:
+        query = query.filter(Incident.incident_date <= filters.date_to)
+    if not (filters.date_from or filters.date_to):
+        query = query.filter(Incident.incident_date >= partitions.listing_start())
+    return query
+
+@read_through("incidents")
+@replica_reads
+def get_incidents_page(
+    db: Session,
+    filters: Optional[schemas.IncidentFilters] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Page:
+    """Newest-first page of incidents, keyed on (incident_date, id).
+
+    The cursor is the opaque ``next_cursor`` of the previous page; rows are
+    fetched with a seek predicate instead of OFFSET so every page costs the
+    same regardless of how deep the caller has paged.
+    """
+    Incident = models.DisciplineIncident
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = filter_incidents(db.query(Incident), filters)
+    if cursor:
+        last_date, last_id = decode_incident_cursor(cursor)
+        query = query.filter(
+            or_(
+                Incident.incident_date < last_date,
+                and_(Incident.incident_date == last_date, Incident.id < last_id),
+            )
+        )
+    rows = (
+        query.order_by(Incident.incident_date.desc(), Incident.id.desc())
+             .limit(limit + 1)
+             .all()
+    )
+    next_cursor = encode_incident_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return Page(
+        items=[schemas.Incident.model_validate(r) for r in rows[:limit]],
+        next_cursor=next_cursor,
+    )
+
+
+# ─── Incident search (description full text, see search.py) ──────────────────────
+def encode_search_cursor(rank: float, incident_id: int) -> str:
+    raw = f"{rank!r}|{incident_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw_rank, raw_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return float(raw_rank), int(raw_id)
+    except ValueError:
+        raise ValueError("Invalid page cursor")
+
+def _search_incidents_pg(db: Session, text: str, after, limit: int):
+    Incident = models.DisciplineIncident
+    vector = literal_column("discipline_incidents.search_vector")
+    config = literal_column(f"'{search.SEARCH_CONFIG}'::regconfig")
+    query = func.websearch_to_tsquery(config, text)
+    rank = func.ts_rank_cd(vector, query)
+    stmt = select(Incident, rank.label("rank")).where(vector.op("@@")(query))
+    if after:
+        last_rank, last_id = after
+        stmt = stmt.where(or_(rank < last_rank, and_(rank == last_rank, Incident.id < last_id)))
+    hits = stmt.order_by(rank.desc(), Incident.id.desc()).limit(limit + 1).subquery()
+    # ts_headline re-parses the description, so only run it for the page's rows
+    Hit = aliased(Incident, hits)
+    snippet = func.ts_headline(config, hits.c.description, query, search.HEADLINE_OPTIONS)
+    rows = db.execute(
+        select(Hit, hits.c.rank, snippet).order_by(hits.c.rank.desc(), hits.c.id.desc())
+    ).all()
+    return [(incident, rank, search.render_snippet(marked)) for incident, rank, marked in rows]
+
+def _search_incidents_fallback(db: Session, text: str, after, limit: int):
+    Incident = models.DisciplineIncident
+    index = search.fallback_index
+    new_rows = db.execute(
+        select(Incident.id, Incident.description).where(Incident.id > index.last_id)
+    )
+    for incident_id, description in new_rows:
+        index.add(incident_id, description)
+
+    hits = index.search(text)
+    if after:
+        hits = [hit for hit in hits if hit < after]
+    hits = hits[:limit + 1]
+    incidents = {
+        incident.id: incident
+        for incident in db.query(Incident).filter(Incident.id.in_([i for _, i in hits]))
+    }
+    return [
+        (incidents[incident_id], rank, index.snippet(incident_id, text))
+        for rank, incident_id in hits if incident_id in incidents
+    ]
+
+@read_through("incidents")
+@replica_reads
+def search_incidents(db: Session, text: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+    """Incidents whose description matches ``text``, best match first.
+
+    ``text`` uses web-search syntax (words are ANDed, ``-word`` excludes,
+    "quoted phrases" on Postgres). Pages are keyed on (rank, id).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_search_cursor(cursor) if cursor else None
+    if db.get_bind().dialect.name == "postgresql":
+        rows = _search_incidents_pg(db, text, after, limit)
+    else:
+        rows = _search_incidents_fallback(db, text, after, limit)
+    items = [
+        schemas.IncidentSearchResult(
+            **schemas.Incident.model_validate(incident).model_dump(), rank=rank, snippet=snippet
+        )
+        for incident, rank, snippet in rows[:limit]
+    ]
+    next_cursor = encode_search_cursor(items[-1].rank, items[-1].id) if len(rows) > limit else None
+    return Page(items=items, next_cursor=next_cursor)
+
+
+# ─── Roster listing (admin student/staff pages) ──────────────────────────────────
+ROSTER_PAGE_SIZE = 50
+
+def _like_prefix(prefix: str) -> str:
+    escaped = prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+def _roster_page(db: Session, model, schema, search: Optional[str], cursor: Optional[int], limit: int) -> Page:
+    """One page of ``model`` rows in id order, optionally filtered by a
+    case-insensitive name/username prefix (see models.roster_prefix_indexes).
+    ``cursor`` is the ``next_cursor`` (last id) of the previous page."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = db.query(model)
+    if search:
+        pattern = _like_prefix(search)
+        query = query.filter(or_(
+            func.lower(model.name).like(pattern, escape="\\"),
+            func.lower(model.username).like(pattern, escape="\\"),
+        ))
+    if cursor:
+        query = query.filter(model.id > cursor)
+    rows = query.order_by(model.id).limit(limit + 1).all()
+    return Page(
+        items=[schema.model_validate(r) for r in rows[:limit]],
+        next_cursor=rows[limit - 1].id if len(rows) > limit else None,
+    )
+
+@read_through("students")
+@replica_reads
+def get_students_page(db: Session, search: Optional[str] = None, cursor: Optional[int] = None,
+                      limit: int = ROSTER_PAGE_SIZE) -> Page:
+    return _roster_page(db, models.Student, schemas.Student, search, cursor, limit)
+
+@read_through("staff")
+@replica_reads
+def get_staff_page(db: Session, search: Optional[str] = None, cursor: Optional[int] = None,
+                   limit: int = ROSTER_PAGE_SIZE) -> Page:
+    return _roster_page(db, models.StaffMember, schemas.StaffMember, search, cursor, limit)
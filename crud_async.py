@@ -0,0 +1,78 @@
+"""Awaitable counterparts of every function in crud.py.
+
+Each wrapper takes the same arguments as its crud function. With an
+AsyncSession the sync body runs through ``AsyncSession.run_sync`` on the
+asyncpg/aiosqlite driver; with a plain Session (DATABASE_ASYNC=0) it runs in
+the threadpool, so handlers can always ``await`` regardless of the backend.
+"""
+from functools import wraps
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+import crud
+
+
+def _asyncify(fn):
+    @wraps(fn)
+    async def wrapper(db, *args, **kwargs):
+        if isinstance(db, AsyncSession):
+            return await db.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return wrapper
+
+
+# ─── User ────────────────────────────────────────────────────────────────────────
+create_user = _asyncify(crud.create_user)
+get_users = _asyncify(crud.get_users)
+
+# ─── Student ─────────────────────────────────────────────────────────────────────
+create_student = _asyncify(crud.create_student)
+get_student_by_id = _asyncify(crud.get_student_by_id)
+get_student_profile = _asyncify(crud.get_student_profile)
+update_student = _asyncify(crud.update_student)
+delete_student = _asyncify(crud.delete_student)
+
+# ─── StaffMember ─────────────────────────────────────────────────────────────────
+create_staff_member = _asyncify(crud.create_staff_member)
+get_staff_by_id = _asyncify(crud.get_staff_by_id)
+get_staff_profile = _asyncify(crud.get_staff_profile)
+update_staff_member = _asyncify(crud.update_staff_member)
+delete_staff_member = _asyncify(crud.delete_staff_member)
+
+# ─── Accounts (login) ────────────────────────────────────────────────────────────
+get_accounts_by_username = _asyncify(crud.get_accounts_by_username)
+set_password_hash = _asyncify(crud.set_password_hash)
+
+# ─── DisciplineIncident ──────────────────────────────────────────────────────────
+create_incident = _asyncify(crud.create_incident)
+get_incident_by_id = _asyncify(crud.get_incident_by_id)
+get_incidents_for_student = _asyncify(crud.get_incidents_for_student)
+get_incidents_with_actions = _asyncify(crud.get_incidents_with_actions)
+update_incident_status = _asyncify(crud.update_incident_status)
+assign_action = _asyncify(crud.assign_action)
+bulk_update_incident_status = _asyncify(crud.bulk_update_incident_status)
+bulk_assign_action = _asyncify(crud.bulk_assign_action)
+get_incidents_page = _asyncify(crud.get_incidents_page)
+search_incidents = _asyncify(crud.search_incidents)
+
+# ─── Background jobs ─────────────────────────────────────────────────────────────
+get_job_counts = _asyncify(crud.get_job_counts)
+
+# ─── Incident statistics ─────────────────────────────────────────────────────────
+get_incident_stats = _asyncify(crud.get_incident_stats)
+rebuild_incident_stats = _asyncify(crud.rebuild_incident_stats)
+
+# ─── Student incident summaries ──────────────────────────────────────────────────
+get_student_summary = _asyncify(crud.get_student_summary)
+get_repeat_offenders = _asyncify(crud.get_repeat_offenders)
+rebuild_student_summaries = _asyncify(crud.rebuild_student_summaries)
+
+# ─── Bulk import ─────────────────────────────────────────────────────────────────
+bulk_create_students = _asyncify(crud.bulk_create_students)
+bulk_create_staff_members = _asyncify(crud.bulk_create_staff_members)
+bulk_create_incidents = _asyncify(crud.bulk_create_incidents)
+
+# ─── Roster listing ──────────────────────────────────────────────────────────────
+get_students_page = _asyncify(crud.get_students_page)
+get_staff_page = _asyncify(crud.get_staff_page)
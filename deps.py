@@ -0,0 +1,89 @@
+"""Request dependencies shared by the HTML routes (main.py) and the JSON API (api.py)."""
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Depends, Form, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+
+import crud
+import crud_async as acrud
+import models
+import partitions
+import schemas
+from database import AsyncSessionLocal, DATABASE_ASYNC, DbSession, SessionLocal
+
+
+# Database dependency (AsyncSession, or a sync Session when DATABASE_ASYNC=0)
+async def get_db():
+    if DATABASE_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        await run_in_threadpool(db.close)
+
+# ?year=2023 selects academic year 2023 (see partitions.py); listings and
+# exports otherwise default to the current year(s)
+ACADEMIC_YEAR = Query(None, ge=1900, le=2999, description="academic year, e.g. 2023 for 2023-24")
+
+def year_range(year: Optional[int]) -> Tuple[Optional[date], Optional[date]]:
+    """(date_from, date_to) covering academic ``year``, both inclusive."""
+    if year is None:
+        return None, None
+    start, end = partitions.year_bounds(year)
+    return start, end - timedelta(days=1)
+
+# Incident listing parameters shared by every incident view
+def incident_filters(
+    department: Optional[str] = None,
+    class_name: Optional[str] = None,
+    status: Optional[models.IncidentStatus] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    year: Optional[int] = ACADEMIC_YEAR,
+):
+    if year is not None and not (date_from or date_to):
+        date_from, date_to = year_range(year)
+    return schemas.IncidentFilters(
+        department=department,
+        class_name=class_name,
+        status=status,
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+class IncidentListing:
+    def __init__(
+        self,
+        filters: schemas.IncidentFilters = Depends(incident_filters),
+        cursor: Optional[str] = None,
+        limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    ):
+        self.filters = filters
+        self.cursor = cursor
+        self.limit = limit
+
+    async def load(self, db: DbSession):
+        try:
+            page = await acrud.get_incidents_page(db, self.filters, self.cursor, self.limit)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        return {
+            "incidents": page.items,
+            "next_cursor": page.next_cursor,
+            "filters": self.filters,
+        }
+
+# Bulk committee forms post one incident_id and one version field per selected row
+def incident_versions(
+    incident_id: List[int] = Form(...),
+    version: List[int] = Form(...),
+) -> Dict[int, int]:
+    if len(incident_id) != len(version):
+        raise HTTPException(status_code=400, detail="Send one version per incident_id")
+    if len(incident_id) > crud.MAX_BULK_INCIDENTS:
+        raise HTTPException(status_code=400, detail=f"At most {crud.MAX_BULK_INCIDENTS} incidents per request")
+    return dict(zip(incident_id, version))
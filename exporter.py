@@ -0,0 +1,67 @@
+"""Streaming CSV / NDJSON export of large result sets.
+
+Rows are fetched with ``yield_per`` (a server-side cursor on Postgres) and
+written out one partition at a time, so memory stays flat however large the
+table is. Each export opens its own session: the request's get_db session
+is closed before a StreamingResponse finishes sending.
+"""
+import csv
+import io
+import json
+import os
+
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+
+from database import AsyncSessionLocal, DATABASE_ASYNC, SessionLocal
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _sync_partitions(stmt):
+    with SessionLocal() as session:
+        result = session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        yield from result.partitions()
+
+async def stream_partitions(stmt):
+    """Yield lists of up to EXPORT_BATCH_SIZE rows from ``stmt``."""
+    if DATABASE_ASYNC:
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for partition in result.partitions():
+                yield partition
+    else:
+        async for partition in iterate_in_threadpool(_sync_partitions(stmt)):
+            yield partition
+
+
+async def _csv_chunks(stmt, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    async for partition in stream_partitions(stmt):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(partition)
+        yield buffer.getvalue()
+
+async def _ndjson_chunks(stmt, columns):
+    async for partition in stream_partitions(stmt):
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in partition
+        )
+
+
+def export_response(stmt, columns, name: str, fmt: str) -> StreamingResponse:
+    chunks = _csv_chunks(stmt, columns) if fmt == "csv" else _ndjson_chunks(stmt, columns)
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
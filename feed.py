@@ -0,0 +1,244 @@
+"""Live incident feed: created / status-changed events pushed to dashboards over SSE.
+
+crud write functions call ``publish(db, events)`` before committing. On
+Postgres that runs pg_notify in the same transaction, so events go out only
+if the write commits, and every worker receives them through its own LISTEN
+connection. On other databases the events are delivered on commit to this
+worker's subscribers only.
+
+Each worker fans events out to its connected clients through one bounded
+queue per client. A client that falls FEED_QUEUE_SIZE events behind has its
+queue emptied and gets a single "resync" event, so it reloads the listing
+instead of holding memory for a stalled connection.
+"""
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, event, func, select as sql_select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.types import Text
+
+FEED_CHANNEL = "incident_events"
+FEED_QUEUE_SIZE = int(os.getenv("FEED_QUEUE_SIZE", 100))                # events buffered per client
+FEED_HEARTBEAT_SECONDS = float(os.getenv("FEED_HEARTBEAT_SECONDS", 15))  # keeps proxies from closing idle streams
+FEED_MAX_SECONDS = float(os.getenv("FEED_MAX_SECONDS", 300))             # clients reconnect, spreading them over workers
+FEED_RETRY_MS = 3000
+
+logger = logging.getLogger("feed")
+
+RESYNC = object()
+_PENDING_KEY = "feed_pending"
+
+
+# ─── Events ──────────────────────────────────────────────────────────────────────
+# Payloads stay well under Postgres' 8000-byte NOTIFY limit: identifiers and
+# listing columns only, clients fetch /api/v1/incidents/{id} for the rest.
+def incident_event(kind: str, incident, **overrides) -> dict:
+    fields = {
+        "id": incident.id,
+        "version": incident.version,
+        "status": str(incident.status),
+        "action": incident.action,
+        "department": incident.department,
+        "class_name": incident.class_name,
+        "incident_date": incident.incident_date.isoformat() if incident.incident_date else None,
+    }
+    fields.update(overrides)
+    return {"event": kind, **fields}
+
+def publish(db: Session, events: Iterable[dict]):
+    payloads = [json.dumps(e, separators=(",", ":"), default=str) for e in events]
+    if not payloads:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        payload = bindparam("payloads", payloads, type_=ARRAY(Text))
+        db.execute(sql_select(func.pg_notify(FEED_CHANNEL, func.unnest(payload))))
+    else:
+        db.info.setdefault(_PENDING_KEY, []).extend(payloads)
+
+@event.listens_for(Session, "after_commit")
+def _deliver_on_commit(session):
+    for payload in session.info.pop(_PENDING_KEY, ()):
+        broker.deliver(payload)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ─── Per-worker fan-out ──────────────────────────────────────────────────────────
+class Subscriber:
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, payload: str) -> bool:
+        """Queue ``payload``; returns False if the client was too far behind and must resync."""
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            return False
+
+
+class Broker:
+    def __init__(self, queue_size: int = FEED_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.delivered = 0
+        self.resyncs = 0
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def deliver(self, payload: str):
+        """Hand ``payload`` to every subscriber; safe to call from any thread."""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._fan_out, payload)
+
+    def _fan_out(self, payload: str):
+        self.delivered += 1
+        for subscriber in list(self.subscribers):
+            if not subscriber.offer(payload):
+                self.resyncs += 1
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "subscribers": len(self.subscribers),
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+        }
+
+
+broker = Broker()
+
+
+# ─── LISTEN connection (Postgres) ────────────────────────────────────────────────
+# One dedicated connection per worker, outside the pools, using the driver of
+# the configured mode: asyncpg for DATABASE_ASYNC=1, psycopg2 in a thread otherwise.
+def _listen_dsn(url: str) -> str:
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+async def _listen_asyncpg(dsn: str):
+    import asyncpg
+
+    connection = await asyncpg.connect(dsn)
+    closed = asyncio.Event()
+    connection.add_termination_listener(lambda _: closed.set())
+    try:
+        await connection.add_listener(FEED_CHANNEL, lambda _c, _pid, _channel, payload: broker.deliver(payload))
+        await closed.wait()
+    finally:
+        await connection.close()
+
+def _listen_psycopg2(dsn: str, stop: threading.Event):
+    import psycopg2
+    import psycopg2.extensions
+
+    connection = psycopg2.connect(dsn)
+    try:
+        connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        connection.cursor().execute(f"LISTEN {FEED_CHANNEL}")
+        while not stop.is_set():
+            if select.select([connection], [], [], 1.0)[0]:
+                connection.poll()
+                while connection.notifies:
+                    broker.deliver(connection.notifies.pop(0).payload)
+    finally:
+        connection.close()
+
+
+class Listener:
+    def __init__(self, url: str, use_asyncpg: bool):
+        self.dsn = _listen_dsn(url)
+        self.use_asyncpg = use_asyncpg
+        self.task: Optional[asyncio.Task] = None
+        self.stop_event = threading.Event()
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        delay = 1.0
+        while not self.stop_event.is_set():
+            try:
+                if self.use_asyncpg:
+                    await _listen_asyncpg(self.dsn)
+                else:
+                    await asyncio.to_thread(_listen_psycopg2, self.dsn, self.stop_event)
+                delay = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("LISTEN %s failed; retrying in %.0f s", FEED_CHANNEL, delay, exc_info=True)
+            if not self.stop_event.is_set():
+                # Events sent while disconnected are lost; tell clients to reload.
+                broker.deliver(json.dumps({"event": "resync"}))
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    async def stop(self):
+        self.stop_event.set()
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+
+_listener: Optional[Listener] = None
+
+async def start(database_url: str, use_asyncpg: bool):
+    global _listener
+    broker.start(asyncio.get_running_loop())
+    if make_url(database_url).get_backend_name() == "postgresql":
+        _listener = Listener(database_url, use_asyncpg)
+        _listener.start()
+
+async def stop():
+    if _listener is not None:
+        await _listener.stop()
+
+
+# ─── Server-Sent Events ──────────────────────────────────────────────────────────
+def _sse(event_name: str, data: str) -> str:
+    return f"event: {event_name}\ndata: {data}\n\n"
+
+async def event_stream(request, max_seconds: float = FEED_MAX_SECONDS):
+    subscriber = broker.subscribe()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    try:
+        yield f"retry: {FEED_RETRY_MS}\n: connected\n\n"
+        while loop.time() < deadline:
+            timeout = min(FEED_HEARTBEAT_SECONDS, deadline - loop.time())
+            try:
+                payload = await asyncio.wait_for(subscriber.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": keepalive\n\n"
+                continue
+            if payload is RESYNC:
+                yield _sse("resync", "{}")
+            else:
+                yield _sse(json.loads(payload)["event"], payload)
+    finally:
+        broker.unsubscribe(subscriber)
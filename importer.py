@@ -0,0 +1,187 @@
+"""Streaming bulk import of students, staff and incidents from CSV / JSON uploads.
+
+Records are parsed incrementally from the uploaded file (CSV with a header
+row, NDJSON, or a top-level JSON array), validated with the same pydantic
+schemas as the single-row forms, and inserted in batches of
+IMPORT_BATCH_SIZE rows, one transaction per batch. A row that fails
+validation or violates a constraint is reported with its 1-based record
+number and skipped; the rest of its batch is still inserted.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+from typing import Iterator, List, Tuple
+
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+import security
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 1000))  # errors listed in the report
+READ_CHUNK_SIZE = 64 * 1024
+
+FORMATS = ("csv", "ndjson", "json")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename: str, content_type: str = "") -> str:
+    name = (filename or "").lower()
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type:
+        return "ndjson"
+    if name.endswith(".json") or "json" in content_type:
+        return "json"
+    raise ImportFormatError("Unrecognised file type; upload .csv, .ndjson or .json")
+
+
+def _iter_json_array(stream) -> Iterator:
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer, pos = "", 0
+    expect = "["  # then "first" (a value or "]"), "value" after a comma, "separator" after a value
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+            if expect == "[":
+                if char != "[":
+                    raise ImportFormatError("JSON upload must be an array of objects")
+                expect, pos = "first", pos + 1
+                continue
+            if expect == "separator":
+                if char == "]":
+                    return
+                if char != ",":
+                    raise ImportFormatError("Expected ',' or ']' after a JSON array element")
+                expect, pos = "value", pos + 1
+                continue
+            if char == "]" and expect == "first":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise ImportFormatError("Truncated or invalid JSON array")
+                break  # element continues in the next chunk
+            if end == len(buffer) and chunk:
+                break  # a number or literal may continue in the next chunk
+            yield value
+            expect, pos = "separator", end
+        if not chunk:
+            raise ImportFormatError("JSON array is not terminated")
+
+
+def iter_records(binary_file, fmt: str) -> Iterator[dict]:
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"Unsupported format {fmt!r}")
+    stream = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "ndjson":
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield exc  # reported against this row, the rest still imports
+    else:
+        yield from _iter_json_array(stream)
+
+
+def _next_batch(records: Iterator, start: int, size: int) -> List[Tuple[int, object]]:
+    batch = []
+    for number, record in enumerate(records, start=start):
+        batch.append((number, record))
+        if len(batch) == size:
+            break
+    return batch
+
+
+async def hash_account_passwords(valid):
+    """``prepare`` hook for student/staff imports: hash passwords on the hashing pool."""
+    hashes = await asyncio.gather(
+        *(security.hash_password_async(item.password) for _, item in valid)
+    )
+    return [
+        (row, {**item.model_dump(), "password": password_hash})
+        for (row, item), password_hash in zip(valid, hashes)
+    ]
+
+
+class ImportReport:
+    def __init__(self, fmt: str):
+        self.format = fmt
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row: int, error):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    def as_dict(self) -> dict:
+        return {
+            "format": self.format,
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+async def run_import(db, upload, schema, insert_batch, prepare=None, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """Parse ``upload`` batch by batch and hand valid rows to ``insert_batch``.
+
+    ``prepare`` turns a list of (row number, validated schema) into
+    (row number, column dict) pairs, e.g. to hash passwords; by default the
+    schema's fields are inserted as-is. ``insert_batch(db, rows)`` is an
+    awaitable crud function returning (inserted count, [(row, error)]).
+    """
+    fmt = detect_format(upload.filename, upload.content_type or "")
+    report = ImportReport(fmt)
+    records = iter_records(upload.file, fmt)
+    next_row = 1
+    while True:
+        try:
+            # Parsing reads the spooled upload from disk, so keep it off the loop
+            batch = await run_in_threadpool(_next_batch, records, next_row, batch_size)
+        except (ImportFormatError, json.JSONDecodeError, csv.Error, UnicodeDecodeError) as exc:
+            report.add_error(next_row, f"Unreadable input: {exc}")
+            break
+        if not batch:
+            break
+        next_row += len(batch)
+        report.received += len(batch)
+
+        valid = []
+        for row, record in batch:
+            if isinstance(record, json.JSONDecodeError):
+                report.add_error(row, f"Invalid JSON: {record}")
+                continue
+            try:
+                valid.append((row, schema.model_validate(record)))
+            except ValidationError as exc:
+                report.add_error(row, exc.errors(include_url=False, include_input=False, include_context=False))
+        if not valid:
+            continue
+        rows = await prepare(valid) if prepare else [(row, item.model_dump()) for row, item in valid]
+        inserted, errors = await insert_batch(db, rows)
+        report.inserted += inserted
+        for row, error in errors:
+            report.add_error(row, error)
+    return report.as_dict()
@@ -0,0 +1,256 @@
+"""Durable background jobs: a Postgres-backed queue in the ``jobs`` table.
+
+crud enqueues jobs in the same transaction as the write that causes them,
+so a job exists exactly when its incident change committed. Workers run
+separately from the web processes:
+
+    python jobs.py worker            # one per process; start several to scale out
+    python jobs.py stats
+
+Each worker claims a batch of due jobs with UPDATE ... WHERE id IN (SELECT
+... FOR UPDATE SKIP LOCKED), so concurrent workers never pick the same row and
+never wait on each other. A job runs in its own transaction together with
+marking it done. Failures are retried with exponential backoff and jitter up
+to ``max_attempts`` and then left as "failed" with the last error. A job
+whose worker died is claimed again after JOB_LOCK_TIMEOUT seconds, so
+handlers must tolerate running twice (at-least-once delivery).
+
+Without a worker (local development, SQLite), set JOBS_INLINE=1 and the web
+process drains the queue in a BackgroundTasks callback after the response
+has been sent.
+"""
+import argparse
+import logging
+import os
+import random
+import signal
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List
+
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+import mailer
+import models
+import partitions
+from database import env_bool
+
+JOBS_INLINE = env_bool("JOBS_INLINE", False)
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", 10))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1))
+JOB_LOCK_TIMEOUT = int(os.getenv("JOB_LOCK_TIMEOUT", 300))        # seconds before a running job is reclaimed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_BACKOFF_SECONDS = float(os.getenv("JOB_BACKOFF_SECONDS", 30))  # first retry delay, doubled per attempt
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", 3600))
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", 7))       # finished jobs kept for inspection
+JOB_HOUSEKEEPING_SECONDS = int(os.getenv("JOB_HOUSEKEEPING_SECONDS", 3600))  # pruning and partition upkeep
+
+logger = logging.getLogger("jobs")
+
+HANDLERS: Dict[str, Callable[[Session, dict], None]] = {}
+
+
+def handler(kind: str):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+def _utcnow() -> datetime:
+    # Naive UTC: SQLite has no time zones, and every job timestamp is written here.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ─── Queue operations ────────────────────────────────────────────────────────────
+def enqueue(db: Session, kind: str, payloads: Iterable[dict], delay: float = 0, max_attempts: int = JOB_MAX_ATTEMPTS):
+    """Add one job per payload to the caller's transaction (committed with it)."""
+    now = _utcnow()
+    rows = [
+        {
+            "kind": kind, "payload": payload, "status": "queued", "attempts": 0,
+            "max_attempts": max_attempts, "run_at": now + timedelta(seconds=delay), "created_at": now,
+        }
+        for payload in payloads
+    ]
+    if rows:
+        db.execute(insert(models.Job), rows)
+
+def claim(db: Session, worker_id: str, limit: int = JOB_BATCH_SIZE) -> List:
+    """Mark up to ``limit`` due jobs as running for ``worker_id`` and return them."""
+    Job = models.Job
+    now = _utcnow()
+    due = (
+        select(Job.id)
+        .where(or_(
+            and_(Job.status == "queued", Job.run_at <= now),
+            and_(Job.status == "running", Job.locked_at < now - timedelta(seconds=JOB_LOCK_TIMEOUT)),
+        ))
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = db.execute(
+        update(Job)
+        .where(Job.id.in_(due.scalar_subquery()))
+        .values(status="running", locked_at=now, locked_by=worker_id, attempts=Job.attempts + 1)
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return claimed
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(JOB_BACKOFF_MAX, JOB_BACKOFF_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+def _finish(db: Session, job_id: int, **values):
+    db.execute(
+        update(models.Job).where(models.Job.id == job_id)
+        .values(locked_at=None, locked_by=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+
+def run_claimed(session_factory, job) -> bool:
+    """Run one claimed job; returns True if it succeeded."""
+    with session_factory() as db:
+        try:
+            fn = HANDLERS.get(job.kind)
+            if fn is None:
+                raise LookupError(f"no handler for job kind {job.kind!r}")
+            fn(db, job.payload)
+            _finish(db, job.id, status="done")
+            db.commit()
+            return True
+        except Exception as exc:
+            db.rollback()
+            final = job.attempts >= job.max_attempts or isinstance(exc, LookupError)
+            logger.warning(
+                "job %s (%s) attempt %d/%d failed%s", job.id, job.kind, job.attempts, job.max_attempts,
+                "; giving up" if final else "", exc_info=True,
+            )
+            if final:
+                _finish(db, job.id, status="failed", last_error=repr(exc))
+            else:
+                retry_at = _utcnow() + timedelta(seconds=backoff_seconds(job.attempts))
+                _finish(db, job.id, status="queued", run_at=retry_at, last_error=repr(exc))
+            db.commit()
+            return False
+
+def work_once(session_factory, worker_id: str, limit: int = JOB_BATCH_SIZE) -> int:
+    """Claim and run one batch; returns how many jobs were claimed."""
+    with session_factory() as db:
+        batch = claim(db, worker_id, limit)
+    for job in batch:
+        run_claimed(session_factory, job)
+    return len(batch)
+
+def prune(db: Session, older_than_days: int = JOB_RETENTION_DAYS) -> int:
+    cutoff = _utcnow() - timedelta(days=older_than_days)
+    result = db.execute(
+        models.Job.__table__.delete().where(models.Job.status == "done", models.Job.run_at < cutoff)
+    )
+    db.commit()
+    return result.rowcount
+
+def job_counts(db: Session) -> dict:
+    rows = db.execute(select(models.Job.status, func.count()).group_by(models.Job.status)).all()
+    return {status: count for status, count in rows}
+
+
+# ─── Running jobs ────────────────────────────────────────────────────────────────
+def drain(max_batches: int = 10):
+    """Run due jobs in this process (JOBS_INLINE); scheduled via BackgroundTasks."""
+    from database import SessionLocal
+
+    worker_id = f"inline:{socket.gethostname()}:{os.getpid()}"
+    for _ in range(max_batches):
+        if not work_once(SessionLocal, worker_id):
+            return
+
+def run_worker(poll_seconds: float = JOB_POLL_SECONDS, batch_size: int = JOB_BATCH_SIZE):
+    from database import SessionLocal
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info("job worker %s started", worker_id)
+    last_housekeeping = 0.0
+    while not stopping:
+        try:
+            if time.monotonic() - last_housekeeping > JOB_HOUSEKEEPING_SECONDS:
+                with SessionLocal() as db:
+                    prune(db)
+                    partitions.maintain(db)
+                last_housekeeping = time.monotonic()
+            if work_once(SessionLocal, worker_id, batch_size):
+                continue
+        except Exception:
+            logger.exception("job worker %s: queue unavailable", worker_id)
+        time.sleep(poll_seconds)
+    logger.info("job worker %s stopped", worker_id)
+
+
+# ─── Handlers ────────────────────────────────────────────────────────────────────
+def _incident_summary(incident: models.DisciplineIncident) -> str:
+    return (
+        f"Incident #{incident.id} on {incident.incident_date}\n"
+        f"Student: {incident.student_name} ({incident.class_name}, {incident.department})\n"
+        f"Status: {incident.status}\n\n{incident.description}\n"
+    )
+
+@handler("incident_created")
+def notify_incident_created(db: Session, payload: dict):
+    incident = db.get(models.DisciplineIncident, payload["incident_id"])
+    if incident is None:
+        return  # deleted before the job ran
+    subject = f"New discipline incident #{incident.id}"
+    body = _incident_summary(incident)
+    messages = []
+    student = db.get(models.Student, incident.student_id) if incident.student_id else None
+    if student:
+        messages.append((mailer.address_for(student.username), subject, body))
+    committee = db.execute(
+        select(models.StaffMember.username).where(models.StaffMember.role == "committee")
+    ).scalars()
+    messages.extend((mailer.address_for(username), subject, body) for username in committee)
+    mailer.send_mail(messages)
+
+@handler("action_assigned")
+def notify_action_assigned(db: Session, payload: dict):
+    incident = db.get(models.DisciplineIncident, payload["incident_id"])
+    if incident is None or not incident.student_id:
+        return
+    student = db.get(models.Student, incident.student_id)
+    if student is None:
+        return
+    mailer.send_mail([(
+        mailer.address_for(student.username),
+        f"Action assigned for incident #{incident.id}",
+        f"Action: {incident.action}\n\n{_incident_summary(incident)}",
+    )])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Background job worker")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("worker", help="claim and run jobs until SIGTERM")
+    worker.add_argument("--poll", type=float, default=JOB_POLL_SECONDS)
+    worker.add_argument("--batch-size", type=int, default=JOB_BATCH_SIZE)
+    sub.add_parser("stats", help="print job counts by status")
+    args = parser.parse_args()
+    if args.command == "worker":
+        run_worker(args.poll, args.batch_size)
+    else:
+        from database import SessionLocal
+
+        with SessionLocal() as db:
+            print(job_counts(db))
@@ -0,0 +1,86 @@
+"""Outgoing mail for notification jobs.
+
+MAIL_BACKEND picks where messages go:
+
+* ``smtp`` (the default when MAIL_SMTP_HOST is set): over SMTP, with
+  STARTTLS when MAIL_SMTP_STARTTLS=1.
+* ``file``: one .eml file per message under MAIL_SINK_DIR, for development.
+* ``memory``: the ``outbox`` deque, holding the last MAIL_OUTBOX_SIZE
+  messages, for tests.
+
+With no backend configured, ``send_mail`` raises, so notification jobs fail
+visibly (see /job_stats) instead of mail being dropped or piling up on disk.
+
+Students and staff have no email column; addresses are ``username@MAIL_DOMAIN``.
+"""
+import itertools
+import os
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from collections import deque
+from pathlib import Path
+from typing import Deque, Iterable, Tuple
+
+from database import env_bool
+
+MAIL_FROM = os.getenv("MAIL_FROM", "discipline-office@example.edu")
+MAIL_DOMAIN = os.getenv("MAIL_DOMAIN", "example.edu")
+MAIL_SMTP_HOST = os.getenv("MAIL_SMTP_HOST")
+MAIL_SMTP_PORT = int(os.getenv("MAIL_SMTP_PORT", 587))
+MAIL_SMTP_USER = os.getenv("MAIL_SMTP_USER")
+MAIL_SMTP_PASSWORD = os.getenv("MAIL_SMTP_PASSWORD")
+MAIL_SMTP_STARTTLS = env_bool("MAIL_SMTP_STARTTLS", True)
+MAIL_SMTP_TIMEOUT = float(os.getenv("MAIL_SMTP_TIMEOUT", 10))
+MAIL_BACKEND = os.getenv("MAIL_BACKEND", "smtp" if MAIL_SMTP_HOST else "").lower()
+MAIL_SINK_DIR = os.getenv("MAIL_SINK_DIR", "mail_sink")
+MAIL_OUTBOX_SIZE = int(os.getenv("MAIL_OUTBOX_SIZE", 1000))
+
+outbox: Deque[EmailMessage] = deque(maxlen=MAIL_OUTBOX_SIZE)
+_sink_lock = threading.Lock()
+_sink_sequence = itertools.count()
+
+
+class MailNotConfigured(RuntimeError):
+    pass
+
+
+def address_for(username: str) -> str:
+    return f"{username}@{MAIL_DOMAIN}"
+
+def build_message(to: str, subject: str, body: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = MAIL_FROM
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+def send_mail(messages: Iterable[Tuple[str, str, str]]):
+    """Send (to, subject, body) messages over one connection; raises on delivery
+    errors so the calling job is retried."""
+    messages = [build_message(to, subject, body) for to, subject, body in messages]
+    if not messages:
+        return
+    if MAIL_BACKEND == "smtp":
+        with smtplib.SMTP(MAIL_SMTP_HOST, MAIL_SMTP_PORT, timeout=MAIL_SMTP_TIMEOUT) as smtp:
+            if MAIL_SMTP_STARTTLS:
+                smtp.starttls()
+            if MAIL_SMTP_USER:
+                smtp.login(MAIL_SMTP_USER, MAIL_SMTP_PASSWORD or "")
+            for message in messages:
+                smtp.send_message(message)
+    elif MAIL_BACKEND == "file":
+        directory = Path(MAIL_SINK_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        with _sink_lock:
+            for message in messages:
+                (directory / f"{time.time_ns()}-{next(_sink_sequence)}.eml").write_bytes(bytes(message))
+    elif MAIL_BACKEND == "memory":
+        outbox.extend(messages)
+    else:
+        raise MailNotConfigured(
+            f"no mail backend (MAIL_BACKEND={MAIL_BACKEND!r}); "
+            "set MAIL_SMTP_HOST, or MAIL_BACKEND=file for development"
+        )
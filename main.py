@@ -1,344 +1,572 @@
 
-from fastapi import FastAPI, Depends, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
-
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, BackgroundTasks, Depends, Request, Form, Query, HTTPException, UploadFile, File
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+import api
 import models
 import schemas
 import crud
-from database import SessionLocal, engine, Base
-
-# Create all database tables
-Base.metadata.create_all(bind=engine)
+import crud_async as acrud
+import security
+import auth
+import importer
+import exporter
+import feed
+import jobs
+import metrics
+import ratelimit
+import rendering
+from cache import cache
+from database import (
+    DATABASE_ASYNC, DATABASE_URL, DbSession, ReadYourWritesMiddleware, dispose_engines, pool_stats,
+    start_replica_checks, stop_replica_checks, warm_pool,
+)
+from deps import ACADEMIC_YEAR, IncidentListing, get_db, incident_filters, incident_versions, year_range
+
+logger = logging.getLogger("main")
+
+# The schema is managed by Alembic (`alembic upgrade head`, see README), so
+# startup does not touch the database unless DB_WARMUP_CONNECTIONS is set, and
+# a worker still boots while the database is down.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    if rendering.TEMPLATE_WARMUP:
+        await run_in_threadpool(rendering.precompile_templates)
+    try:
+        await warm_pool()
+    except Exception:
+        logger.warning("database warmup failed; connecting on first request", exc_info=True)
+    await feed.start(DATABASE_URL, use_asyncpg=DATABASE_ASYNC)
+    await start_replica_checks()
+    logger.info("worker %d ready in %.0f ms", os.getpid(), (time.perf_counter() - started) * 1000)
+    yield
+    await stop_replica_checks()
+    await feed.stop()
+    await dispose_engines()
 
 # Initialize FastAPI app
-app = FastAPI()
-templates = Jinja2Templates(directory="templates")
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app = FastAPI(lifespan=lifespan)
+templates = rendering.templates
+app.mount("/static", rendering.CachedStaticFiles(directory=rendering.STATIC_DIR), name="static")
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+app.add_middleware(ratelimit.LoginRateLimitMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)  # outermost, so compression is timed too
+app.include_router(api.router)
+
+@app.exception_handler(auth.LoginRequired)
+async def login_required_handler(request: Request, exc: auth.LoginRequired):
+    if request.url.path.startswith(api.router.prefix + "/"):
+        return JSONResponse({"detail": "Not authenticated"}, status_code=401)
+    return RedirectResponse(url="/login", status_code=303)
+
+@app.exception_handler(ratelimit.RateLimited)
+async def rate_limited_handler(request: Request, exc: ratelimit.RateLimited):
+    return templates.TemplateResponse(
+        "login.html",
+        {"request": request, "error": "Too many failed attempts for this account; try again later."},
+        status_code=429,
+        headers={"Retry-After": ratelimit.retry_after_header(exc.retry_after)},
+    )
 
-# Database dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# A form handler built a *Create schema from fields that fail its checks (e.g. blank)
+@app.exception_handler(ValidationError)
+async def invalid_form_handler(request: Request, exc: ValidationError):
+    fields = sorted({str(error["loc"][0]) for error in exc.errors() if error["loc"]})
+    return templates.TemplateResponse(
+        "error.html",
+        {"request": request, "message": "Invalid " + ", ".join(fields).replace("_", " ")},
+        status_code=400,
+    )
+
+# Connection pool metrics for this worker (each uvicorn worker has its own pools)
+@app.get("/pool_stats", response_class=JSONResponse, dependencies=[Depends(auth.require_monitoring)])
+async def get_pool_stats():
+    return pool_stats()
+
+# Read-through cache hit/miss counters for this worker
+@app.get("/cache_stats", response_class=JSONResponse, dependencies=[Depends(auth.require_monitoring)])
+async def get_cache_stats():
+    return cache.stats()
+
+# Login throttling counters for this worker (see ratelimit.py)
+@app.get("/ratelimit_stats", response_class=JSONResponse, dependencies=[Depends(auth.require_monitoring)])
+async def get_ratelimit_stats():
+    return ratelimit.stats()
+
+# Live feed subscribers and delivered events for this worker
+@app.get("/feed_stats", response_class=JSONResponse, dependencies=[Depends(auth.require_monitoring)])
+async def get_feed_stats():
+    return feed.broker.stats()
+
+# Background job queue: job counts by status (queued, running, done, failed)
+@app.get("/job_stats", response_class=JSONResponse, dependencies=[Depends(auth.require_admin)])
+async def get_job_stats(db: DbSession = Depends(get_db)):
+    return await acrud.get_job_counts(db)
+
+# Prometheus metrics for this worker: route latency, queries, templates, pools
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(auth.require_monitoring)])
+async def get_metrics():
+    return PlainTextResponse(
+        metrics.render_metrics(pool_stats(), cache.stats(), ratelimit.rejected),
+        media_type="text/plain; version=0.0.4",
+    )
+
+# Incident counts by status, department, class and month (incident_stats table)
+@app.get("/incident_stats", response_class=JSONResponse, dependencies=[Depends(auth.require_staff("principal", "committee", allow_admin=True))])
+async def get_incident_stats(db: DbSession = Depends(get_db)):
+    return await acrud.get_incident_stats(db)
+
+# Recompute incident_stats from discipline_incidents (e.g. after manual SQL edits)
+@app.post("/incident_stats/rebuild", response_class=JSONResponse, dependencies=[Depends(auth.require_admin)])
+async def rebuild_incident_stats(db: DbSession = Depends(get_db)):
+    await acrud.rebuild_incident_stats(db)
+    return await acrud.get_incident_stats(db)
+
+# Recompute student_incident_summaries from discipline_incidents
+@app.post("/student_summaries/rebuild", response_class=JSONResponse, dependencies=[Depends(auth.require_admin)])
+async def rebuild_student_summaries(db: DbSession = Depends(get_db)):
+    await acrud.rebuild_student_summaries(db)
+    return {"status": "ok"}
 
 # 1) Home & Login Pages
 @app.get("/", response_class=HTMLResponse)
-def show_home(request: Request):
-    return templates.TemplateResponse("home.html", {"request": request})
+async def show_home(request: Request):
+    return rendering.render_page(request, "home.html")
 
 @app.get("/login", response_class=HTMLResponse)
-def show_login(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+async def show_login(request: Request):
+    return rendering.render_page(request, "login.html")
 
 # 2) Login Handler (Admin / Student / Staff)
+# Throttled per client IP (middleware) and per username (check_username) before
+# any query runs; see ratelimit.py
 @app.post("/login", response_class=HTMLResponse)
-def login(
+async def login(
     request: Request,
-    username: str = Form(...),
+    username: str = Depends(ratelimit.check_username),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
-    # Admin login (assign a dummy user_id for admin, e.g., 0)
+    # Admin login (a fixed session id of 0 for admin)
     if username == "admin" and password == "admin":
-        return RedirectResponse(url="/admindashboard?user_id=0", status_code=303)
-
-    # Student login
-    student = crud.get_student_by_credentials(db, username, password)
-    if student:
-        return RedirectResponse(url=f"/studentdashboard?user_id={student.id}", status_code=303)
-
-    # Staff login (principal, faculty, committee)
-    staff = crud.get_staff_by_credentials(db, username, password)
-    if staff:
-        return RedirectResponse(
-            url=f"/{staff.role}dashboard?user_id={staff.id}", status_code=303
+        await ratelimit.record_success(username)
+        return auth.set_session_cookie(
+            RedirectResponse(url="/admindashboard", status_code=303),
+            schemas.SessionUser(id=0, kind="admin", role="admin"),
         )
 
-    # Invalid credentials
+    # Student or staff (principal, faculty, committee) account, one query for both
+    accounts = await acrud.get_accounts_by_username(db, username)
+    if not accounts:
+        await security.verify_unknown_account_async(password)
+    for account in accounts:
+        if not await security.verify_password_async(account.password, password):
+            continue
+        if security.needs_rehash(account.password):
+            await acrud.set_password_hash(
+                db, account.kind, account.id, await security.hash_password_async(password)
+            )
+        if account.kind == "student":
+            response = RedirectResponse(url="/studentdashboard", status_code=303)
+        else:
+            response = RedirectResponse(url=f"/{account.role}dashboard", status_code=303)
+        user = schemas.SessionUser(id=account.id, kind=account.kind, role=account.role)
+        await ratelimit.record_success(username)
+        return auth.set_session_cookie(response, user)
+
+    # Invalid credentials (the attempt was charged in check_username)
     return templates.TemplateResponse(
         "login.html",
         {"request": request, "error": "Invalid credentials"},
         status_code=401
     )
 
+@app.get("/logout")
+async def logout():
+    return auth.clear_session_cookie(RedirectResponse(url="/login", status_code=303))
+
 # 3) Admin Dashboard & CRUD Modules
 @app.get("/admindashboard", response_class=HTMLResponse)
-def admin_dashboard(request: Request, user_id: int, db: Session = Depends(get_db)):
-    incidents = crud.get_all_incidents(db)
-    return templates.TemplateResponse("admindashboard.html", {"request": request, "incidents": incidents, "user_id": user_id})
+async def admin_dashboard(
+    request: Request,
+    user: schemas.SessionUser = Depends(auth.require_admin),
+    listing: IncidentListing = Depends(),
+    db: DbSession = Depends(get_db)
+):
+    return templates.TemplateResponse("admindashboard.html", {
+        "request": request,
+        "user_id": user.id,
+        "stats": await acrud.get_incident_stats(db),
+        **await listing.load(db)
+    })
+
+# Staff and student rosters: one page at a time, optional name/username prefix
+# search. Writes redirect back here (303) with a flash message instead of
+# re-rendering the whole roster.
+class RosterListing:
+    def __init__(
+        self,
+        q: Optional[str] = Query(None, max_length=100),
+        cursor: Optional[int] = None,
+        limit: int = Query(crud.ROSTER_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    ):
+        self.q = (q or "").strip() or None
+        self.cursor = cursor
+        self.limit = limit
+
+    async def render(self, request: Request, db: DbSession, template: str, key: str, load_page):
+        page = await load_page(db, self.q, self.cursor, self.limit)
+        message = auth.get_flash(request)
+        response = templates.TemplateResponse(template, {
+            "request": request,
+            key: page.items,
+            "next_cursor": page.next_cursor,
+            "q": self.q,
+            "message": message,
+        })
+        return auth.clear_flash(response) if message else response
+
+def redirect_with_flash(url: str, message: str):
+    return auth.flash(RedirectResponse(url, status_code=303), message)
+
+def render_with_flash(request: Request, template: str, context: dict):
+    message = auth.get_flash(request)
+    response = templates.TemplateResponse(template, {"request": request, "message": message, **context})
+    return auth.clear_flash(response) if message else response
+
+def run_jobs_after_response(background_tasks: BackgroundTasks):
+    # Without a job worker (JOBS_INLINE=1), drain the queue here once the response is sent
+    if jobs.JOBS_INLINE:
+        background_tasks.add_task(jobs.drain)
+
+def bulk_update_message(result: crud.BulkUpdateResult) -> str:
+    message = f"Updated {len(result.updated)} incident(s)."
+    if result.conflicts:
+        ids = ", ".join(map(str, result.conflicts))
+        message += f" Not updated, changed by someone else since you loaded the page: {ids}."
+    return message
 
 # Staff Members (create Principal/Faculty/Committee)
-@app.get("/staffmembers", response_class=HTMLResponse)
-def staffmembers_form(request: Request, db: Session = Depends(get_db)):
-    staff_members = db.query(models.StaffMember).all()
-    return templates.TemplateResponse("staffmembers.html", {"request": request, "staff_members": staff_members, "message": None})
+@app.get("/staffmembers", response_class=HTMLResponse, dependencies=[Depends(auth.require_admin)])
+async def staffmembers_form(request: Request, listing: RosterListing = Depends(), db: DbSession = Depends(get_db)):
+    return await listing.render(request, db, "staffmembers.html", "staff_members", acrud.get_staff_page)
 
-@app.post("/add_staff", response_class=HTMLResponse)
-def add_staff(
-    request: Request,
+@app.post("/add_staff", dependencies=[Depends(auth.require_admin)])
+async def add_staff(
     name: str = Form(...),
     username: str = Form(...),
     password: str = Form(...),
     role: str = Form(...),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
-    crud.create_staff_member(
+    await acrud.create_staff_member(
         db,
-        schemas.StaffMemberCreate(name=name, username=username, password=password, role=role)
-    )
-    staff_members = db.query(models.StaffMember).all()
-    return templates.TemplateResponse(
-        "staffmembers.html",
-        {"request": request, "staff_members": staff_members, "message": f"{role.title()} added successfully!"}
+        schemas.StaffMemberCreate(name=name, username=username, password=password, role=role),
+        await security.hash_password_async(password)
     )
+    return redirect_with_flash("/staffmembers", f"{role.title()} added successfully!")
 
-@app.get("/edit_staff/{staff_id}", response_class=HTMLResponse)
-def edit_staff(request: Request, staff_id: int, db: Session = Depends(get_db)):
-    staff = db.query(models.StaffMember).filter(models.StaffMember.id == staff_id).first()
+@app.get("/edit_staff/{staff_id}", response_class=HTMLResponse, dependencies=[Depends(auth.require_admin)])
+async def edit_staff(request: Request, staff_id: int, db: DbSession = Depends(get_db)):
+    staff = await acrud.get_staff_by_id(db, staff_id)
     if not staff:
         return templates.TemplateResponse("error.html", {"request": request, "message": "Staff not found"}, status_code=404)
     return templates.TemplateResponse("edit_staff.html", {"request": request, "staff": staff})
 
-@app.post("/update_staff/{staff_id}", response_class=HTMLResponse)
-def update_staff(
-    request: Request,
+@app.post("/update_staff/{staff_id}", dependencies=[Depends(auth.require_admin)])
+async def update_staff(
     staff_id: int,
     name: str = Form(...),
     username: str = Form(...),
     password: str = Form(...),
     role: str = Form(...),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
-    staff = db.query(models.StaffMember).filter(models.StaffMember.id == staff_id).first()
-    if staff:
-        staff.name = name
-        staff.username = username
-        staff.password = password
-        staff.role = role
-        db.commit()
-    staff_members = db.query(models.StaffMember).all()
-    return templates.TemplateResponse(
-        "staffmembers.html",
-        {"request": request, "staff_members": staff_members, "message": "Staff updated successfully!"}
+    await acrud.update_staff_member(
+        db,
+        staff_id,
+        schemas.StaffMemberCreate(name=name, username=username, password=password, role=role),
+        await security.hash_password_async(password)
     )
+    return redirect_with_flash("/staffmembers", "Staff updated successfully!")
 
-@app.post("/delete_staff/{staff_id}", response_class=HTMLResponse)
-def delete_staff(request: Request, staff_id: int, db: Session = Depends(get_db)):
-    staff = db.query(models.StaffMember).filter(models.StaffMember.id == staff_id).first()
-    if staff:
-        db.delete(staff)
-        db.commit()
-    staff_members = db.query(models.StaffMember).all()
-    return templates.TemplateResponse(
-        "staffmembers.html",
-        {"request": request, "staff_members": staff_members, "message": "Staff deleted successfully!"}
-    )
+@app.post("/delete_staff/{staff_id}", dependencies=[Depends(auth.require_admin)])
+async def delete_staff(staff_id: int, db: DbSession = Depends(get_db)):
+    await acrud.delete_staff_member(db, staff_id)
+    return redirect_with_flash("/staffmembers", "Staff deleted successfully!")
 
 # Students (create student accounts)
-@app.get("/students", response_class=HTMLResponse)
-def students_form(request: Request, db: Session = Depends(get_db)):
-    students = db.query(models.Student).all()
-    return templates.TemplateResponse("students.html", {"request": request, "students": students, "message": None})
+@app.get("/students", response_class=HTMLResponse, dependencies=[Depends(auth.require_admin)])
+async def students_form(request: Request, listing: RosterListing = Depends(), db: DbSession = Depends(get_db)):
+    return await listing.render(request, db, "students.html", "students", acrud.get_students_page)
 
-@app.post("/add_student", response_class=HTMLResponse)
-def add_student(
-    request: Request,
+@app.post("/add_student", dependencies=[Depends(auth.require_admin)])
+async def add_student(
     name: str = Form(...),
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
-    crud.create_student(
+    await acrud.create_student(
         db,
-        schemas.StudentCreate(name=name, username=username, password=password)
-    )
-    students = db.query(models.Student).all()
-    return templates.TemplateResponse(
-        "students.html",
-        {"request": request, "students": students, "message": "Student added successfully!"}
+        schemas.StudentCreate(name=name, username=username, password=password),
+        await security.hash_password_async(password)
     )
+    return redirect_with_flash("/students", "Student added successfully!")
 
-@app.get("/edit_student/{student_id}", response_class=HTMLResponse)
-def edit_student(request: Request, student_id: int, db: Session = Depends(get_db)):
-    student = db.query(models.Student).filter(models.Student.id == student_id).first()
+@app.get("/edit_student/{student_id}", response_class=HTMLResponse, dependencies=[Depends(auth.require_admin)])
+async def edit_student(request: Request, student_id: int, db: DbSession = Depends(get_db)):
+    student = await acrud.get_student_by_id(db, student_id)
     if not student:
         return templates.TemplateResponse("error.html", {"request": request, "message": "Student not found"}, status_code=404)
     return templates.TemplateResponse("edit_student.html", {"request": request, "student": student})
 
-@app.post("/update_student/{student_id}", response_class=HTMLResponse)
-def update_student(
-    request: Request,
+@app.post("/update_student/{student_id}", dependencies=[Depends(auth.require_admin)])
+async def update_student(
     student_id: int,
     name: str = Form(...),
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
-    student = db.query(models.Student).filter(models.Student.id == student_id).first()
-    if student:
-        student.name = name
-        student.username = username
-        student.password = password
-        db.commit()
-    students = db.query(models.Student).all()
-    return templates.TemplateResponse(
-        "students.html",
-        {"request": request, "students": students, "message": "Student updated successfully!"}
+    await acrud.update_student(
+        db,
+        student_id,
+        schemas.StudentCreate(name=name, username=username, password=password),
+        await security.hash_password_async(password)
     )
+    return redirect_with_flash("/students", "Student updated successfully!")
 
-@app.post("/delete_student/{student_id}", response_class=HTMLResponse)
-def delete_student(request: Request, student_id: int, db: Session = Depends(get_db)):
-    student = db.query(models.Student).filter(models.Student.id == student_id).first()
-    if student:
-        db.delete(student)
-        db.commit()
-    students = db.query(models.Student).all()
-    return templates.TemplateResponse(
-        "students.html",
-        {"request": request, "students": students, "message": "Student deleted successfully!"}
+@app.post("/delete_student/{student_id}", dependencies=[Depends(auth.require_admin)])
+async def delete_student(student_id: int, db: DbSession = Depends(get_db)):
+    await acrud.delete_student(db, student_id)
+    return redirect_with_flash("/students", "Student deleted successfully!")
+
+# Bulk import (CSV with a header row, NDJSON, or a JSON array)
+async def run_import(file: UploadFile, schema, insert_batch, db: DbSession, prepare=None):
+    try:
+        return await importer.run_import(db, file, schema, insert_batch, prepare=prepare)
+    except importer.ImportFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@app.post("/import/students", response_class=JSONResponse, dependencies=[Depends(auth.require_admin)])
+async def import_students(file: UploadFile = File(...), db: DbSession = Depends(get_db)):
+    return await run_import(
+        file, schemas.StudentCreate, acrud.bulk_create_students, db,
+        prepare=importer.hash_account_passwords,
+    )
+
+@app.post("/import/staff", response_class=JSONResponse, dependencies=[Depends(auth.require_admin)])
+async def import_staff(file: UploadFile = File(...), db: DbSession = Depends(get_db)):
+    return await run_import(
+        file, schemas.StaffMemberCreate, acrud.bulk_create_staff_members, db,
+        prepare=importer.hash_account_passwords,
+    )
+
+@app.post("/import/incidents", response_class=JSONResponse, dependencies=[Depends(auth.require_staff("faculty", allow_admin=True))])
+async def import_incidents(file: UploadFile = File(...), db: DbSession = Depends(get_db)):
+    return await run_import(file, schemas.IncidentCreate, acrud.bulk_create_incidents, db)
+
+# Streaming export (same filters as the incident listing pages)
+EXPORT_FORMAT = Query("csv", pattern="^(csv|ndjson)$")
+
+@app.get("/export/incidents", dependencies=[Depends(auth.require_staff(allow_admin=True))])
+async def export_incidents(
+    format: str = EXPORT_FORMAT,
+    filters: schemas.IncidentFilters = Depends(incident_filters),
+):
+    return exporter.export_response(
+        crud.incident_export_query(filters), crud.INCIDENT_EXPORT_COLUMNS, "incidents", format
+    )
+
+@app.get("/export/students", dependencies=[Depends(auth.require_admin)])
+async def export_students(format: str = EXPORT_FORMAT):
+    return exporter.export_response(
+        crud.student_export_query(), crud.STUDENT_EXPORT_COLUMNS, "students", format
+    )
+
+@app.get("/export/staff", dependencies=[Depends(auth.require_admin)])
+async def export_staff(format: str = EXPORT_FORMAT):
+    return exporter.export_response(
+        crud.staff_export_query(), crud.STAFF_EXPORT_COLUMNS, "staff", format
+    )
+
+# Live incident feed (Server-Sent Events): incident.created, incident.status_changed,
+# incidents.imported and resync events, so listing pages update without polling
+@app.get("/incident_feed", dependencies=[Depends(auth.require_staff(allow_admin=True))])
+async def incident_feed(request: Request):
+    return StreamingResponse(
+        feed.event_stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 # Static Admin Modules
 @app.get("/checkbeststudentawards", response_class=HTMLResponse)
-def check_best_student_awards(request: Request, db: Session = Depends(get_db)):
+async def check_best_student_awards(request: Request):
     # Placeholder logic for awards
-    return templates.TemplateResponse("checkbeststudentawards.html", {"request": request})
+    return rendering.render_page(request, "checkbeststudentawards.html")
 
 @app.get("/applyscholarship", response_class=HTMLResponse)
-def apply_scholarship(request: Request):
-    return templates.TemplateResponse("applyscholarship.html", {"request": request})
+async def apply_scholarship(request: Request):
+    return rendering.render_page(request, "applyscholarship.html")
 
 @app.get("/applybeststudentaward", response_class=HTMLResponse)
-def apply_best_student_award(request: Request):
-    return templates.TemplateResponse("applybeststudentaward.html", {"request": request})
-
-@app.get("/disciplineactions", response_class=HTMLResponse)
-def discipline_actions(request: Request, db: Session = Depends(get_db)):
-    incidents = crud.get_all_incidents(db)
-    return templates.TemplateResponse("disciplineactions.html", {"request": request, "incidents": incidents})
-
-@app.get("/assignactions", response_class=HTMLResponse)
-def assign_actions(request: Request, db: Session = Depends(get_db)):
-    incidents = crud.get_all_incidents(db)
-    return templates.TemplateResponse("assignactions.html", {"request": request, "incidents": incidents})
-
-@app.get("/disciplineincidents", response_class=HTMLResponse)
-def view_incidents(request: Request, db: Session = Depends(get_db)):
-    incidents = crud.get_all_incidents(db)
-    return templates.TemplateResponse("disciplineincidents.html", {"request": request, "incidents": incidents})
-
-@app.post("/update_incident_status", response_class=HTMLResponse)
-def update_incident_status(
+async def apply_best_student_award(request: Request):
+    return rendering.render_page(request, "applybeststudentaward.html")
+
+@app.get("/disciplineactions", response_class=HTMLResponse, dependencies=[Depends(auth.require_admin)])
+async def discipline_actions(request: Request, listing: IncidentListing = Depends(), db: DbSession = Depends(get_db)):
+    return templates.TemplateResponse("disciplineactions.html", {"request": request, **await listing.load(db)})
+
+@app.get("/assignactions", response_class=HTMLResponse, dependencies=[Depends(auth.require_admin)])
+async def assign_actions(request: Request, listing: IncidentListing = Depends(), db: DbSession = Depends(get_db)):
+    return templates.TemplateResponse("assignactions.html", {"request": request, **await listing.load(db)})
+
+@app.get("/disciplineincidents", response_class=HTMLResponse, dependencies=[Depends(auth.require_admin)])
+async def view_incidents(request: Request, listing: IncidentListing = Depends(), db: DbSession = Depends(get_db)):
+    return render_with_flash(request, "disciplineincidents.html", await listing.load(db))
+
+@app.post("/update_incident_status", response_class=HTMLResponse, dependencies=[Depends(auth.require_staff("committee", allow_admin=True))])
+async def update_incident_status(
     request: Request,
     incident_id: int = Form(...),
-    status: str = Form(...),
-    db: Session = Depends(get_db)
+    status: models.IncidentStatus = Form(...),
+    db: DbSession = Depends(get_db)
 ):
-    incident = db.query(models.DisciplineIncident).filter(models.DisciplineIncident.id == incident_id).first()
-    if incident:
-        incident.status = status
-        db.commit()
+    await acrud.update_incident_status(db, incident_id, status)
     return RedirectResponse(url="/disciplineincidents", status_code=303)
 
+# Several incidents at once: one incident_id + version pair per selected row
+@app.post("/bulk_update_incident_status", response_class=HTMLResponse, dependencies=[Depends(auth.require_staff("committee", allow_admin=True))])
+async def bulk_update_incident_status(
+    status: models.IncidentStatus = Form(...),
+    versions: dict = Depends(incident_versions),
+    db: DbSession = Depends(get_db)
+):
+    result = await acrud.bulk_update_incident_status(db, versions, status)
+    return redirect_with_flash("/disciplineincidents", bulk_update_message(result))
+
 @app.get("/severitylevels", response_class=HTMLResponse)
-def severity_levels(request: Request):
-    return templates.TemplateResponse("severitylevels.html", {"request": request})
+async def severity_levels(request: Request):
+    return rendering.render_page(request, "severitylevels.html")
 
 @app.get("/checkscholarship", response_class=HTMLResponse)
-def check_scholarship(request: Request, db: Session = Depends(get_db)):
+async def check_scholarship(request: Request):
     # Placeholder logic for scholarships
-    return templates.TemplateResponse("checkscholarship.html", {"request": request})
+    return rendering.render_page(request, "checkscholarship.html")
 
 @app.get("/departments", response_class=HTMLResponse)
-def departments(request: Request):
-    return templates.TemplateResponse("departments.html", {"request": request})
+async def departments(request: Request):
+    return rendering.render_page(request, "departments.html")
 
 @app.get("/classes", response_class=HTMLResponse)
-def classes(request: Request):
-    return templates.TemplateResponse("classes.html", {"request": request})
+async def classes(request: Request):
+    return rendering.render_page(request, "classes.html")
 
 # 4) Student Dashboard
 @app.get("/studentdashboard", response_class=HTMLResponse)
-def student_dashboard(request: Request, user_id: int, db: Session = Depends(get_db)):
-    student = crud.get_student_by_id(db, user_id)
+async def student_dashboard(request: Request, user: schemas.SessionUser = Depends(auth.require_student), db: DbSession = Depends(get_db)):
+    student = await auth.cached_account(db, "student", user.id)
     if not student:
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "message": "Student not found"},
             status_code=404
         )
-    incidents = db.query(models.DisciplineIncident).filter(models.DisciplineIncident.student_id == str(user_id)).all()
+    # Counts, open incidents and latest action come from the summary row
+    summary = await acrud.get_student_summary(db, user.id)
     return templates.TemplateResponse("studentdashboard.html", {
         "request": request,
         "student": student,
-        "incidents": incidents
+        "summary": summary
     })
 
 # 5) Staff Dashboards (Principal, Faculty, Committee)
 @app.get("/principaldashboard", response_class=HTMLResponse)
-def principal_dashboard(request: Request, user_id: int, db: Session = Depends(get_db)):
-    staff = crud.get_staff_by_id(db, user_id)
+async def principal_dashboard(
+    request: Request,
+    user: schemas.SessionUser = Depends(auth.require_staff("principal")),
+    listing: IncidentListing = Depends(),
+    db: DbSession = Depends(get_db)
+):
+    staff = await auth.cached_account(db, "staff", user.id)
     if not staff:
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "message": "Staff not found"},
             status_code=404
         )
-    incidents = crud.get_all_incidents(db)
     return templates.TemplateResponse("principaldashboard.html", {
         "request": request,
         "staff": staff,
-        "incidents": incidents
+        "stats": await acrud.get_incident_stats(db),
+        **await listing.load(db)
     })
 
 @app.get("/facultydashboard", response_class=HTMLResponse)
-def faculty_dashboard(request: Request, user_id: int, db: Session = Depends(get_db)):
-    staff = crud.get_staff_by_id(db, user_id)
+async def faculty_dashboard(
+    request: Request,
+    user: schemas.SessionUser = Depends(auth.require_staff("faculty")),
+    listing: IncidentListing = Depends(),
+    db: DbSession = Depends(get_db)
+):
+    staff = await auth.cached_account(db, "staff", user.id)
     if not staff:
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "message": "Staff not found"},
             status_code=404
         )
-    incidents = crud.get_all_incidents(db)
     return templates.TemplateResponse("facultydashboard.html", {
         "request": request,
         "staff": staff,
-        "incidents": incidents
+        **await listing.load(db)
     })
 
 @app.get("/committeedashboard", response_class=HTMLResponse)
-def committee_dashboard(request: Request, user_id: int, db: Session = Depends(get_db)):
-    staff = crud.get_staff_by_id(db, user_id)
+async def committee_dashboard(
+    request: Request,
+    user: schemas.SessionUser = Depends(auth.require_staff("committee")),
+    listing: IncidentListing = Depends(),
+    db: DbSession = Depends(get_db)
+):
+    staff = await auth.cached_account(db, "staff", user.id)
     if not staff:
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "message": "Staff not found"},
             status_code=404
         )
-    incidents = crud.get_all_incidents(db)
     return templates.TemplateResponse("committeedashboard.html", {
         "request": request,
         "staff": staff,
-        "incidents": incidents
+        **await listing.load(db)
     })
 
 # Student Routes
 @app.get("/sd_disciplineincidents", response_class=HTMLResponse)
-def sd_discipline_incidents(request: Request, user_id: int, db: Session = Depends(get_db)):
-    student = crud.get_student_by_id(db, user_id)
+async def sd_discipline_incidents(request: Request, user: schemas.SessionUser = Depends(auth.require_student), db: DbSession = Depends(get_db)):
+    student = await auth.cached_account(db, "student", user.id)
     if not student:
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "message": "Student not found"},
             status_code=404
         )
-    incidents = db.query(models.DisciplineIncident).filter(models.DisciplineIncident.student_id == str(user_id)).all()
+    # Listed from discipline_incidents itself, never from the derived summary
+    incidents = await acrud.get_incidents_for_student(db, user.id)
     return templates.TemplateResponse("sd_disciplineincidents.html", {
         "request": request,
         "incidents": incidents,
@@ -346,15 +574,15 @@ def sd_discipline_incidents(request: Request, user_id: int, db: Session = Depend
     })
 
 @app.get("/sd_viewdisciplineactions", response_class=HTMLResponse)
-def sd_view_actions(request: Request, user_id: int, db: Session = Depends(get_db)):
-    student = crud.get_student_by_id(db, user_id)
+async def sd_view_actions(request: Request, user: schemas.SessionUser = Depends(auth.require_student), db: DbSession = Depends(get_db)):
+    student = await auth.cached_account(db, "student", user.id)
     if not student:
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "message": "Student not found"},
             status_code=404
         )
-    incidents = db.query(models.DisciplineIncident).filter(models.DisciplineIncident.student_id == str(user_id)).all()
+    incidents = await acrud.get_incidents_for_student(db, user.id)
     return templates.TemplateResponse("sd_viewdisciplineactions.html", {
         "request": request,
         "actions": incidents,
@@ -362,40 +590,44 @@ def sd_view_actions(request: Request, user_id: int, db: Session = Depends(get_db
     })
 
 @app.get("/sd_applyscholarship", response_class=HTMLResponse)
-def sd_apply_scholarship(request: Request, user_id: int):
-    return templates.TemplateResponse("sd_applyscholarship.html", {"request": request, "user_id": user_id})
+async def sd_apply_scholarship(request: Request, user: schemas.SessionUser = Depends(auth.require_student)):
+    return rendering.render_page(request, "sd_applyscholarship.html", private=True, user_id=user.id)
 
 @app.get("/sd_applyaward", response_class=HTMLResponse)
-def sd_apply_award(request: Request, user_id: int):
-    return templates.TemplateResponse("sd_applyaward.html", {"request": request, "user_id": user_id})
+async def sd_apply_award(request: Request, user: schemas.SessionUser = Depends(auth.require_student)):
+    return rendering.render_page(request, "sd_applyaward.html", private=True, user_id=user.id)
 
 # Faculty Routes
 @app.get("/fd_disciplineincidents", response_class=HTMLResponse)
-def fd_discipline_incidents(request: Request, user_id: int, db: Session = Depends(get_db)):
-    staff = crud.get_staff_by_id(db, user_id)
+async def fd_discipline_incidents(
+    request: Request,
+    user: schemas.SessionUser = Depends(auth.require_staff("faculty")),
+    listing: IncidentListing = Depends(),
+    db: DbSession = Depends(get_db)
+):
+    staff = await auth.cached_account(db, "staff", user.id)
     if not staff:
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "message": "Staff not found"},
             status_code=404
         )
-    incidents = crud.get_all_incidents(db)
     return templates.TemplateResponse("fd_disciplineincidents.html", {
         "request": request,
-        "incidents": incidents,
-        "staff": staff
+        "staff": staff,
+        **await listing.load(db)
     })
 
-@app.post("/fd_submit_incident", response_class=HTMLResponse)
-def fd_submit_incident(
+@app.post("/fd_submit_incident", response_class=HTMLResponse, dependencies=[Depends(auth.require_staff("faculty")), Depends(run_jobs_after_response)])
+async def fd_submit_incident(
     request: Request,
-    student_id: str = Form(...),
+    student_id: int = Form(...),
     student_name: str = Form(...),
     class_name: str = Form(...),
     department: str = Form(...),
     incident_date: str = Form(...),
     description: str = Form(...),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     incident_data = schemas.IncidentCreate(
         student_id=student_id,
@@ -405,83 +637,148 @@ def fd_submit_incident(
         incident_date=incident_date,
         description=description
     )
-    crud.create_incident(db, incident_data)
+    if not await acrud.create_incident(db, incident_data):
+        return templates.TemplateResponse(
+            "error.html",
+            {"request": request, "message": f"No student with id {student_id}"},
+            status_code=400
+        )
     return RedirectResponse(url="/fd_disciplineincidents", status_code=303)
 
 @app.get("/fd_applybeststudentaward", response_class=HTMLResponse)
-def fd_best_award(request: Request, user_id: int):
-    return templates.TemplateResponse("fd_applybeststudentaward.html", {"request": request, "user_id": user_id})
+async def fd_best_award(request: Request, user: schemas.SessionUser = Depends(auth.require_staff("faculty"))):
+    return rendering.render_page(request, "fd_applybeststudentaward.html", private=True, user_id=user.id)
 
 @app.get("/fd_applyscholarship", response_class=HTMLResponse)
-def fd_scholarship(request: Request, user_id: int):
-    return templates.TemplateResponse("fd_applyscholarship.html", {"request": request, "user_id": user_id})
+async def fd_scholarship(request: Request, user: schemas.SessionUser = Depends(auth.require_staff("faculty"))):
+    return rendering.render_page(request, "fd_applyscholarship.html", private=True, user_id=user.id)
 
 # Committee Routes
 @app.get("/cd_disciplineincidents", response_class=HTMLResponse)
-def cd_view_incidents(request: Request, user_id: int, db: Session = Depends(get_db)):
-    staff = crud.get_staff_by_id(db, user_id)
+async def cd_view_incidents(
+    request: Request,
+    user: schemas.SessionUser = Depends(auth.require_staff("committee")),
+    listing: IncidentListing = Depends(),
+    db: DbSession = Depends(get_db)
+):
+    staff = await auth.cached_account(db, "staff", user.id)
     if not staff:
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "message": "Staff not found"},
             status_code=404
         )
-    incidents = crud.get_all_incidents(db)
     return templates.TemplateResponse("cd_disciplineincidents.html", {
         "request": request,
-        "incidents": incidents,
-        "staff": staff
+        "staff": staff,
+        **await listing.load(db)
+    })
+
+# Students with the most incidents, read from student_incident_summaries
+@app.get("/repeat_offenders", response_class=HTMLResponse)
+async def repeat_offenders(
+    request: Request,
+    limit: int = Query(crud.REPEAT_OFFENDER_LIMIT, ge=1, le=crud.MAX_PAGE_SIZE),
+    min_incidents: int = Query(2, ge=1),
+    user: schemas.SessionUser = Depends(auth.require_staff("committee", "principal", allow_admin=True)),
+    db: DbSession = Depends(get_db)
+):
+    offenders = await acrud.get_repeat_offenders(db, limit, min_incidents)
+    return templates.TemplateResponse("repeatoffenders.html", {
+        "request": request,
+        "user_id": user.id,
+        "offenders": offenders,
+        "min_incidents": min_incidents,
+    })
+
+# Full-text search over incident descriptions, best match first
+@app.get("/search_incidents", response_class=HTMLResponse)
+async def search_incidents(
+    request: Request,
+    q: str = Query("", max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    user: schemas.SessionUser = Depends(auth.require_staff("committee", "principal", allow_admin=True)),
+    db: DbSession = Depends(get_db)
+):
+    results, next_cursor = [], None
+    if q.strip():
+        try:
+            results, next_cursor = await acrud.search_incidents(db, q.strip(), cursor, limit)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    return templates.TemplateResponse("searchincidents.html", {
+        "request": request,
+        "user_id": user.id,
+        "q": q,
+        "results": results,
+        "next_cursor": next_cursor,
     })
 
 @app.get("/cd_assignactions", response_class=HTMLResponse)
-def cd_assign_actions(request: Request, user_id: int, db: Session = Depends(get_db)):
-    staff = crud.get_staff_by_id(db, user_id)
+async def cd_assign_actions(
+    request: Request,
+    user: schemas.SessionUser = Depends(auth.require_staff("committee")),
+    listing: IncidentListing = Depends(),
+    db: DbSession = Depends(get_db)
+):
+    staff = await auth.cached_account(db, "staff", user.id)
     if not staff:
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "message": "Staff not found"},
             status_code=404
         )
-    incidents = crud.get_all_incidents(db)
-    return templates.TemplateResponse("cd_assignactions.html", {
-        "request": request,
-        "incidents": incidents,
-        "staff": staff
+    return render_with_flash(request, "cd_assignactions.html", {
+        "staff": staff,
+        **await listing.load(db)
     })
 
-@app.post("/assign_action", response_class=HTMLResponse)
-def assign_action(
+@app.post("/assign_action", response_class=HTMLResponse, dependencies=[Depends(auth.require_staff("committee", allow_admin=True)), Depends(run_jobs_after_response)])
+async def assign_action(
     request: Request,
     incident_id: int = Form(...),
     action: str = Form(...),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
-    incident = db.query(models.DisciplineIncident).filter(models.DisciplineIncident.id == incident_id).first()
-    if incident:
-        incident.status = "Action Assigned: " + action
-        db.commit()
+    await acrud.assign_action(db, incident_id, action)
     return RedirectResponse(url="/cd_assignactions", status_code=303)
 
+@app.post("/bulk_assign_action", response_class=HTMLResponse, dependencies=[Depends(auth.require_staff("committee", allow_admin=True)), Depends(run_jobs_after_response)])
+async def bulk_assign_action(
+    action: str = Form(...),
+    versions: dict = Depends(incident_versions),
+    db: DbSession = Depends(get_db)
+):
+    result = await acrud.bulk_assign_action(db, versions, action)
+    return redirect_with_flash("/cd_assignactions", bulk_update_message(result))
+
 @app.get("/cd_disciplineactions", response_class=HTMLResponse)
-def cd_manage_actions(request: Request, user_id: int, db: Session = Depends(get_db)):
-    staff = crud.get_staff_by_id(db, user_id)
+async def cd_manage_actions(
+    request: Request,
+    year: Optional[int] = ACADEMIC_YEAR,
+    user: schemas.SessionUser = Depends(auth.require_staff("committee")),
+    db: DbSession = Depends(get_db)
+):
+    staff = await auth.cached_account(db, "staff", user.id)
     if not staff:
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "message": "Staff not found"},
             status_code=404
         )
-    incidents = db.query(models.DisciplineIncident).filter(models.DisciplineIncident.status.contains("Action Assigned")).all()
+    incidents = await acrud.get_incidents_with_actions(db, *year_range(year))
     return templates.TemplateResponse("cd_disciplineactions.html", {
         "request": request,
         "actions": incidents,
+        "year": year,
         "staff": staff
     })
 
 # Principal Routes
 @app.get("/pd_checkbeststudentawards", response_class=HTMLResponse)
-def pd_best_awards(request: Request, user_id: int, db: Session = Depends(get_db)):
-    staff = crud.get_staff_by_id(db, user_id)
+async def pd_best_awards(request: Request, user: schemas.SessionUser = Depends(auth.require_staff("principal")), db: DbSession = Depends(get_db)):
+    staff = await auth.cached_account(db, "staff", user.id)
     if not staff:
         return templates.TemplateResponse(
             "error.html",
@@ -496,24 +793,30 @@ def pd_best_awards(request: Request, user_id: int, db: Session = Depends(get_db)
     })
 
 @app.get("/pd_disciplineactions", response_class=HTMLResponse)
-def pd_discipline_actions(request: Request, user_id: int, db: Session = Depends(get_db)):
-    staff = crud.get_staff_by_id(db, user_id)
+async def pd_discipline_actions(
+    request: Request,
+    year: Optional[int] = ACADEMIC_YEAR,
+    user: schemas.SessionUser = Depends(auth.require_staff("principal")),
+    db: DbSession = Depends(get_db)
+):
+    staff = await auth.cached_account(db, "staff", user.id)
     if not staff:
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "message": "Staff not found"},
             status_code=404
         )
-    incidents = db.query(models.DisciplineIncident).filter(models.DisciplineIncident.status.contains("Action Assigned")).all()
+    incidents = await acrud.get_incidents_with_actions(db, *year_range(year))
     return templates.TemplateResponse("pd_disciplineactions.html", {
         "request": request,
         "actions": incidents,
+        "year": year,
         "staff": staff
     })
 
 @app.get("/pd_checkscholarship", response_class=HTMLResponse)
-def pd_check_scholarship(request: Request, user_id: int, db: Session = Depends(get_db)):
-    staff = crud.get_staff_by_id(db, user_id)
+async def pd_check_scholarship(request: Request, user: schemas.SessionUser = Depends(auth.require_staff("principal")), db: DbSession = Depends(get_db)):
+    staff = await auth.cached_account(db, "staff", user.id)
     if not staff:
         return templates.TemplateResponse(
             "error.html",
@@ -0,0 +1,224 @@
+"""Per-request performance metrics, exposed at /metrics in Prometheus text format.
+
+``MetricsMiddleware`` times every request by route template (``/edit_staff/{staff_id}``,
+not the raw path). It also collects what the request did on the way: the
+SQL statements and their time, counted by SQLAlchemy cursor events on
+every engine, and template render time, reported by rendering.py. Requests
+slower than SLOW_REQUEST_MS are logged on the "metrics.slow" logger with
+the statements they issued (not their parameters).
+
+Metrics are per worker process, like /pool_stats: scrape each worker, or
+run a single worker behind the scraper.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("metrics.slow")
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 500))  # 0 disables the slow log
+SLOW_LOG_MAX_STATEMENTS = int(os.getenv("SLOW_LOG_MAX_STATEMENTS", 50))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}  # labels -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: tuple, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i in range(index, len(self.buckets)):
+                series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def exposition(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            labels = _labels(zip(self.labels, label_values))
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {series[-2]}')
+            lines.append(f"{self.name}_count{_braced(labels)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_braced(labels)} {series[-1]:.6f}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(pairs) -> str:
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in pairs)
+
+def _braced(labels: str) -> str:
+    return f"{{{labels}}}" if labels else ""
+
+def _simple(name: str, kind: str, help: str, samples) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_braced(_labels(labels))} {value}")
+    return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route, until the last body chunk is sent.",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.",
+    ("method", "route"), QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request.",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+TEMPLATE_SECONDS = Histogram(
+    "template_render_seconds", "Jinja template render time.",
+    ("template",), LATENCY_BUCKETS,
+)
+
+
+# ─── Per-request collection ──────────────────────────────────────────────────────
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "template_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.statements: List[Tuple[float, str]] = []
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+# The start time lives on the statement's execution context, which is dropped
+# with the statement, so one that raises (no after_cursor_execute) leaves nothing behind.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "query_started", None)
+    if stats is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    if len(stats.statements) < SLOW_LOG_MAX_STATEMENTS:
+        stats.statements.append((elapsed, statement))
+
+def record_template(name: str, seconds: float):
+    TEMPLATE_SECONDS.observe((name,), seconds)
+    stats = _current.get()
+    if stats is not None:
+        stats.template_seconds += seconds
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed to their last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+        event_stream = False
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status, event_stream
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                event_stream = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", ())
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            self._record(scope, status, elapsed, stats, event_stream)
+
+    @staticmethod
+    def _record(scope, status: int, elapsed: float, stats: RequestStats, event_stream: bool = False):
+        route = scope.get("route")
+        route_path = getattr(route, "path", None) or "<unmatched>"
+        method = scope["method"]
+        REQUEST_QUERIES.observe((method, route_path), stats.queries)
+        REQUEST_DB_SECONDS.observe((method, route_path), stats.db_seconds)
+        if event_stream:
+            return  # open for minutes by design (feed.py); not a latency sample
+        REQUEST_SECONDS.observe((method, route_path, str(status)), elapsed)
+
+        if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+            statements = "\n".join(
+                f"  [{seconds * 1000:.1f} ms] {' '.join(sql.split())}" for seconds, sql in stats.statements
+            )
+            logger.warning(
+                "slow request %s %s (%s) status=%s %.1f ms, %d queries %.1f ms, templates %.1f ms\n%s",
+                method, scope["path"], route_path, status, elapsed * 1000,
+                stats.queries, stats.db_seconds * 1000, stats.template_seconds * 1000, statements,
+            )
+
+
+# ─── Exposition ──────────────────────────────────────────────────────────────────
+def render_metrics(pool_stats: dict, cache_stats: dict, login_rejected: Optional[dict] = None) -> str:
+    lines = []
+    for histogram in (REQUEST_SECONDS, REQUEST_QUERIES, REQUEST_DB_SECONDS, TEMPLATE_SECONDS):
+        lines.extend(histogram.exposition())
+
+    pools = {name: stats for name, stats in pool_stats.items() if isinstance(stats, dict)}
+    for name, key, kind, help in (
+        ("db_pool_checked_out", "checked_out", "gauge", "Connections currently checked out."),
+        ("db_pool_checked_in", "checked_in", "gauge", "Idle connections in the pool."),
+        ("db_pool_overflow", "overflow", "gauge", "Connections above pool_size."),
+        ("db_pool_checkouts_total", "checkouts", "counter", "Connection checkouts."),
+        ("db_pool_timeouts_total", "timeouts", "counter", "Checkouts that timed out waiting for a connection."),
+        ("db_pool_wait_seconds_total", "wait_seconds_total", "counter", "Time spent waiting for a pooled connection."),
+    ):
+        samples = [((("engine", engine),), stats[key]) for engine, stats in pools.items() if key in stats]
+        if samples:
+            lines.extend(_simple(name, kind, help, samples))
+
+    for key, help in (("hits", "Read-through cache hits."), ("misses", "Read-through cache misses."),
+                      ("invalidations", "Cache namespace invalidations.")):
+        lines.extend(_simple(f"cache_{key}_total", "counter", help, [((), cache_stats[key])]))
+
+    if login_rejected is not None:
+        samples = [((("reason", reason),), login_rejected.get(reason, 0)) for reason in ("ip", "username")]
+        lines.extend(_simple("login_rejected_total", "counter", "Login attempts refused by rate limiting.", samples))
+    return "\n".join(lines) + "\n"
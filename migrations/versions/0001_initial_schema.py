@@ -0,0 +1,72 @@
+"""Initial schema, as created by Base.metadata.create_all before migrations
+
+Databases created by the app before Alembic was introduced already have
+these tables: run ``alembic stamp 0001`` on them instead of upgrading.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("email", sa.String()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "students",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("username", sa.String()),
+        sa.Column("password", sa.String()),
+    )
+    op.create_index("ix_students_id", "students", ["id"])
+    op.create_index("ix_students_name", "students", ["name"])
+    op.create_index("ix_students_username", "students", ["username"], unique=True)
+
+    op.create_table(
+        "staff_members",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("password", sa.String(), nullable=False),
+        sa.Column("role", sa.String(), nullable=False),
+    )
+    op.create_index("ix_staff_members_id", "staff_members", ["id"])
+    op.create_index("ix_staff_members_username", "staff_members", ["username"], unique=True)
+    op.create_index("ix_staff_members_role", "staff_members", ["role"])
+
+    op.create_table(
+        "discipline_incidents",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("student_id", sa.String()),
+        sa.Column("student_name", sa.String()),
+        sa.Column("class_name", sa.String()),
+        sa.Column("department", sa.String()),
+        sa.Column("incident_date", sa.Date()),
+        sa.Column("description", sa.String()),
+        sa.Column("status", sa.String()),
+    )
+    op.create_index("ix_discipline_incidents_id", "discipline_incidents", ["id"])
+    op.create_index("ix_discipline_incidents_student_id", "discipline_incidents", ["student_id"])
+
+
+def downgrade():
+    op.drop_table("discipline_incidents")
+    op.drop_table("staff_members")
+    op.drop_table("students")
+    op.drop_table("users")
@@ -0,0 +1,166 @@
+"""Normalize incident status, add action column, make student_id an integer FK
+
+Existing rows are rewritten in id-range batches, each committed on its own,
+so no long-running transaction holds row locks on discipline_incidents. The
+column swap at the end takes a short ACCESS EXCLUSIVE lock; constraints are
+added NOT VALID and validated afterwards, and the new indexes are built
+CONCURRENTLY. Old code may keep writing while the batches run; a final
+pass under a table lock fixes the statuses it changed. Deploy the
+application code that matches this revision right after running it: once
+the status constraint exists, old code writing "Action Assigned: <action>"
+is rejected.
+
+Status values outside the known set are mapped to "Under Review";
+student_id values that are not numeric or do not match a student become NULL.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+STATUSES = ("Pending", "Under Review", "Action Assigned", "Resolved", "Dismissed")
+INDEXES = {
+    "ix_discipline_incidents_date_id": ["incident_date", "id"],
+    "ix_discipline_incidents_student_date": ["student_id", "incident_date", "id"],
+    "ix_discipline_incidents_status_date": ["status", "incident_date", "id"],
+    "ix_discipline_incidents_department_date": ["department", "incident_date", "id"],
+}
+
+
+def _status_assignments():
+    known = "\n".join(
+        f"                WHEN lower(status) = '{value.lower()}' THEN '{value}'" for value in STATUSES
+    )
+    return f"""
+            action = CASE
+                WHEN status LIKE 'Action Assigned:%' THEN NULLIF(trim(substr(status, 17)), '')
+                ELSE action
+            END,
+            status = CASE
+                WHEN status IS NULL THEN 'Pending'
+                WHEN status LIKE 'Action Assigned%' THEN 'Action Assigned'
+{known}
+                ELSE 'Under Review'
+            END"""
+
+
+def _backfill_statement(is_pg):
+    numeric = (
+        "student_id ~ '^[0-9]{1,9}$'" if is_pg
+        else "student_id <> '' AND length(student_id) <= 9 AND student_id NOT GLOB '*[^0-9]*'"
+    )
+    return sa.text(f"""
+        UPDATE discipline_incidents SET{_status_assignments()},
+            student_ref = CASE WHEN {numeric} THEN (
+                SELECT s.id FROM students s WHERE s.id = CAST(student_id AS INTEGER)
+            ) END
+        WHERE id >= :lo AND id < :hi
+    """)
+
+
+def _final_status_statement():
+    """Status fix-up for rows old code changed after their batch ran."""
+    known = ", ".join(f"'{value}'" for value in STATUSES)
+    return sa.text(f"""
+        UPDATE discipline_incidents SET{_status_assignments()}
+        WHERE status IS NULL OR status NOT IN ({known})
+    """)
+
+
+def _backfill(bind, statement, start=None):
+    """Rewrite rows in [start, max(id)] batch by batch; returns the next id."""
+    lo, hi = bind.execute(sa.text("SELECT min(id), max(id) FROM discipline_incidents")).one()
+    if hi is None:
+        return start
+    lo = lo if start is None else start
+    for batch_start in range(lo, hi + 1, BATCH_SIZE):
+        bind.execute(statement, {"lo": batch_start, "hi": batch_start + BATCH_SIZE})
+    return hi + 1
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_pg = bind.dialect.name == "postgresql"
+
+    op.add_column("discipline_incidents", sa.Column("action", sa.String()))
+    op.add_column("discipline_incidents", sa.Column("student_ref", sa.Integer()))
+
+    statement = _backfill_statement(is_pg)
+    with op.get_context().autocommit_block():
+        next_id = _backfill(bind, statement)
+
+    # Old code kept writing while the batches ran. From here on its writes
+    # wait for this transaction, and once incident_status is added (even NOT
+    # VALID) they fail the check, so VALIDATE below sees no stale statuses.
+    # Catch rows inserted meanwhile, re-normalize statuses it changed on
+    # rows already processed (old code never changes student_id), then swap.
+    if is_pg:
+        op.execute("LOCK TABLE discipline_incidents IN SHARE ROW EXCLUSIVE MODE")
+    _backfill(bind, statement, start=next_id)
+    bind.execute(_final_status_statement())
+    op.drop_index("ix_discipline_incidents_student_id", table_name="discipline_incidents")
+    with op.batch_alter_table("discipline_incidents") as batch:
+        batch.drop_column("student_id")
+        batch.alter_column("student_ref", new_column_name="student_id")
+
+    known = ", ".join(f"'{value}'" for value in STATUSES)
+    if is_pg:
+        op.execute(
+            "ALTER TABLE discipline_incidents ADD CONSTRAINT fk_discipline_incidents_student_id "
+            "FOREIGN KEY (student_id) REFERENCES students (id) ON DELETE SET NULL NOT VALID"
+        )
+        op.execute(
+            "ALTER TABLE discipline_incidents ADD CONSTRAINT incident_status "
+            f"CHECK (status IS NOT NULL AND status IN ({known})) NOT VALID"
+        )
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TABLE discipline_incidents VALIDATE CONSTRAINT fk_discipline_incidents_student_id")
+            op.execute("ALTER TABLE discipline_incidents VALIDATE CONSTRAINT incident_status")
+            # The validated CHECK proves NOT NULL, so this skips the table scan
+            op.execute("ALTER TABLE discipline_incidents ALTER COLUMN status SET NOT NULL")
+            op.execute("ALTER TABLE discipline_incidents ALTER COLUMN status SET DEFAULT 'Pending'")
+            for name, columns in INDEXES.items():
+                op.create_index(
+                    name, "discipline_incidents", columns,
+                    postgresql_concurrently=True, if_not_exists=True,
+                )
+    else:
+        with op.batch_alter_table("discipline_incidents") as batch:
+            batch.create_foreign_key(
+                "fk_discipline_incidents_student_id", "students",
+                ["student_id"], ["id"], ondelete="SET NULL",
+            )
+            batch.create_check_constraint("incident_status", f"status IN ({known})")
+            batch.alter_column("status", existing_type=sa.String(), type_=sa.String(32), nullable=False)
+        for name, columns in INDEXES.items():
+            op.create_index(name, "discipline_incidents", columns, if_not_exists=True)
+
+
+def downgrade():
+    for name in INDEXES:
+        if name != "ix_discipline_incidents_date_id":
+            op.drop_index(name, table_name="discipline_incidents")
+    with op.batch_alter_table("discipline_incidents") as batch:
+        batch.drop_constraint("incident_status", type_="check")
+        batch.drop_constraint("fk_discipline_incidents_student_id", type_="foreignkey")
+        batch.add_column(sa.Column("student_text", sa.String()))
+    op.execute(
+        "UPDATE discipline_incidents SET "
+        "student_text = CAST(student_id AS VARCHAR), "
+        "status = CASE WHEN action IS NOT NULL THEN 'Action Assigned: ' || action ELSE status END"
+    )
+    with op.batch_alter_table("discipline_incidents") as batch:
+        batch.drop_column("student_id")
+        batch.drop_column("action")
+        batch.alter_column("student_text", new_column_name="student_id")
+        batch.alter_column("status", nullable=True)
+    op.create_index("ix_discipline_incidents_student_id", "discipline_incidents", ["student_id"])
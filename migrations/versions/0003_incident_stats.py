@@ -0,0 +1,48 @@
+"""Add incident_stats summary table for dashboard counts
+
+The table holds one row per (dimension, bucket) with the number of incidents
+in it; the application adjusts the counts in the same transaction as each
+incident write. It is filled here with one GROUP BY per dimension.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "incident_stats",
+        sa.Column("dimension", sa.String(32), primary_key=True),
+        sa.Column("bucket", sa.String(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    if op.get_bind().dialect.name == "sqlite":
+        month = "strftime('%Y-%m', incident_date)"
+    else:
+        month = "to_char(incident_date, 'YYYY-MM')"
+    buckets = {
+        "status": "status",
+        "department": "COALESCE(department, '')",
+        "class_name": "COALESCE(class_name, '')",
+        "month": f"COALESCE({month}, '')",
+    }
+    for dimension, expression in buckets.items():
+        op.execute(
+            "INSERT INTO incident_stats (dimension, bucket, count) "
+            f"SELECT '{dimension}', {expression}, COUNT(*) FROM discipline_incidents "
+            f"GROUP BY {expression}"
+        )
+
+
+def downgrade():
+    op.drop_table("incident_stats")
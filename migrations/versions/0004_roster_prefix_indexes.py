@@ -0,0 +1,40 @@
+"""Add lower(name) / lower(username) prefix-search indexes on the rosters
+
+Built CONCURRENTLY on Postgres so the admin pages stay writable meanwhile.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    (f"ix_{table}_{column}_prefix", table, column)
+    for table in ("students", "staff_members")
+    for column in ("name", "username")
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, column in INDEXES:
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                    f"ON {table} (lower({column}) text_pattern_ops)"
+                )
+    else:
+        for name, table, column in INDEXES:
+            op.create_index(name, table, [sa.text(f"lower({column})")], if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
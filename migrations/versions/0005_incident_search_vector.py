@@ -0,0 +1,71 @@
+"""Add a trigger-maintained tsvector column and GIN index for description search
+
+Postgres only; other databases use the in-process fallback index in
+search.py. The column is added empty (no table rewrite), existing rows are
+filled in id-range batches committed one by one, and the GIN index is built
+CONCURRENTLY. A trigger rather than a STORED generated column keeps the
+ALTER TABLE instant: adding a generated column rewrites the whole table
+under an ACCESS EXCLUSIVE lock.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+SEARCH_CONFIG = "english"
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE discipline_incidents ADD COLUMN search_vector tsvector")
+    op.execute(f"""
+        CREATE FUNCTION discipline_incidents_search_vector() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector := to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.description, ''));
+            RETURN NEW;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER discipline_incidents_search_vector
+        BEFORE INSERT OR UPDATE OF description ON discipline_incidents
+        FOR EACH ROW EXECUTE FUNCTION discipline_incidents_search_vector()
+    """)
+
+    # Rows inserted from here on are filled by the trigger
+    statement = sa.text(f"""
+        UPDATE discipline_incidents
+        SET search_vector = to_tsvector('{SEARCH_CONFIG}', coalesce(description, ''))
+        WHERE id >= :lo AND id < :hi AND search_vector IS NULL
+    """)
+    with op.get_context().autocommit_block():
+        lo, hi = bind.execute(sa.text("SELECT min(id), max(id) FROM discipline_incidents")).one()
+        if hi is not None:
+            for batch_start in range(lo, hi + 1, BATCH_SIZE):
+                bind.execute(statement, {"lo": batch_start, "hi": batch_start + BATCH_SIZE})
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_discipline_incidents_search "
+            "ON discipline_incidents USING gin (search_vector)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_discipline_incidents_search")
+    op.execute("DROP TRIGGER IF EXISTS discipline_incidents_search_vector ON discipline_incidents")
+    op.execute("DROP FUNCTION IF EXISTS discipline_incidents_search_vector()")
+    op.execute("ALTER TABLE discipline_incidents DROP COLUMN search_vector")
@@ -0,0 +1,30 @@
+"""Add discipline_incidents.version for optimistic concurrency
+
+Every update bumps the version; bulk committee updates only touch rows still
+at the version the client loaded. A constant default makes ADD COLUMN a
+catalog-only change on Postgres 11+, so existing rows are not rewritten.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "discipline_incidents",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("discipline_incidents") as batch:
+        batch.drop_column("version")
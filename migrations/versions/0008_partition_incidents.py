@@ -0,0 +1,128 @@
+"""Range-partition discipline_incidents by incident_date, one partition per academic year
+
+Postgres only. The table is rebuilt: the old one is renamed, a partitioned
+copy is created with a partition per academic year from the oldest
+incident up to next year plus a default partition, the rows are copied and
+the old table dropped. This holds an ACCESS EXCLUSIVE lock on the incidents
+for the duration of the copy, so run it in a maintenance window.
+
+Partitioned tables need the partition key in every unique constraint, so
+the primary key becomes (id, incident_date); ids still come from the same
+sequence and stay unique. That makes incident_date NOT NULL: rows without
+a date are first given MISSING_DATE, which puts them in the default
+partition, out of the yearly listings, and their ids are logged so they
+can be dated by hand. Later partitions are created, and old ones archived,
+by partitions.py.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+import logging
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+YEAR_START_MONTH = 7
+MISSING_DATE = date(1970, 1, 1)
+SEARCH_CONFIG = "english"
+INDEXES = {
+    "ix_discipline_incidents_id": "(id)",
+    "ix_discipline_incidents_date_id": "(incident_date, id)",
+    "ix_discipline_incidents_student_date": "(student_id, incident_date, id)",
+    "ix_discipline_incidents_status_date": "(status, incident_date, id)",
+    "ix_discipline_incidents_department_date": "(department, incident_date, id)",
+    "ix_discipline_incidents_search": "USING gin (search_vector)",
+}
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def _academic_year(day: date) -> int:
+    return day.year if day.month >= YEAR_START_MONTH else day.year - 1
+
+def _swap_in(bind, old: str, partitioned: bool):
+    """Copy ``old`` into a new discipline_incidents and drop ``old``."""
+    op.execute(
+        f"CREATE TABLE discipline_incidents (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        + (" PARTITION BY RANGE (incident_date)" if partitioned else "")
+    )
+    if partitioned:
+        first = bind.execute(sa.text(f"SELECT min(incident_date) FROM {old} WHERE incident_date <> :missing"),
+                             {"missing": MISSING_DATE}).scalar()
+        current = _academic_year(date.today())
+        for year in range(_academic_year(first) if first else current, current + 2):
+            op.execute(
+                f"CREATE TABLE discipline_incidents_{year} PARTITION OF discipline_incidents "
+                f"FOR VALUES FROM ('{year}-{YEAR_START_MONTH:02d}-01') TO ('{year + 1}-{YEAR_START_MONTH:02d}-01')"
+            )
+        op.execute("CREATE TABLE discipline_incidents_default PARTITION OF discipline_incidents DEFAULT")
+    else:  # NOT NULL came from the partitioned primary key
+        op.execute("ALTER TABLE discipline_incidents ALTER COLUMN incident_date DROP NOT NULL")
+
+    op.execute(f"INSERT INTO discipline_incidents SELECT * FROM {old}")
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": old}).scalar()
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY discipline_incidents.id")
+    op.execute(f"DROP TABLE {old}")
+
+    op.execute(
+        "ALTER TABLE discipline_incidents ADD CONSTRAINT discipline_incidents_pkey PRIMARY KEY "
+        + ("(id, incident_date)" if partitioned else "(id)")
+    )
+    op.execute(
+        "ALTER TABLE discipline_incidents ADD CONSTRAINT fk_discipline_incidents_student_id "
+        "FOREIGN KEY (student_id) REFERENCES students (id) ON DELETE SET NULL"
+    )
+    for name, definition in INDEXES.items():
+        op.execute(f"CREATE INDEX {name} ON discipline_incidents {definition}")
+    op.execute("""
+        CREATE TRIGGER discipline_incidents_search_vector
+        BEFORE INSERT OR UPDATE OF description ON discipline_incidents
+        FOR EACH ROW EXECUTE FUNCTION discipline_incidents_search_vector()
+    """)
+
+
+def _backfill_missing_dates(bind):
+    """Give undated incidents MISSING_DATE, logging their ids, and move their
+    incident_stats month count from the '' bucket to that month."""
+    ids = bind.execute(sa.text(
+        "UPDATE discipline_incidents SET incident_date = :missing WHERE incident_date IS NULL RETURNING id"
+    ), {"missing": MISSING_DATE}).scalars().all()
+    if ids:
+        op.execute(sa.text(
+            "INSERT INTO incident_stats (dimension, bucket, count) VALUES ('month', :bucket, :count) "
+            "ON CONFLICT (dimension, bucket) DO UPDATE SET count = incident_stats.count + excluded.count"
+        ).bindparams(bucket=MISSING_DATE.strftime("%Y-%m"), count=len(ids)))
+        op.execute(sa.text(
+            "UPDATE incident_stats SET count = count - :count WHERE dimension = 'month' AND bucket = ''"
+        ).bindparams(count=len(ids)))
+        logger.warning(
+            "%d incidents had no incident_date and are now dated %s (default partition): ids %s",
+            len(ids), MISSING_DATE, ", ".join(map(str, sorted(ids))),
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    _backfill_missing_dates(bind)
+    op.execute("CREATE SCHEMA IF NOT EXISTS archive")
+    op.execute("ALTER TABLE discipline_incidents RENAME TO discipline_incidents_unpartitioned")
+    _swap_in(bind, "discipline_incidents_unpartitioned", partitioned=True)
+
+
+def downgrade():
+    # Partitions already moved to the archive schema are not brought back.
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    op.execute("ALTER TABLE discipline_incidents RENAME TO discipline_incidents_partitioned")
+    _swap_in(bind, "discipline_incidents_partitioned", partitioned=False)
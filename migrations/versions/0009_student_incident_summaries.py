@@ -0,0 +1,65 @@
+"""Add student_incident_summaries: per-student incident totals
+
+One row per student with incidents, holding incident count, open count,
+last incident date and latest action. The application adjusts it in the
+same transaction as each incident write. It is filled here from
+discipline_incidents; the latest action is taken from the newest incident
+that has one, as there is no assignment timestamp.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+OPEN_STATUSES = ("Pending", "Under Review", "Action Assigned")
+
+
+def upgrade():
+    op.create_table(
+        "student_incident_summaries",
+        sa.Column(
+            "student_id", sa.Integer(),
+            sa.ForeignKey("students.id", name="fk_student_incident_summaries_student_id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("incident_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("open_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_incident_date", sa.Date()),
+        sa.Column("latest_action", sa.String()),
+    )
+    op.create_index(
+        "ix_student_incident_summaries_count", "student_incident_summaries", ["incident_count", "student_id"],
+    )
+
+    open_statuses = ", ".join(f"'{status}'" for status in OPEN_STATUSES)
+    op.execute(f"""
+        INSERT INTO student_incident_summaries
+            (student_id, incident_count, open_count, last_incident_date, latest_action)
+        SELECT t.student_id, t.incident_count, t.open_count, t.last_incident_date, l.action
+        FROM (
+            SELECT student_id, COUNT(*) AS incident_count,
+                   SUM(CASE WHEN status IN ({open_statuses}) THEN 1 ELSE 0 END) AS open_count,
+                   MAX(incident_date) AS last_incident_date
+            FROM discipline_incidents
+            WHERE student_id IN (SELECT id FROM students)
+            GROUP BY student_id
+        ) t
+        LEFT JOIN (
+            SELECT student_id, action,
+                   ROW_NUMBER() OVER (PARTITION BY student_id ORDER BY incident_date DESC, id DESC) AS position
+            FROM discipline_incidents
+            WHERE action IS NOT NULL
+        ) l ON l.student_id = t.student_id AND l.position = 1
+    """)
+
+
+def downgrade():
+    op.drop_table("student_incident_summaries")
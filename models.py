@@ -1,5 +1,32 @@
-from sqlalchemy import Column, Integer, String, Date
+import enum
+
+from sqlalchemy import DDL, JSON, Column, Integer, String, Date, DateTime, Enum, ForeignKey, Index, Text, event, func
 from database import Base
+from search import SEARCH_CONFIG
+
+
+class IncidentStatus(str, enum.Enum):
+    PENDING = "Pending"
+    UNDER_REVIEW = "Under Review"
+    ACTION_ASSIGNED = "Action Assigned"
+    RESOLVED = "Resolved"
+    DISMISSED = "Dismissed"
+
+    def __str__(self):
+        return self.value
+
+def roster_prefix_indexes(table: str, **columns):
+    # Roster search is a case-insensitive prefix match on name or username;
+    # text_pattern_ops lets Postgres use the index for LIKE 'abc%' under any collation.
+    return tuple(
+        Index(
+            f"ix_{table}_{key}_prefix",
+            func.lower(column).label(f"{key}_lower"),
+            postgresql_ops={f"{key}_lower": "text_pattern_ops"},
+        )
+        for key, column in columns.items()
+    )
+
 
 class User(Base):
     __tablename__ = "users"
@@ -17,6 +44,8 @@ class Student(Base):
     username = Column(String, unique=True, index=True)
     password = Column(String)
 
+    __table_args__ = roster_prefix_indexes("students", name=name, username=username)
+
 
 class StaffMember(Base):
     __tablename__ = "staff_members"
@@ -27,15 +56,114 @@ class StaffMember(Base):
     password = Column(String, nullable=False)
     role = Column(String, index=True, nullable=False)  # e.g. "principal", "faculty", "committee"
 
+    __table_args__ = roster_prefix_indexes("staff_members", name=name, username=username)
+
 
+# On Postgres the table is range-partitioned by incident_date (migration 0008,
+# partitions.py), with primary key (id, incident_date); the mapping keeps id
+# alone as the identity, which the id sequence keeps unique.
 class DisciplineIncident(Base):
     __tablename__ = "discipline_incidents"
 
     id = Column(Integer, primary_key=True, index=True)
-    student_id = Column(String, index=True)
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="SET NULL"))
     student_name = Column(String)
     class_name = Column(String)
     department = Column(String)
-    incident_date = Column(Date)
+    incident_date = Column(Date, nullable=False)
     description = Column(String)
-    status = Column(String, default="Pending")
+    status = Column(
+        Enum(
+            IncidentStatus,
+            name="incident_status",
+            native_enum=False,
+            length=32,
+            values_callable=lambda statuses: [s.value for s in statuses],
+        ),
+        nullable=False,
+        default=IncidentStatus.PENDING,
+    )
+    action = Column(String)  # set together with status "Action Assigned"
+    # Bumped on every update, so a write based on a stale read matches no row
+    # (optimistic concurrency, see crud.bulk_update_incident_status).
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Every listing orders by (incident_date, id) for keyset pagination, so each
+    # equality filter gets an index that ends in that ordering.
+    __table_args__ = (
+        Index("ix_discipline_incidents_date_id", "incident_date", "id"),
+        Index("ix_discipline_incidents_student_date", "student_id", "incident_date", "id"),
+        Index("ix_discipline_incidents_status_date", "status", "incident_date", "id"),
+        Index("ix_discipline_incidents_department_date", "department", "incident_date", "id"),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+
+# Postgres full-text search column (see search.py). It is not mapped, so
+# incident queries never load it; a trigger fills it on insert and on
+# description updates. Migration 0005 adds the same objects to existing databases.
+INCIDENT_SEARCH_DDL = [
+    "ALTER TABLE discipline_incidents ADD COLUMN search_vector tsvector",
+    f"""CREATE OR REPLACE FUNCTION discipline_incidents_search_vector() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector := to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.description, ''));
+        RETURN NEW;
+    END
+    $$""",
+    """CREATE TRIGGER discipline_incidents_search_vector
+    BEFORE INSERT OR UPDATE OF description ON discipline_incidents
+    FOR EACH ROW EXECUTE FUNCTION discipline_incidents_search_vector()""",
+    "CREATE INDEX ix_discipline_incidents_search ON discipline_incidents USING gin (search_vector)",
+]
+for statement in INCIDENT_SEARCH_DDL:
+    event.listen(
+        DisciplineIncident.__table__, "after_create",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
+
+
+class IncidentStat(Base):
+    """Incident counts per (dimension, bucket), kept in step by crud on every write."""
+    __tablename__ = "incident_stats"
+
+    dimension = Column(String(32), primary_key=True)  # status, department, class_name, month
+    bucket = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class StudentIncidentSummary(Base):
+    """Per-student incident totals, kept in step by crud on every incident write."""
+    __tablename__ = "student_incident_summaries"
+
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    incident_count = Column(Integer, nullable=False, default=0)
+    open_count = Column(Integer, nullable=False, default=0)  # Pending, Under Review or Action Assigned
+    last_incident_date = Column(Date)
+    latest_action = Column(String)  # most recently assigned action
+
+    # "Top repeat offenders" reads this index backwards instead of counting incidents
+    __table_args__ = (
+        Index("ix_student_incident_summaries_count", "incident_count", "student_id"),
+    )
+
+
+class Job(Base):
+    """Durable background job (see jobs.py); workers claim due rows with SKIP LOCKED."""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(64), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(16), nullable=False, default="queued")  # queued, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime, nullable=False)  # UTC; not before this time (retries back off)
+    locked_at = Column(DateTime)
+    locked_by = Column(String(64))
+    last_error = Column(Text)
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_jobs_due", "status", "run_at"),
+    )
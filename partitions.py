@@ -0,0 +1,181 @@
+"""Academic-year partitions of discipline_incidents (Postgres) and archival.
+
+On Postgres, migration 0008 turns discipline_incidents into a table
+range-partitioned by incident_date, one partition per academic year
+(``discipline_incidents_2025`` holds 2025-07-01 up to 2026-07-01 with the
+default INCIDENT_YEAR_START_MONTH=7), plus a default partition for dates
+outside every range. Listings in crud.py only ask for the current year
+unless the caller gives a date range, so Postgres scans one partition.
+
+``maintain`` keeps the table in shape. It creates the partitions for the
+next INCIDENT_PARTITIONS_AHEAD years. It detaches partitions older than
+INCIDENT_RETENTION_YEARS and moves them into the ``archive`` schema,
+where they stay queryable (archive.discipline_incidents_2019) but are no
+longer part of listings, search, statistics or student summaries. Job
+workers run it every hour. Incidents dated beyond the last partition land in
+the default partition; they are moved into their year's partition when it
+is created, and ``maintain`` logs a warning while the default partition
+holds any rows. It can also be run by hand:
+
+    python partitions.py maintain
+    python partitions.py list
+
+On SQLite, or a Postgres table created without the migration, the table is
+not partitioned and ``maintain`` does nothing.
+"""
+import argparse
+import logging
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+INCIDENT_YEAR_START_MONTH = int(os.getenv("INCIDENT_YEAR_START_MONTH", 7))  # academic year starts on the 1st of this month
+INCIDENT_PARTITIONS_AHEAD = int(os.getenv("INCIDENT_PARTITIONS_AHEAD", 1))  # future years created in advance
+INCIDENT_RETENTION_YEARS = int(os.getenv("INCIDENT_RETENTION_YEARS", 5))    # years kept attached, current included
+INCIDENT_LISTING_YEARS = int(os.getenv("INCIDENT_LISTING_YEARS", 1))        # years listings show without a date range
+
+TABLE = "discipline_incidents"
+ARCHIVE_SCHEMA = "archive"
+_PARTITION_NAME = re.compile(rf"^{TABLE}_(\d{{4}})$")
+_MAINTENANCE_LOCK = 8_2024  # pg advisory lock key: one maintainer at a time
+
+logger = logging.getLogger("partitions")
+
+
+# ─── Academic years ──────────────────────────────────────────────────────────────
+def academic_year(day: date) -> int:
+    return day.year if day.month >= INCIDENT_YEAR_START_MONTH else day.year - 1
+
+def year_bounds(year: int) -> Tuple[date, date]:
+    """[start, end) of academic ``year``."""
+    return date(year, INCIDENT_YEAR_START_MONTH, 1), date(year + 1, INCIDENT_YEAR_START_MONTH, 1)
+
+def partition_name(year: int) -> str:
+    return f"{TABLE}_{year}"
+
+def listing_start(today: Optional[date] = None) -> date:
+    """Earliest incident_date listings show when no date range is requested."""
+    year = academic_year(today or date.today()) - (INCIDENT_LISTING_YEARS - 1)
+    return year_bounds(year)[0]
+
+
+# ─── Partition maintenance ───────────────────────────────────────────────────────
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    kind = db.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": TABLE}
+    ).scalar()
+    return kind == "p"
+
+def attached_partitions(db: Session) -> Dict[str, Optional[int]]:
+    """Partition name -> academic year (None for the default partition)."""
+    names = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+    ), {"table": TABLE}).scalars()
+    partitions = {}
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        partitions[name] = int(match.group(1)) if match else None
+    return partitions
+
+def default_partition(db: Session) -> Optional[str]:
+    return next((name for name, year in attached_partitions(db).items() if year is None), None)
+
+def _range_condition(year: int) -> str:
+    start, end = year_bounds(year)
+    return f"incident_date >= '{start.isoformat()}' AND incident_date < '{end.isoformat()}'"
+
+def create_partitions(db: Session, years) -> List[str]:
+    """Create the missing partitions for ``years``.
+
+    Postgres refuses to create a partition while the default partition holds
+    rows in its range, so in that case the default partition is detached, the
+    new partition created, the rows moved across and the default reattached,
+    all in the caller's transaction."""
+    existing = attached_partitions(db)
+    default = default_partition(db)
+    created = []
+    for year in years:
+        name = partition_name(year)
+        if name in existing:
+            continue
+        start, end = year_bounds(year)
+        condition = _range_condition(year)
+        stranded = default and db.execute(
+            text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {condition})")
+        ).scalar()
+        if stranded:
+            db.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {default}"))
+        db.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        if stranded:
+            moved = db.execute(text(f"INSERT INTO {name} SELECT * FROM {default} WHERE {condition}")).rowcount
+            db.execute(text(f"DELETE FROM {default} WHERE {condition}"))
+            db.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {default} DEFAULT"))
+            logger.warning("moved %d incidents from %s into the new partition %s", moved, default, name)
+        created.append(name)
+    return created
+
+def archive_partitions(db: Session, oldest_kept_year: int) -> List[str]:
+    archived = []
+    db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+    for name, year in attached_partitions(db).items():
+        if year is None or year >= oldest_kept_year:
+            continue
+        db.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+        db.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+        archived.append(name)
+    return archived
+
+def maintain(db: Session, today: Optional[date] = None) -> dict:
+    """Create upcoming partitions and archive expired ones; returns what changed."""
+    if not is_partitioned(db):
+        return {}
+    if not db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _MAINTENANCE_LOCK}).scalar():
+        db.rollback()
+        return {}  # another worker is at it
+    current = academic_year(today or date.today())
+    created = create_partitions(db, range(current, current + INCIDENT_PARTITIONS_AHEAD + 1))
+    archived = archive_partitions(db, current - INCIDENT_RETENTION_YEARS + 1)
+    default = default_partition(db)
+    default_rows = db.execute(text(f"SELECT count(*) FROM {default}")).scalar() if default else 0
+    db.commit()
+    if created or archived:
+        logger.info("incident partitions created %s, archived %s", created, archived)
+    if default_rows:
+        # Dates outside every partition: before the oldest kept year, or
+        # further ahead than INCIDENT_PARTITIONS_AHEAD
+        logger.warning("%s holds %d incidents outside every academic-year partition", default, default_rows)
+    if archived:
+        import crud  # crud imports this module for listing_start
+
+        # The summary tables count live incidents only
+        crud.rebuild_incident_stats(db)
+        crud.rebuild_student_summaries(db)
+    return {"created": created, "archived": archived, "default_rows": default_rows}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="discipline_incidents partition maintenance")
+    parser.add_argument("command", choices=["maintain", "list"])
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        if not is_partitioned(db):
+            print(f"{TABLE} is not partitioned")
+        elif args.command == "maintain":
+            print(maintain(db))
+        else:
+            for name, year in attached_partitions(db).items():
+                print(name, "default" if year is None else "{} .. {}".format(*year_bounds(year)))
@@ -0,0 +1,49 @@
+"""Count the SQL statements a block of code issues, and fail when it issues too many.
+
+    with assert_max_queries(2, "GET /studentdashboard"):
+        client.get("/studentdashboard")
+
+Statements are counted on every SQLAlchemy engine in the process (sync and
+async) through the before_cursor_execute event, so the block must not run
+concurrently with unrelated database work. See benchmarks/query_budget.py
+for the per-route budget check.
+"""
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(" ".join(statement.split()))
+
+    def __enter__(self):
+        event.listen(Engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, "before_cursor_execute", self._record)
+
+
+@contextmanager
+def assert_max_queries(budget: int, description: str = "block"):
+    with QueryCounter() as counter:
+        yield counter
+    if counter.count > budget:
+        listing = "\n".join(f"  {n}. {sql}" for n, sql in enumerate(counter.statements, 1))
+        raise QueryBudgetExceeded(
+            f"{description} issued {counter.count} queries, budget is {budget}:\n{listing}"
+        )
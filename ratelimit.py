@@ -0,0 +1,179 @@
+"""Login throttling: token buckets per client IP and per username.
+
+Two limits protect POST /login, and both are checked before any query runs:
+
+* ``LoginRateLimitMiddleware`` charges one token per attempt to the client
+  IP's bucket and answers 429 when the bucket is empty, before the form is
+  even parsed.
+* ``check_username`` (a dependency of the login route) takes a token from
+  the username's bucket before the password is checked and refuses the
+  attempt when the bucket is empty. Taking the token up front means
+  concurrent guesses for one username cannot all pass before the first
+  failure is counted. A successful login clears the bucket
+  (``record_success``), so in effect only failures are charged.
+
+Buckets live in an in-process LRU by default, so each worker counts on its
+own. Set RATE_LIMIT_URL=redis://... to share them between workers. Behind a
+reverse proxy, run uvicorn with --proxy-headers so the client address is
+the real one.
+"""
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Tuple
+
+from fastapi import Form
+from starlette.responses import PlainTextResponse
+
+from database import env_bool
+
+LOGIN_RATE_LIMIT = env_bool("LOGIN_RATE_LIMIT", True)
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", 20))                      # attempts in a burst per IP
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", 10))          # sustained attempts per IP
+LOGIN_USERNAME_FAILURES = int(os.getenv("LOGIN_USERNAME_FAILURES", 5))     # failures before a username is held off
+LOGIN_USERNAME_FAILURES_PER_MINUTE = float(os.getenv("LOGIN_USERNAME_FAILURES_PER_MINUTE", 1))
+RATE_LIMIT_MAXSIZE = int(os.getenv("RATE_LIMIT_MAXSIZE", 100_000))         # buckets kept per worker
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL")
+
+MAX_KEY_LENGTH = 128
+
+
+class RateLimited(Exception):
+    """Raised by ``check_username``; main.py renders the login page with a 429."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+
+# ─── Backends ────────────────────────────────────────────────────────────────────
+# ``take(key, burst, per_second, cost)`` refills the bucket for the time since
+# its last update, then removes ``cost`` tokens if there are enough. Returns
+# (allowed, seconds until a token is available). cost=0 only checks.
+class MemoryBackend:
+    def __init__(self, maxsize: int = RATE_LIMIT_MAXSIZE):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, burst: int, per_second: float, cost: int = 1) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * per_second)
+            allowed = tokens >= max(cost, 1)
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / per_second
+
+    async def reset(self, key: str):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def info(self) -> dict:
+        return {"backend": "memory", "buckets": len(self._buckets)}
+
+
+# Same arithmetic as MemoryBackend, atomically in Redis. Keys expire once the
+# bucket would be full again.
+_REDIS_TAKE = """
+local burst, per_second, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * per_second)
+local allowed = tokens >= math.max(cost, 1)
+if allowed then tokens = tokens - cost end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / per_second * 1000) + 1000)
+return {allowed and 1 or 0, tostring(tokens)}
+"""
+
+class RedisBackend:
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis.asyncio  # optional dependency, only needed with RATE_LIMIT_URL
+
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(_REDIS_TAKE)
+
+    async def take(self, key: str, burst: int, per_second: float, cost: int = 1) -> Tuple[bool, float]:
+        allowed, tokens = await self._take(keys=[self.prefix + key], args=[burst, per_second, cost, time.time()])
+        return bool(allowed), 0.0 if allowed else (1 - float(tokens)) / per_second
+
+    async def reset(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+    def info(self) -> dict:
+        return {"backend": "redis"}
+
+
+backend = RedisBackend(RATE_LIMIT_URL) if RATE_LIMIT_URL else MemoryBackend()
+rejected = Counter()  # reason -> requests refused in this worker
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+def stats() -> dict:
+    return {
+        "pid": os.getpid(),
+        "enabled": LOGIN_RATE_LIMIT,
+        "rejected": dict(rejected),
+        **backend.info(),
+    }
+
+
+# ─── Per-IP limit (middleware) ───────────────────────────────────────────────────
+class LoginRateLimitMiddleware:
+    """Pure ASGI middleware charging the client IP one token per POST to ``paths``."""
+
+    def __init__(self, app, paths=("/login",)):
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not LOGIN_RATE_LIMIT
+            or scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+        ):
+            return await self.app(scope, receive, send)
+
+        client = scope.get("client")
+        ip = client[0] if client else "unknown"
+        allowed, wait = await backend.take(f"ip:{ip}", LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE / 60)
+        if allowed:
+            return await self.app(scope, receive, send)
+        rejected["ip"] += 1
+        response = PlainTextResponse(
+            "Too many login attempts from this address; try again later.",
+            status_code=429,
+            headers={"Retry-After": retry_after_header(wait)},
+        )
+        await response(scope, receive, send)
+
+
+# ─── Per-username limit (login route) ────────────────────────────────────────────
+def _username_key(username: str) -> str:
+    return "user:" + username[:MAX_KEY_LENGTH]
+
+async def check_username(username: str = Form(...)) -> str:
+    if LOGIN_RATE_LIMIT:
+        allowed, wait = await backend.take(
+            _username_key(username), LOGIN_USERNAME_FAILURES, LOGIN_USERNAME_FAILURES_PER_MINUTE / 60,
+        )
+        if not allowed:
+            rejected["username"] += 1
+            raise RateLimited(wait)
+    return username
+
+async def record_success(username: str):
+    if LOGIN_RATE_LIMIT:
+        await backend.reset(_username_key(username))
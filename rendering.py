@@ -0,0 +1,178 @@
+"""Template rendering with output caching, and HTTP caching for /static.
+
+``render_page`` is for pages whose HTML depends only on the arguments it is
+given (the home, login and reference pages, the apply forms). The first
+render of each (template, arguments) pair is kept in memory with its ETag.
+Later hits return the stored bytes, or 304 when the browser's copy is
+current. Templates are compiled once at startup (``precompile_templates``).
+With TEMPLATE_AUTO_RELOAD=1 (development) templates are re-read when they
+change and rendered output is not cached.
+
+``CachedStaticFiles`` serves /static with a year-long immutable
+Cache-Control when the URL carries a content version (``static_url`` in
+templates adds one). If the client accepts it, it serves a precompressed
+.br or .gz sibling instead of the file. Build those with:
+
+    python rendering.py compress-static
+"""
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import stat
+import time
+from pathlib import Path
+from typing import Optional
+
+import anyio
+import jinja2
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+from fastapi.staticfiles import StaticFiles
+from fastapi.templating import Jinja2Templates
+from starlette.datastructures import Headers, QueryParams
+
+import metrics
+from cache import MISSING, TTLCache
+from database import env_bool
+
+TEMPLATE_DIR = "templates"
+STATIC_DIR = "static"
+TEMPLATE_AUTO_RELOAD = env_bool("TEMPLATE_AUTO_RELOAD", False)
+TEMPLATE_WARMUP = env_bool("TEMPLATE_WARMUP", True)  # compile all at startup
+PAGE_CACHE_MAXSIZE = int(os.getenv("PAGE_CACHE_MAXSIZE", 1024))
+PAGE_MAX_AGE = int(os.getenv("PAGE_MAX_AGE", 300))            # seconds browsers may reuse a page
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", 3600))        # unversioned /static URLs
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60                  # versioned /static URLs
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE_SUFFIXES = (".css", ".js", ".svg", ".html", ".json", ".txt", ".map")
+
+class TimedTemplate(jinja2.Template):
+    def render(self, *args, **kwargs) -> str:
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            metrics.record_template(self.name, time.perf_counter() - started)
+
+templates = Jinja2Templates(directory=TEMPLATE_DIR)
+templates.env.auto_reload = TEMPLATE_AUTO_RELOAD
+templates.env.template_class = TimedTemplate
+
+_page_cache = TTLCache(ttl=float("inf"), maxsize=PAGE_CACHE_MAXSIZE)
+_static_versions = {}
+
+
+def etag_for(body: bytes) -> str:
+    # Weak: GZipMiddleware may re-encode the body on the way out
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" name the same representation
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def precompile_templates() -> int:
+    """Load and compile every template into the environment's cache."""
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
+
+def render_page(request: Request, name: str, private: bool = False, **context) -> Response:
+    """Render ``name`` with ``context`` once and serve the stored bytes afterwards.
+
+    ``private`` pages (they embed the caller's id) may only be cached by the
+    browser, not by shared proxies.
+    """
+    key = (name, str(request.base_url), tuple(sorted(context.items())))
+    entry = MISSING if TEMPLATE_AUTO_RELOAD else _page_cache.get(key)
+    if entry is MISSING:
+        body = templates.get_template(name).render({"request": request, **context}).encode()
+        entry = (body, etag_for(body))
+        if not TEMPLATE_AUTO_RELOAD:
+            _page_cache.set(key, entry)
+    body, etag = entry
+
+    headers = {"ETag": etag, "Cache-Control": f"{'private' if private else 'public'}, max-age={PAGE_MAX_AGE}"}
+    if private:
+        headers["Vary"] = "Cookie"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
+
+
+# ─── Static files ────────────────────────────────────────────────────────────────
+def static_url(path: str) -> str:
+    """/static URL for ``path`` with a content-hash version, safe to cache forever."""
+    version = _static_versions.get(path)
+    if version is None:
+        try:
+            content = (Path(STATIC_DIR) / path).read_bytes()
+        except OSError:
+            return f"/static/{path}"
+        version = _static_versions[path] = hashlib.blake2b(content, digest_size=6).hexdigest()
+    return f"/static/{path}?v={version}"
+
+templates.env.globals["static_url"] = static_url
+
+
+class CachedStaticFiles(StaticFiles):
+    async def get_response(self, path: str, scope) -> Response:
+        response = await self._precompressed_response(path, scope) or await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            versioned = "v" in QueryParams(scope.get("query_string", b""))
+            response.headers["Cache-Control"] = (
+                f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable" if versioned
+                else f"public, max-age={STATIC_MAX_AGE}"
+            )
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    async def _precompressed_response(self, path: str, scope) -> Optional[Response]:
+        accepted = Headers(scope=scope).get("accept-encoding", "")
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = self.file_response(full_path, stat_result, scope)
+            response.headers["Content-Encoding"] = encoding
+            response.headers["Content-Type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            return response
+        return None
+
+
+def compress_static(directory: str = STATIC_DIR) -> int:
+    """Write .gz (and .br, if the brotli package is installed) next to each text asset."""
+    try:
+        import brotli  # optional dependency
+    except ImportError:
+        brotli = None
+    written = 0
+    for source in Path(directory).rglob("*"):
+        if source.suffix not in COMPRESSIBLE_SUFFIXES or not source.is_file():
+            continue
+        content = source.read_bytes()
+        source.with_name(source.name + ".gz").write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+        written += 1
+        if brotli is not None:
+            source.with_name(source.name + ".br").write_bytes(brotli.compress(content, quality=11))
+            written += 1
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Static asset tooling")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compress = sub.add_parser("compress-static", help="precompress text assets under the static directory")
+    compress.add_argument("--directory", default=STATIC_DIR)
+    args = parser.parse_args()
+    print(f"wrote {compress_static(args.directory)} files")
@@ -1,5 +1,18 @@
-from pydantic import BaseModel
+from pydantic import AfterValidator, BaseModel, ConfigDict
 from datetime import date
+from typing import Annotated, List, Optional
+
+from models import IncidentStatus
+
+def _not_blank(value: str) -> str:
+    if not value.strip():
+        raise ValueError("must not be blank")
+    return value
+
+# Required text in the *Create schemas (forms and bulk import). The read
+# schemas keep plain str so existing rows with blank values still load.
+RequiredStr = Annotated[str, AfterValidator(_not_blank)]
+
 class UserCreate(BaseModel):
     name: str
     email: str
@@ -7,46 +20,104 @@ class UserCreate(BaseModel):
 class User(UserCreate):
     id: int
 
-class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
 class StudentBase(BaseModel):
     name: str
     username: str
 
 class StudentCreate(StudentBase):
-    password: str
+    name: RequiredStr
+    username: RequiredStr
+    password: RequiredStr
 
 class Student(StudentBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
 class StaffMemberBase(BaseModel):
     name: str
     username: str
     role: str
 
 class StaffMemberCreate(StaffMemberBase):
-    password: str
+    name: RequiredStr
+    username: RequiredStr
+    role: RequiredStr
+    password: RequiredStr
 
 class StaffMember(StaffMemberBase):
     id: int
 
-    class Config:
-        orm_mode = True        
+    model_config = ConfigDict(from_attributes=True)
 
-class IncidentCreate(BaseModel):
-    student_id: str
+class IncidentBase(BaseModel):
+    student_id: int
     student_name: str
     class_name: str
     department: str
     incident_date: date
     description: str
 
-class Incident(IncidentCreate):
+class IncidentCreate(IncidentBase):
+    student_name: RequiredStr
+    class_name: RequiredStr
+    department: RequiredStr
+    description: RequiredStr
+
+class Incident(IncidentBase):
     id: int
-    status: str
+    student_id: Optional[int] = None  # NULL once the student is deleted
+    status: IncidentStatus
+    action: Optional[str] = None
+    version: int  # send back with bulk updates (optimistic concurrency)
+
+    model_config = ConfigDict(from_attributes=True)
+
+class IncidentSearchResult(Incident):
+    rank: float
+    snippet: str  # HTML-escaped description excerpt, matches wrapped in <mark>
+
+class StudentIncidentSummary(BaseModel):
+    student_id: int
+    incident_count: int = 0
+    open_count: int = 0
+    last_incident_date: Optional[date] = None
+    latest_action: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class RepeatOffender(StudentIncidentSummary):
+    name: Optional[str] = None
+    username: Optional[str] = None
+
+class IncidentFilters(BaseModel):
+    department: Optional[str] = None
+    class_name: Optional[str] = None
+    status: Optional[IncidentStatus] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+class SessionUser(BaseModel):
+    id: int
+    kind: str  # "admin", "student" or "staff"
+    role: Optional[str] = None
+
+
+# ─── JSON API pages (/api/v1) ────────────────────────────────────────────────────
+class IncidentPage(BaseModel):
+    items: List[Incident]
+    next_cursor: Optional[str] = None
+
+class IncidentSearchPage(BaseModel):
+    items: List[IncidentSearchResult]
+    next_cursor: Optional[str] = None
+
+class StudentPage(BaseModel):
+    items: List[Student]
+    next_cursor: Optional[int] = None
 
-    class Config:
-        orm_mode = True
-        
\ No newline at end of file
+class StaffMemberPage(BaseModel):
+    items: List[StaffMember]
+    next_cursor: Optional[int] = None
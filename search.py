@@ -0,0 +1,117 @@
+"""Full-text search over incident descriptions.
+
+On Postgres, discipline_incidents.search_vector holds
+to_tsvector(SEARCH_CONFIG, description). A trigger keeps it up to date and a
+GIN index covers it (see models.py and migration 0005). crud queries it
+with websearch_to_tsquery, ranks hits with ts_rank_cd and builds snippets
+with ts_headline.
+
+Other databases (SQLite in development and test runs) use
+``IncidentTextIndex``. It is an in-process inverted index with the same
+query syntax subset (terms are ANDed, ``-term`` excludes), a
+length-normalised term-frequency rank and the same snippet markup.
+Incidents are never edited or deleted after they are filed, so the index
+catches up by reading only rows with an id above the last one it has seen.
+"""
+import html
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+SEARCH_CONFIG = "english"
+MARK_START, MARK_STOP = "\x02", "\x03"
+HEADLINE_OPTIONS = (
+    f'StartSel="{MARK_START}", StopSel="{MARK_STOP}", '
+    'MaxWords=25, MinWords=10, MaxFragments=2, FragmentDelimiter=" … "'
+)
+SNIPPET_WORDS = 25
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have he her his i in is it its of on or "
+    "she that the their them they this to was were will with".split()
+)
+
+
+def render_snippet(marked: str) -> str:
+    """HTML-escape a snippet and turn the match markers into <mark> tags."""
+    return html.escape(marked).replace(MARK_START, "<mark>").replace(MARK_STOP, "</mark>")
+
+
+def stem(word: str) -> str:
+    # Deliberately crude; only has to agree with itself for the fallback index
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+def terms(text: str) -> List[str]:
+    words = (word.lower() for word in _WORD.findall(text or ""))
+    return [stem(word) for word in words if word not in _STOPWORDS]
+
+def parse_query(query: str) -> Tuple[List[str], List[str]]:
+    """Split ``query`` into (required, excluded) terms, websearch style."""
+    required, excluded = [], []
+    for token in (query or "").split():
+        target = excluded if token.startswith("-") else required
+        target.extend(terms(token.lstrip("-")))
+    return required, excluded
+
+
+class IncidentTextIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._lengths: Dict[int, int] = {}
+        self._texts: Dict[int, str] = {}
+        self.last_id = 0
+
+    def add(self, incident_id: int, description: Optional[str]):
+        counts = Counter(terms(description))
+        with self._lock:
+            for term, count in counts.items():
+                self._postings[term][incident_id] = count
+            self._lengths[incident_id] = sum(counts.values())
+            self._texts[incident_id] = description or ""
+            self.last_id = max(self.last_id, incident_id)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._texts.clear()
+            self.last_id = 0
+
+    def search(self, query: str) -> List[Tuple[float, int]]:
+        """All (rank, id) hits for ``query``, best first, ties newest first."""
+        required, excluded = parse_query(query)
+        if not required:
+            return []
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in required]
+            ids = set.intersection(*(set(p) for p in postings))
+            for term in excluded:
+                ids -= set(self._postings.get(term, ()))
+            hits = [
+                (sum(p[i] for p in postings) / (1 + math.log(self._lengths[i])), i)
+                for i in ids
+            ]
+        return sorted(hits, reverse=True)
+
+    def snippet(self, incident_id: int, query: str) -> str:
+        required, _ = parse_query(query)
+        wanted = set(required)
+        words = self._texts.get(incident_id, "").split()
+        matches = [n for n, word in enumerate(words) if set(terms(word)) & wanted]
+        start = max(0, (matches[0] if matches else 0) - SNIPPET_WORDS // 3)
+        window = words[start:start + SNIPPET_WORDS]
+        marked = " ".join(
+            f"{MARK_START}{word}{MARK_STOP}" if set(terms(word)) & wanted else word
+            for word in window
+        )
+        return render_snippet(marked)
+
+
+fallback_index = IncidentTextIndex()
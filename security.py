@@ -0,0 +1,74 @@
+import asyncio
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+# ─── Password hashing ────────────────────────────────────────────────────────────
+# Argon2id cost parameters. The defaults are the OWASP argon2id profile
+# (19 MiB, 2 passes, 1 lane), roughly 7x cheaper per login than argon2-cffi's
+# 64 MiB default; re-measure with `benchmarks/login_bench.py costs` before
+# raising them. Existing hashes are upgraded on login when these change.
+PASSWORD_TIME_COST = int(os.getenv("PASSWORD_TIME_COST", 2))
+PASSWORD_MEMORY_COST = int(os.getenv("PASSWORD_MEMORY_COST", 19456))  # KiB
+PASSWORD_PARALLELISM = int(os.getenv("PASSWORD_PARALLELISM", 1))
+
+# Hashing is CPU-bound; argon2 releases the GIL, so a small dedicated pool keeps
+# it off the event loop without letting a login burst take every core.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+
+ARGON2_PREFIX = "$argon2"
+
+password_hasher = PasswordHasher(
+    time_cost=PASSWORD_TIME_COST,
+    memory_cost=PASSWORD_MEMORY_COST,
+    parallelism=PASSWORD_PARALLELISM,
+)
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="pwhash")
+
+
+def hash_password(password: str) -> str:
+    return password_hasher.hash(password)
+
+def verify_password(stored: str, password: str) -> bool:
+    if not stored:
+        return False
+    if not stored.startswith(ARGON2_PREFIX):
+        # Accounts created before hashing still hold the plaintext; they are
+        # upgraded on their next successful login (see needs_rehash).
+        return hmac.compare_digest(stored.encode(), password.encode())
+    try:
+        return password_hasher.verify(stored, password)
+    except (VerificationError, InvalidHashError):
+        return False  # wrong password, or a corrupt/truncated stored hash
+
+_dummy_hash = None
+
+def verify_unknown_account(password: str) -> bool:
+    """Run a full verification against a throwaway hash and return False.
+
+    Used when no account has the username, so a failed login takes as
+    long whether or not the username exists."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password("unknown-account")
+    verify_password(_dummy_hash, password)
+    return False
+
+def needs_rehash(stored: str) -> bool:
+    return not stored.startswith(ARGON2_PREFIX) or password_hasher.check_needs_rehash(stored)
+
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, hash_password, password)
+
+async def verify_password_async(stored: str, password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, stored, password)
+
+async def verify_unknown_account_async(password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_unknown_account, password)
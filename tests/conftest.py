@@ -0,0 +1,39 @@
+"""Settings for the test process, applied before any app module is imported.
+
+App modules read the environment once, at import, and test modules are
+collected (and import the app) before any test runs. Pin here what the
+query-budget run needs (see benchmarks/query_budget.py): a scratch SQLite
+database and the read-through cache off. Other tests build their own
+engines, sessions and caches rather than touching these.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_scratch = tempfile.mkdtemp(prefix="tests-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'budget.db')}"
+os.environ["CACHE_TTL"] = "0"
+os.environ["FEED_MAX_SECONDS"] = "0"
+os.environ["LOGIN_IP_BURST"] = "1000"
+os.environ["JOBS_INLINE"] = "0"
+os.environ.setdefault("SESSION_SECRET", "tests")
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A session on a fresh SQLite database with every table created."""
+    import database
+    import models
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    with database.RoutingSession(bind=engine) as session:
+        yield session
+    engine.dispose()
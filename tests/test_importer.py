@@ -0,0 +1,62 @@
+"""Parsing of bulk-import uploads (importer.iter_records) and the row schemas."""
+import io
+
+import pytest
+from pydantic import ValidationError
+
+import importer
+import schemas
+
+ARRAY = b' [ {"name": "A", "tags": ["x]", "{"]} ,\n{"name": "B"}, 123, true ] '
+RECORDS = [{"name": "A", "tags": ["x]", "{"]}, {"name": "B"}, 123, True]
+
+
+def parse(body: bytes, fmt: str = "json"):
+    return list(importer.iter_records(io.BytesIO(body), fmt))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64 * 1024])
+def test_json_array_in_any_chunk_size(monkeypatch, chunk_size):
+    monkeypatch.setattr(importer, "READ_CHUNK_SIZE", chunk_size)
+    assert parse(ARRAY) == RECORDS
+    assert parse(b"[]") == parse(b" [ ] ") == []
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64 * 1024])
+@pytest.mark.parametrize("body", [
+    b'[{"a": 1} {"a": 2}]',   # missing comma
+    b'[{"a": 1},, {"a": 2}]',
+    b'[, {"a": 1}]',
+    b'[{"a": 1},]',
+    b'[{"a": 1}',
+    b'[{"a": ',
+    b'{"a": 1}',
+    b'',
+])
+def test_malformed_json_array(monkeypatch, chunk_size, body):
+    monkeypatch.setattr(importer, "READ_CHUNK_SIZE", chunk_size)
+    with pytest.raises(importer.ImportFormatError):
+        parse(body)
+
+
+def test_ndjson_reports_bad_lines_in_place():
+    records = parse(b'{"a": 1}\n\nnot json\n{"a": 2}\n', "ndjson")
+    assert records[0] == {"a": 1} and records[2] == {"a": 2}
+    assert isinstance(records[1], ValueError)
+
+
+@pytest.mark.parametrize("schema, values", [
+    (schemas.StudentCreate, {"name": "Stu", "username": "stu", "password": "x"}),
+    (schemas.StaffMemberCreate, {"name": "Fac", "username": "fac", "password": "x", "role": "faculty"}),
+    (schemas.IncidentCreate, {
+        "student_id": 1, "student_name": "Stu", "class_name": "A", "department": "CS",
+        "incident_date": "2026-09-01", "description": "late",
+    }),
+])
+def test_blank_required_fields_are_rejected(schema, values):
+    schema(**values)
+    for field, value in values.items():
+        if isinstance(value, str) and field != "incident_date":
+            for blank in ("", "  "):
+                with pytest.raises(ValidationError):
+                    schema(**{**values, field: blank})
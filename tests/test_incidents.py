@@ -0,0 +1,128 @@
+"""Incident writes against a scratch SQLite database (the ``db`` fixture)."""
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+import crud
+import models
+import schemas
+
+
+def add_student(db, username="stu"):
+    return crud.create_student(db, schemas.StudentCreate(name=username.title(), username=username, password="x"), "hash")
+
+
+def incident(student_id, **values):
+    return {
+        "student_id": student_id, "student_name": "Stu", "class_name": "A", "department": "CS",
+        "incident_date": date(2026, 9, 1), "description": "late", **values,
+    }
+
+
+def stored_counts(db):
+    db.expire_all()
+    stats = {(s.dimension, s.bucket): s.count for s in db.query(models.IncidentStat) if s.count}
+    summaries = {
+        s.student_id: (s.incident_count, s.open_count, s.last_incident_date, s.latest_action)
+        for s in db.query(models.StudentIncidentSummary)
+    }
+    return stats, summaries
+
+
+def assert_matches_rebuild(db):
+    """The incrementally maintained tables equal a recount from discipline_incidents."""
+    kept = stored_counts(db)
+    crud.rebuild_incident_stats(db)
+    crud.rebuild_student_summaries(db)
+    assert stored_counts(db) == kept
+
+
+def seed(db):
+    """Two students with incidents on different days; returns their ids and the incident ids."""
+    first, second = add_student(db, "first"), add_student(db, "second")
+    ids = [
+        crud.create_incident(db, schemas.IncidentCreate(**incident(student_id, incident_date=date(2026, 9, day), department=dept))).id
+        for student_id, day, dept in ((first.id, 1, "CS"), (first.id, 3, "EE"), (second.id, 2, "CS"), (second.id, 4, "ME"))
+    ]
+    return first.id, second.id, ids
+
+
+def versions(db, ids):
+    Incident = models.DisciplineIncident
+    return dict(db.query(Incident.id, Incident.version).filter(Incident.id.in_(ids)).all())
+
+
+def test_counts_after_create(db):
+    seed(db)
+    assert_matches_rebuild(db)
+
+
+def test_counts_after_status_change(db):
+    _, _, ids = seed(db)
+    assert crud.update_incident_status(db, ids[0], models.IncidentStatus.RESOLVED)
+    assert crud.update_incident_status(db, ids[2], models.IncidentStatus.UNDER_REVIEW)
+    # The rebuild takes the action on each student's newest incident
+    assert crud.assign_action(db, ids[3], "Detention")
+    assert_matches_rebuild(db)
+
+
+def test_counts_after_bulk_update(db):
+    _, _, ids = seed(db)
+    result = crud.bulk_update_incident_status(db, versions(db, ids[:3]), models.IncidentStatus.DISMISSED)
+    assert result.updated == sorted(ids[:3]) and not result.conflicts
+    result = crud.bulk_assign_action(db, versions(db, [ids[1], ids[3]]), "Warning")
+    assert result.updated == sorted([ids[1], ids[3]]) and not result.conflicts
+    assert_matches_rebuild(db)
+
+
+def test_counts_after_import(db):
+    first, second, _ = seed(db)
+    rows = [(1, incident(first, incident_date=date(2026, 10, 1))), (2, incident(second, class_name="B"))]
+    assert crud.bulk_create_incidents(db, rows) == (2, [])
+    assert_matches_rebuild(db)
+
+    # A rejected row sends the batch through the row-by-row path
+    rows = [(1, incident(second, incident_date=date(2026, 10, 2))), (2, incident(first, incident_date=None))]
+    inserted, errors = crud.bulk_create_incidents(db, rows)
+    assert inserted == 1 and [row for row, _ in errors] == [2]
+    assert_matches_rebuild(db)
+
+
+def test_stale_status_change_conflicts(db):
+    _, _, ids = seed(db)
+    stale = crud.get_incident_by_id(db, ids[0])
+    assert stale.version == 1
+    with Session(bind=db.get_bind()) as other:
+        assert crud.update_incident_status(other, ids[0], models.IncidentStatus.RESOLVED)
+
+    # db still holds version 1: the update must match no row, not overwrite
+    assert crud.update_incident_status(db, ids[0], models.IncidentStatus.DISMISSED) is None
+    assert crud.get_incident_by_id(db, ids[0]).status == models.IncidentStatus.RESOLVED
+    assert_matches_rebuild(db)
+
+
+def test_stale_bulk_update_conflicts(db):
+    _, _, ids = seed(db)
+    seen = versions(db, ids[:2])
+    assert crud.update_incident_status(db, ids[0], models.IncidentStatus.RESOLVED)
+
+    result = crud.bulk_update_incident_status(db, seen, models.IncidentStatus.DISMISSED)
+    assert result.updated == [ids[1]]
+    assert result.conflicts == [ids[0]]
+    assert crud.get_incident_by_id(db, ids[0]).status == models.IncidentStatus.RESOLVED
+    assert_matches_rebuild(db)
+
+
+def test_create_incident_for_unknown_student_is_rejected(db):
+    assert crud.create_incident(db, schemas.IncidentCreate(**incident(99))) is None
+    assert db.query(models.DisciplineIncident).count() == 0
+    assert db.query(models.IncidentStat).count() == 0
+    assert db.query(models.StudentIncidentSummary).count() == 0
+
+
+def test_bulk_create_reports_unknown_students_per_row(db):
+    student = add_student(db)
+    inserted, errors = crud.bulk_create_incidents(db, [(1, incident(student.id)), (2, incident(99))])
+    assert inserted == 1
+    assert errors == [(2, "no student with id 99")]
+    assert [s.student_id for s in db.query(models.StudentIncidentSummary)] == [student.id]
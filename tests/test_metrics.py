@@ -0,0 +1,22 @@
+"""Per-request query timing (metrics.RequestStats)."""
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+import metrics
+
+
+def test_failed_statement_leaves_no_timer_behind():
+    engine = create_engine("sqlite://")
+    stats = metrics.RequestStats()
+    token = metrics._current.set(stats)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+            assert not any(key.startswith("query") for key in conn.info)
+    finally:
+        metrics._current.reset(token)
+        engine.dispose()
+    assert stats.queries == 1
+    assert [statement for _, statement in stats.statements] == ["SELECT 1"]
@@ -0,0 +1,36 @@
+"""Per-route query budgets and N+1 detection (see benchmarks/query_budget.py).
+
+    python -m pytest tests/
+    DATABASE_ASYNC=0 python -m pytest tests/
+
+The app is imported once per process, so one run covers one engine mode.
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import query_budget  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def results(tmp_path_factory):
+    cwd = os.getcwd()
+    try:
+        yield {(r.method, r.path): r for r in query_budget.run(tmp_path_factory.mktemp("query-budget"))}
+    finally:
+        os.chdir(cwd)
+
+
+def test_every_route_has_a_budget(results):
+    missing = [f"{method} {path}" for (method, path), r in results.items() if (method, path) not in query_budget.BUDGETS]
+    assert not missing, "routes without an entry in BUDGETS: " + ", ".join(missing)
+
+
+@pytest.mark.parametrize("route", sorted(query_budget.BUDGETS), ids=lambda route: " ".join(route))
+def test_route_within_budget(results, route):
+    result = results[route]
+    assert not result.failures, "\n".join(result.failures + [f"  {sql[:160]}" for sql in result.statements])
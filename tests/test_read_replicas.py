@@ -0,0 +1,95 @@
+"""Read-through cache and read replicas: a client that wrote must see its write.
+
+The primary and a lagging replica are two SQLite files; the replica is a copy
+of the primary taken before the write.
+"""
+import shutil
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+
+import cache as cache_module
+import crud
+import database
+import models
+import schemas
+
+
+@contextmanager
+def request(pinned=False):
+    """What ReadYourWritesMiddleware sets up around one HTTP request."""
+    state = {"pinned": pinned, "wrote": False}
+    token = database._request_state.set(state)
+    try:
+        yield state
+    finally:
+        database._request_state.reset(token)
+
+
+@pytest.fixture
+def routed(tmp_path, monkeypatch):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    models.Base.metadata.create_all(bind=primary)
+    with database.RoutingSession(bind=primary) as db:
+        student_id = crud.create_student(db, schemas.StudentCreate(name="Before", username="stu", password="x"), "hash").id
+    primary.dispose()
+    shutil.copy(tmp_path / "primary.db", tmp_path / "replica.db")
+
+    read_cache = cache_module.ReadThroughCache(cache_module.MemoryBackend(60, 100), 60)
+    monkeypatch.setattr(cache_module, "cache", read_cache)
+    monkeypatch.setattr(crud, "cache", read_cache)
+    monkeypatch.setattr(database, "_engines", {})
+    replica = database.Replica(0, f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(database, "replicas", [replica])
+    try:
+        yield lambda: database.RoutingSession(bind=primary), replica, student_id
+    finally:
+        for eng in database._engines.values():
+            eng.dispose()
+        primary.dispose()
+
+
+def rename(session, student_id, name):
+    with request() as state, session() as db:
+        crud.update_student(db, student_id, schemas.StudentCreate(name=name, username="stu", password="x"), "hash")
+    assert state["wrote"]  # the response would set the read-your-writes cookie
+
+
+def profile_name(session, student_id, pinned=False):
+    with request(pinned=pinned), session() as db:
+        return crud.get_student_profile(db, student_id).name
+
+
+def test_writer_sees_its_write_after_a_stale_replica_read(routed, tmp_path):
+    session, replica, student_id = routed
+    rename(session, student_id, "After")
+
+    # Another client reads the lagging replica: stale, and not cached
+    assert profile_name(session, student_id) == "Before"
+    assert replica.reads == 1
+
+    # The writer is pinned to the primary and must not get the stale copy
+    assert profile_name(session, student_id, pinned=True) == "After"
+
+    # Once the replica catches up, nobody is served the stale copy either
+    shutil.copy(tmp_path / "primary.db", tmp_path / "replica.db")
+    assert profile_name(session, student_id) == "After"
+
+
+def test_pinned_reads_bypass_the_cache(routed):
+    session, replica, student_id = routed
+    assert profile_name(session, student_id, pinned=True) == "Before"
+    rename(session, student_id, "After")
+    assert profile_name(session, student_id, pinned=True) == "After"
+    assert cache_module.cache.hits == cache_module.cache.misses == 0
+    assert replica.reads == 0
+
+
+def test_primary_reads_are_still_cached(routed):
+    session, replica, student_id = routed
+    replica.mark_down()
+    assert profile_name(session, student_id) == "Before"
+    assert profile_name(session, student_id) == "Before"
+    assert cache_module.cache.hits == 1
+    assert replica.reads == 0
@@ -0,0 +1,27 @@
+"""Settings parsed from the environment (database.env_bool)."""
+import pytest
+
+from database import env_bool
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", True), ("true", True), ("Yes", True), (" on ", True),
+    ("0", False), ("FALSE", False), ("no", False), ("off", False),
+])
+def test_env_bool_values(monkeypatch, value, expected):
+    monkeypatch.setenv("TEST_FLAG", value)
+    assert env_bool("TEST_FLAG", not expected) is expected
+
+
+@pytest.mark.parametrize("default", [True, False])
+def test_env_bool_unset_or_empty_is_default(monkeypatch, default):
+    monkeypatch.delenv("TEST_FLAG", raising=False)
+    assert env_bool("TEST_FLAG", default) is default
+    monkeypatch.setenv("TEST_FLAG", "")
+    assert env_bool("TEST_FLAG", default) is default
+
+
+def test_env_bool_rejects_other_values(monkeypatch):
+    monkeypatch.setenv("TEST_FLAG", "enabled")
+    with pytest.raises(ValueError, match="TEST_FLAG"):
+        env_bool("TEST_FLAG", False)